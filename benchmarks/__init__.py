@@ -0,0 +1,6 @@
+"""Performance benchmarks for the rentals hot paths.
+
+Seed a synthetic dataset with `python manage.py seed_benchmark_data` and run
+the suite with `python manage.py run_benchmarks`. Both talk to the database
+configured in settings, so point them at a local PostGIS instance.
+"""
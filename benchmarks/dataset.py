@@ -0,0 +1,145 @@
+"""Seeded synthetic Nairobi dataset for benchmarks.
+
+Buildings are placed inside the real districts (load them first with
+`load_districts`); shops, bus stops and routes are scattered over the same
+extent. Every synthetic row is tagged so it can be cleared without touching
+real data: POIs carry the BENCH_PREFIX in their name and buildings are owned
+by the BENCH_USERNAME user.
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import LineString, MultiLineString, Point
+from django.db import transaction
+
+from rentals import versioning
+from rentals.changelog import record_building_changes
+from rentals.models import Building, BuildingChange, BusStop, District, Profile, ProfileBuilding, Route, Shops
+from rentals.proximity import refresh_nearest_pois
+from rentals.transit import rebuild_stop_routes
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench-'
+BENCH_USERNAME = 'bench_owner'
+
+AMENITIES = ['wifi', 'pool', 'parking', 'gym', 'garden', 'security']
+SHOP_CATEGORIES = ['supermarket', 'convenience', 'bakery', 'butcher', 'hardware', 'clothes']
+
+
+def get_bench_profile():
+    """Return the profile owning the synthetic buildings, creating it if needed."""
+    user, created = User.objects.get_or_create(username=BENCH_USERNAME, defaults={'email': 'bench@example.com'})
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+    profile, _ = Profile.objects.get_or_create(user=user)
+    return profile
+
+
+def clear_dataset():
+    """Delete every synthetic row created by `generate_dataset`."""
+    with transaction.atomic():
+        Building.objects.filter(profiles__user__username=BENCH_USERNAME).delete()
+        Shops.objects.filter(name__startswith=BENCH_PREFIX).delete()
+        BusStop.objects.filter(name__startswith=BENCH_PREFIX).delete()
+        Route.objects.filter(route_name__startswith=BENCH_PREFIX).delete()
+        versioning.bump(versioning.POIS)
+
+
+class _DistrictSampler:
+    """Uniform random points over the district extent, tagged with their district."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.districts = [(d, d.geometry.prepared) for d in District.objects.all()]
+        if not self.districts:
+            raise ValueError('No districts loaded. Run `python manage.py load_districts` first.')
+        extents = [d.geometry.extent for d, _ in self.districts]
+        self.xmin = min(e[0] for e in extents)
+        self.ymin = min(e[1] for e in extents)
+        self.xmax = max(e[2] for e in extents)
+        self.ymax = max(e[3] for e in extents)
+
+    def random_point(self):
+        return Point(self.rng.uniform(self.xmin, self.xmax), self.rng.uniform(self.ymin, self.ymax), srid=4326)
+
+    def point_in_district(self):
+        # Rejection sampling; the districts cover most of their bounding box
+        while True:
+            point = self.random_point()
+            for district, prepared in self.districts:
+                if prepared.contains(point):
+                    return district, point
+
+
+def _make_buildings(sampler, rng, count):
+    for i in range(count):
+        district, point = sampler.point_in_district()
+        yield Building(
+            title=f'{BENCH_PREFIX}building-{i}',
+            county=district.county,
+            district=district,
+            address=f'{rng.randint(1, 999)} Benchmark Road',
+            location=point,
+            pets_allowed=rng.random() < 0.3,
+            rental_price=Decimal(rng.randrange(5000, 250000, 500)),
+            num_bedrooms=rng.randint(0, 5),
+            num_bathrooms=rng.randint(1, 3),
+            square_meters=Decimal(rng.randrange(20, 400)),
+            is_available=rng.random() < 0.8,
+            amenities=rng.sample(AMENITIES, rng.randint(0, len(AMENITIES))),
+            owner_contact=f'2547{rng.randint(10000000, 99999999)}',
+        )
+
+
+def _make_route(sampler, rng, index, steps=25, step_deg=0.004):
+    x, y = sampler.point_in_district()[1].coords
+    coords = [(x, y)]
+    heading_x, heading_y = rng.uniform(-1, 1), rng.uniform(-1, 1)
+    for _ in range(steps):
+        x += (heading_x + rng.uniform(-0.5, 0.5)) * step_deg
+        y += (heading_y + rng.uniform(-0.5, 0.5)) * step_deg
+        coords.append((x, y))
+    return Route(
+        route_name=f'{BENCH_PREFIX}{index}',
+        headsign=f'Benchmark headsign {index}',
+        route_long_name=f'{BENCH_PREFIX}route-{index}',
+        geometry=MultiLineString(LineString(coords, srid=4326), srid=4326),
+    )
+
+
+def generate_dataset(buildings=1000, shops=200, stops=200, routes=20, seed=42, batch_size=1000):
+    """Replace the synthetic dataset with a freshly generated one.
+
+    The same seed always produces the same rows, so runs on different
+    machines or commits measure the same data.
+    """
+    rng = random.Random(seed)
+    sampler = _DistrictSampler(rng)
+
+    clear_dataset()
+    with transaction.atomic():
+        profile = get_bench_profile()
+        created = Building.objects.bulk_create(_make_buildings(sampler, rng, buildings), batch_size=batch_size)
+        ProfileBuilding.objects.bulk_create(
+            (ProfileBuilding(profile=profile, building=b) for b in created), batch_size=batch_size
+        )
+        Shops.objects.bulk_create(
+            (Shops(name=f'{BENCH_PREFIX}shop-{i}', category=rng.choice(SHOP_CATEGORIES), geometry=sampler.random_point())
+             for i in range(shops)),
+            batch_size=batch_size,
+        )
+        BusStop.objects.bulk_create(
+            (BusStop(name=f'{BENCH_PREFIX}stop-{i}', geometry=sampler.random_point()) for i in range(stops)),
+            batch_size=batch_size,
+        )
+        Route.objects.bulk_create((_make_route(sampler, rng, i) for i in range(routes)), batch_size=batch_size)
+        rebuild_stop_routes()
+        # bulk_create skips the save handlers that keep these up to date
+        record_building_changes([b.pk for b in created], BuildingChange.UPSERT)
+        refresh_nearest_pois([b.pk for b in created])
+        versioning.bump(versioning.POIS)
+
+    return {'buildings': len(created), 'shops': shops, 'stops': stops, 'routes': routes, 'seed': seed}
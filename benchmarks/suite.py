@@ -0,0 +1,294 @@
+"""Timing harness for the rentals hot paths.
+
+Each case is run `repeat` times after one warm-up call. Views are called
+in-process through DRF's APIRequestFactory, so the numbers cover view,
+database and rendering work but not the network. Cases that write
+(imports and shapefile loaders) run inside a transaction that is rolled
+back, leaving the database as it was. The `compression[...]` cases time
+each response encoder and level on a rendered GeoJSON listing and also
+report the compressed size, for comparing CPU cost against bytes saved.
+"""
+import csv
+import itertools
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from benchmarks.dataset import BENCH_USERNAME, get_bench_profile
+from rentals.api.v1 import views
+from rentals.compression import available_encodings, compress
+from rentals.loaders.bus_stop_loader import import_bus_stops
+from rentals.loaders.district_loader import import_districts
+from rentals.loaders.route_loader import import_routes
+from rentals.loaders.shops_loader import import_shops
+from rentals.models import Building, District
+
+User = get_user_model()
+
+# Levels benchmarked per response encoder (fast, default, slow)
+COMPRESSION_LEVELS = {'gzip': (1, 6, 9), 'br': (1, 4, 9), 'zstd': (1, 3, 9)}
+
+API_PREFIX = '/rentals/api/v1'
+
+# Filter parameters combined into every subset for building_list_create
+FILTER_PARTS = {
+    'district': lambda district: [('district', district)],
+    'price': lambda district: [('price_min', '20000'), ('price_max', '120000')],
+    'shops': lambda district: [('poi_type', 'shops'), ('poi_radius', '500')],
+    'bus_stop': lambda district: [('poi_type', 'bus_stop'), ('poi_radius', '500')],
+    'route': lambda district: [('poi_type', 'route'), ('poi_radius', '300')],
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_case(func, repeat=5, warmup=1):
+    """Call `func` repeatedly and return timing and query-count statistics (ms)."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    cpu_samples = []
+    queries = 0
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            cpu_start = time.process_time()
+            measured = func()
+            cpu_samples.append((time.process_time() - cpu_start) * 1000)
+            elapsed = time.perf_counter() - start
+        if isinstance(measured, tuple):
+            # Callables that exclude their own setup report (seconds, queries)
+            elapsed, queries = measured
+        else:
+            queries = len(ctx.captured_queries)
+        samples.append(elapsed * 1000)
+    return {
+        'runs': repeat,
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(_percentile(samples, 95), 3),
+        'min_ms': round(min(samples), 3),
+        'max_ms': round(max(samples), 3),
+        # CPU time of this (Python) process only; database work is excluded
+        'cpu_median_ms': round(statistics.median(cpu_samples), 3),
+        'queries': queries,
+    }
+
+
+def rolled_back(func, setup=None):
+    """Wrap `func` so its database writes (and those of `setup`) are undone.
+
+    The wrapper reports the time and query count of `func` alone, leaving
+    out the untimed `setup` step.
+    """
+    def wrapper():
+        measured = None
+        try:
+            with transaction.atomic():
+                if setup:
+                    setup()
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    func()
+                    measured = (time.perf_counter() - start, len(ctx.captured_queries))
+                raise _Rollback()
+        except _Rollback:
+            pass
+        return measured
+    return wrapper
+
+
+def _call_view(view, path, params=None, user=None, **kwargs):
+    request = APIRequestFactory().get(path, params or {})
+    if user is not None:
+        force_authenticate(request, user=user)
+    response = view(request, **kwargs)
+    response.render()
+    return response
+
+
+def _call_view_with_settings(overrides, view, path, params=None, **kwargs):
+    with override_settings(**overrides):
+        return _call_view(view, path, params, **kwargs)
+
+
+def _compression_case(body, encoding, level):
+    """Time compressing `body`; the callable's `report` holds the size it compresses to."""
+    def case():
+        compress(body, encoding, level)
+    compressed = len(compress(body, encoding, level))
+    case.report = {
+        'input_bytes': len(body),
+        'output_bytes': compressed,
+        'ratio': round(len(body) / compressed, 2) if compressed else None,
+    }
+    return case
+
+
+def _filter_cases(district_name):
+    cases = {}
+    names = list(FILTER_PARTS)
+    for size in range(len(names) + 1):
+        for combo in itertools.combinations(names, size):
+            params = []
+            for name in combo:
+                params.extend(FILTER_PARTS[name](district_name))
+            label = '+'.join(combo) or 'none'
+            cases[f'building_list_create[{label}]'] = params
+    return cases
+
+
+def _write_import_csv(path, rows=500):
+    buildings = Building.objects.select_related('district').order_by('id')[:rows]
+    with open(path, 'w', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(['title', 'county', 'district', 'address', 'latitude', 'longitude',
+                         'rental_price', 'num_bedrooms', 'num_bathrooms', 'square_meters',
+                         'pets_allowed', 'is_available', 'owner_contact', 'description', 'amenities'])
+        for b in buildings:
+            writer.writerow([b.title, b.county, b.district.name, b.address, b.location.y, b.location.x,
+                             b.rental_price, b.num_bedrooms, b.num_bathrooms, b.square_meters,
+                             b.pets_allowed, b.is_available, b.owner_contact, b.description, '["wifi"]'])
+
+
+def _ensure_import_user():
+    # import_buildings links rows to the 'admin' user; create it for the rolled-back run if missing
+    if not User.objects.filter(username='admin').exists():
+        User.objects.create_user(username='admin')
+
+
+def build_cases(import_rows=500):
+    """Return an ordered mapping of case name -> zero-argument callable."""
+    district = District.objects.filter(building__isnull=False).order_by('name').first()
+    if district is None:
+        raise ValueError('No buildings found. Run `python manage.py seed_benchmark_data` first.')
+    profile = get_bench_profile()
+    owner = profile.user
+
+    cases = {}
+    list_path = f'{API_PREFIX}/buildings/'
+    for name, params in _filter_cases(district.name).items():
+        cases[name] = lambda params=params: _call_view(views.building_list_create, list_path, params)
+
+    cases['building_list_create[geojson]'] = lambda: _call_view(
+        views.building_list_create, list_path, {'geojson': 'true'})
+    # Serialization CPU per page: DRF serializer vs PostgreSQL rendering (sql_geojson)
+    for page_size in (5, 20):
+        params = {'page_size': page_size}
+        cases[f'serialization[drf,page_size={page_size}]'] = lambda params=params: _call_view_with_settings(
+            {'RENTALS_SQL_GEOJSON': False}, views.building_list_create, list_path, params)
+        cases[f'serialization[sql,page_size={page_size}]'] = lambda params=params: _call_view_with_settings(
+            {'RENTALS_SQL_GEOJSON': True}, views.building_list_create, list_path, params)
+
+    # The suite runs with the page cache off so the cases above measure filtering and
+    # serialization; this one measures serving a page from it (the warmup fills it)
+    cases['page_cache[hit]'] = lambda: _call_view_with_settings(
+        {'RENTALS_PAGE_CACHE_TIMEOUT': 300}, views.building_list_create, list_path, {'page_size': 20})
+
+    body = _call_view(views.building_list_create, list_path, {'geojson': 'true'}).content
+    for encoding in available_encodings():
+        for level in COMPRESSION_LEVELS.get(encoding, ()):
+            cases[f'compression[{encoding}:{level}]'] = _compression_case(body, encoding, level)
+
+    cases['user_buildings'] = lambda: _call_view(
+        views.user_buildings, f'{API_PREFIX}/users/{owner.pk}/buildings/', user=owner, pk=owner.pk)
+    cases['user_buildings[geojson]'] = lambda: _call_view(
+        views.user_buildings, f'{API_PREFIX}/users/{owner.pk}/buildings/', {'geojson': 'true'}, user=owner, pk=owner.pk)
+
+    csv_path = os.path.join(tempfile.mkdtemp(prefix='rentals-bench-'), 'buildings.csv')
+    _write_import_csv(csv_path, rows=import_rows)
+    devnull = open(os.devnull, 'w')
+    cases[f'import_buildings[{import_rows}]'] = rolled_back(
+        lambda: call_command('import_buildings', source=csv_path, stdout=devnull),
+        setup=_ensure_import_user,
+    )
+
+    cases['loader:bus_stops'] = rolled_back(lambda: import_bus_stops(verbose=False))
+    cases['loader:routes'] = rolled_back(lambda: import_routes(verbose=False))
+    cases['loader:shops'] = rolled_back(lambda: import_shops(verbose=False))
+    # Districts are PROTECTed by buildings, so clear buildings inside the rolled-back transaction
+    cases['loader:districts'] = rolled_back(
+        lambda: import_districts(verbose=False), setup=lambda: Building.objects.all().delete())
+    return cases
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(repeat=5, only=None, stdout=None):
+    """Run every benchmark case (or those whose name contains `only`)."""
+    results = {}
+    with override_settings(ALLOWED_HOSTS=['*'], RENTALS_PAGE_CACHE_TIMEOUT=0):
+        cases = build_cases()
+        for name, func in cases.items():
+            if only and only not in name:
+                continue
+            loader_case = name.startswith('loader:') or name.startswith('import_buildings')
+            results[name] = time_case(func, repeat=1 if loader_case else repeat, warmup=0 if loader_case else 1)
+            results[name].update(getattr(func, 'report', {}))
+            if stdout is not None:
+                r = results[name]
+                line = f"{name:<60} median {r['median_ms']:>10.2f} ms  p95 {r['p95_ms']:>10.2f} ms  queries {r['queries']}"
+                if 'output_bytes' in r:
+                    line += f"  bytes {r['output_bytes']} (x{r['ratio']})"
+                stdout.write(line)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'database': connection.settings_dict.get('NAME'),
+            'buildings': Building.objects.count(),
+            'bench_user': BENCH_USERNAME,
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=0.15):
+    """Compare two result documents and return the cases that got slower.
+
+    A case regresses when its median grew by more than `threshold` (a
+    fraction) or when it issues more queries than before.
+    """
+    regressions = []
+    for name, new in current['results'].items():
+        old = baseline['results'].get(name)
+        if not old:
+            continue
+        ratio = new['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        if ratio > 1 + threshold or new['queries'] > old['queries']:
+            regressions.append({
+                'case': name,
+                'baseline_ms': old['median_ms'],
+                'current_ms': new['median_ms'],
+                'ratio': round(ratio, 3),
+                'baseline_queries': old['queries'],
+                'current_queries': new['queries'],
+            })
+    return regressions
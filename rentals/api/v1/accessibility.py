@@ -0,0 +1,88 @@
+"""Multi-ring POI accessibility profile of a building.
+
+For each POI type the profile gives, per ring radius, how many POIs lie
+within it and the nearest few. One distance-sorted list per type, fetched
+for the largest ring, answers every ring: the rings are nested, so the
+POIs within a ring are a prefix of that list. The lists go through the
+nearby-POI cache (rentals/poi_cache.py), so a profile costs at most one
+spatial query per type and none once the building's lists are cached,
+shared with the list endpoint's `nearby_pois`.
+
+Each type also carries the distance to its nearest POI from the
+precomputed building columns (rentals/proximity.py), which is known even
+when nothing lies within the rings.
+"""
+import math
+
+from django.conf import settings
+
+from rentals.api.v1.query_guard import POI_TYPES, max_radii
+from rentals.poi_cache import nearby_pois
+
+DEFAULT_RINGS = (250, 500, 1000)
+DEFAULT_NEAREST = 3
+MAX_NEAREST = 10
+
+# POI type -> (response key, precomputed nearest-distance column)
+PROFILE_FIELDS = {
+    'shops': ('shops', 'nearest_shop_m'),
+    'bus_stop': ('bus_stops', 'nearest_stop_m'),
+    'route': ('routes', 'nearest_route_m'),
+}
+
+
+class InvalidProfileRequest(ValueError):
+    """The rings or nearest parameters cannot be used."""
+
+
+def parse_rings(value):
+    """Sorted, distinct ring radii (metres) from a comma-separated list; DEFAULT_RINGS when empty."""
+    if not value or not value.strip():
+        return list(DEFAULT_RINGS)
+    try:
+        rings = sorted({float(part) for part in value.split(',') if part.strip()})
+    except ValueError:
+        raise InvalidProfileRequest('rings must be a comma-separated list of radii in metres.')
+    if not rings or rings[0] <= 0 or not all(math.isfinite(ring) for ring in rings):
+        raise InvalidProfileRequest('rings must be positive numbers.')
+    max_rings = getattr(settings, 'RENTALS_ACCESSIBILITY_MAX_RINGS', 5)
+    if len(rings) > max_rings:
+        raise InvalidProfileRequest(f'At most {max_rings} rings are allowed.')
+    # Every type is searched up to the largest ring, so the tightest per-type cap applies
+    max_radius = min(max_radii().values())
+    if rings[-1] > max_radius:
+        raise InvalidProfileRequest(f'rings must be at most {max_radius} m.')
+    return [int(ring) if ring.is_integer() else ring for ring in rings]
+
+
+def parse_nearest(value):
+    """How many nearest POIs to list per ring."""
+    if not value or not value.strip():
+        return DEFAULT_NEAREST
+    try:
+        nearest = int(value)
+    except ValueError:
+        raise InvalidProfileRequest('nearest must be an integer.')
+    if not 0 <= nearest <= MAX_NEAREST:
+        raise InvalidProfileRequest(f'nearest must be between 0 and {MAX_NEAREST}.')
+    return nearest
+
+
+def accessibility_profile(building, rings, nearest, query):
+    """Build the profile of `building`.
+
+    `query(building, poi_type, radius_m)` returns `(distance, entry)` pairs
+    nearest first, as for the list endpoint; it runs on cache misses only.
+    """
+    profile = {'id': building.pk, 'rings': rings}
+    for poi_type in POI_TYPES:
+        key, nearest_field = PROFILE_FIELDS[poi_type]
+        entries = nearby_pois(building, poi_type, rings[-1], lambda radius: query(building, poi_type, radius))
+        within = 0
+        ring_profiles = []
+        for ring in rings:
+            while within < len(entries) and entries[within]['distance_m'] <= ring:
+                within += 1
+            ring_profiles.append({'radius_m': ring, 'count': within, 'nearest': entries[:min(within, nearest)]})
+        profile[key] = {'nearest_m': getattr(building, nearest_field), 'rings': ring_profiles}
+    return profile
@@ -0,0 +1,90 @@
+"""Search area drawn on the map: a GeoJSON polygon posted to `buildings/search/`.
+
+The polygon is validated and reduced before it reaches the query:
+
+1. it must be a Polygon or MultiPolygon (bare, or as a Feature's geometry)
+   of at most `RENTALS_AREA_MAX_INPUT_VERTICES` WGS84 coordinates;
+2. self-intersections, common in freehand drawings, are repaired with
+   GEOS `MakeValid`;
+3. it is simplified (topology preserved) with `RENTALS_AREA_SIMPLIFY_TOLERANCE`
+   degrees, doubled until it has at most `RENTALS_AREA_MAX_VERTICES`
+   vertices, so a shaky hand-drawn outline costs no more than a clean one.
+
+The view then filters `ST_Intersects(location, area)`, which PostgreSQL
+answers from the GiST index on `location` (bounding-box overlap) before
+testing the remaining buildings exactly. The area is a constant of the
+statement, so PostGIS prepares it once (its edge tree is cached) rather
+than per row.
+
+Pages are cached like list pages (page_cache.py), with the area's
+`canonical_area` text hashed into the key: the same outline drawn from
+another starting vertex or in the other direction shares the entry.
+"""
+import json
+
+from django.conf import settings
+from django.contrib.gis.gdal import GDALException
+from django.contrib.gis.geos import GEOSException, GEOSGeometry, WKTWriter
+
+AREA_TYPES = ('Polygon', 'MultiPolygon')
+
+DEFAULT_MAX_INPUT_VERTICES = 10000
+DEFAULT_MAX_VERTICES = 500
+DEFAULT_SIMPLIFY_TOLERANCE = 0.00005
+
+# Tolerance doublings tried before an area is refused as too detailed
+MAX_SIMPLIFY_ROUNDS = 8
+
+# Coordinates in cache keys are rounded to about 0.1 m
+KEY_PRECISION = 6
+
+
+class InvalidArea(ValueError):
+    """The posted area cannot be used as a search polygon."""
+
+
+def parse_area(data):
+    """The search polygon of a request body, validated and simplified (SRID 4326)."""
+    if isinstance(data, dict) and data.get('type') == 'Feature':
+        data = data.get('geometry')
+    if not isinstance(data, dict) or data.get('type') not in AREA_TYPES:
+        raise InvalidArea('The body must be a GeoJSON Polygon or MultiPolygon.')
+    try:
+        area = GEOSGeometry(json.dumps(data))
+    except (GDALException, GEOSException, TypeError, ValueError):
+        raise InvalidArea('The polygon is not valid GeoJSON.')
+    area.srid = 4326
+
+    max_input = getattr(settings, 'RENTALS_AREA_MAX_INPUT_VERTICES', DEFAULT_MAX_INPUT_VERTICES)
+    if area.num_coords > max_input:
+        raise InvalidArea(f'The polygon may have at most {max_input} vertices.')
+    if area.empty:
+        raise InvalidArea('The polygon is empty.')
+    min_x, min_y, max_x, max_y = area.extent
+    if min_x < -180 or max_x > 180 or min_y < -90 or max_y > 90:
+        raise InvalidArea('Coordinates must be longitude, latitude in degrees.')
+
+    if not area.valid:
+        area = area.make_valid()
+        if area.geom_type not in AREA_TYPES:
+            raise InvalidArea('The polygon must enclose an area.')
+    if not area.area:
+        raise InvalidArea('The polygon must enclose an area.')
+    return _simplify(area)
+
+
+def _simplify(area):
+    max_vertices = getattr(settings, 'RENTALS_AREA_MAX_VERTICES', DEFAULT_MAX_VERTICES)
+    tolerance = getattr(settings, 'RENTALS_AREA_SIMPLIFY_TOLERANCE', DEFAULT_SIMPLIFY_TOLERANCE)
+    for _ in range(MAX_SIMPLIFY_ROUNDS + 1):
+        simplified = area.simplify(tolerance, preserve_topology=True)
+        if simplified.num_coords <= max_vertices and not simplified.empty:
+            simplified.srid = 4326
+            return simplified
+        tolerance *= 2
+    raise InvalidArea(f'The polygon is too detailed; draw it with at most {max_vertices} vertices.')
+
+
+def canonical_area(area):
+    """Text identifying `area` whatever its starting vertex and ring direction."""
+    return WKTWriter(precision=KEY_PRECISION, trim=True).write(area.normalize(clone=True)).decode()
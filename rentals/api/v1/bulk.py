@@ -0,0 +1,203 @@
+"""Set-based bulk create/update of buildings.
+
+`bulk_upsert` validates a whole batch with a fixed number of queries: one
+for the districts named in the batch, one for the buildings being updated
+and one `ST_Contains` join checking every location against its district.
+The batch is then written with `bulk_create`/`bulk_update`, one
+`ProfileBuilding` insert and one change-log insert, so the query count does
+not grow with the number of items.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from rentals.api.v1.serializers import BuildingBulkItemSerializer
+from rentals.changelog import record_building_changes
+from rentals.models import Building, BuildingChange, District, ProfileBuilding
+from rentals.proximity import refresh_nearest_pois
+
+DEFAULT_MAX_ITEMS = 5000
+
+CONTAINMENT_SQL = f"""
+SELECT v.idx, d.name, ST_Contains(d.geometry::geometry, ST_SetSRID(ST_MakePoint(v.lon, v.lat), 4326))
+FROM unnest(%s::int[], %s::bigint[], %s::float8[], %s::float8[]) AS v(idx, district_id, lon, lat)
+JOIN {District._meta.db_table} d ON d.id = v.district_id
+"""
+
+NOT_FOUND = 'Building not found or you do not have permission to modify it.'
+
+
+class BulkPayloadError(ValueError):
+    """The request body is not a batch of buildings."""
+
+
+def parse_items(data):
+    """Normalise the request body to a list of building dicts.
+
+    Accepts a list of buildings, `{"buildings": [...]}` or a GeoJSON
+    FeatureCollection of Points (properties are the building fields; the
+    feature id, if any, selects the building to update).
+    """
+    if isinstance(data, dict) and data.get('type') == 'FeatureCollection':
+        items = [_feature_to_item(feature) for feature in data.get('features') or []]
+    elif isinstance(data, dict):
+        items = data.get('buildings')
+    else:
+        items = data
+    if not isinstance(items, list):
+        raise BulkPayloadError('Expected a list of buildings, {"buildings": [...]} or a GeoJSON FeatureCollection.')
+    if not items:
+        raise BulkPayloadError('No buildings given.')
+    max_items = getattr(settings, 'RENTALS_BULK_MAX_ITEMS', DEFAULT_MAX_ITEMS)
+    if len(items) > max_items:
+        raise BulkPayloadError(f'At most {max_items} buildings can be sent at once.')
+    return items
+
+
+def _feature_to_item(feature):
+    if not isinstance(feature, dict):
+        return feature
+    item = dict(feature.get('properties') or {})
+    if feature.get('id') is not None:
+        item.setdefault('id', feature['id'])
+    geometry = feature.get('geometry')
+    if isinstance(geometry, dict) and geometry.get('type') == 'Point' and len(geometry.get('coordinates') or []) >= 2:
+        lon, lat = geometry['coordinates'][:2]
+        # BuildingSerializer takes locations as "lat,lon"
+        item['location'] = f'{lat},{lon}'
+    elif geometry is not None:
+        item['location'] = 'not a point'
+    return item
+
+
+def _validate_fields(items):
+    """Run the per-field serializer checks; return ({index: attrs}, {index: errors})."""
+    # One serializer per kind, reused for every item, so fields are built once
+    creating = BuildingBulkItemSerializer()
+    updating = BuildingBulkItemSerializer(partial=True)
+    validated, errors = {}, {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = {'non_field_errors': ['Expected an object.']}
+            continue
+        serializer = updating if item.get('id') is not None else creating
+        try:
+            validated[index] = serializer.run_validation(item)
+        except serializers.ValidationError as e:
+            errors[index] = serializers.as_serializer_error(e)
+    return validated, errors
+
+
+def _containment_failures(checks):
+    """Run one ST_Contains join for {index: (district_id, point)}; return {index: district name or None}."""
+    if not checks:
+        return {}
+    indexes = list(checks)
+    with connection.cursor() as cursor:
+        cursor.execute(CONTAINMENT_SQL, [
+            indexes,
+            [checks[i][0] for i in indexes],
+            [checks[i][1].x for i in indexes],
+            [checks[i][1].y for i in indexes],
+        ])
+        rows = {idx: (name, contained) for idx, name, contained in cursor.fetchall()}
+    failures = {}
+    for index in indexes:
+        name, contained = rows.get(index, (None, False))
+        if not contained:
+            failures[index] = name
+    return failures
+
+
+def bulk_upsert(items, profile_id, is_staff=False, partial=False):
+    """Validate and write a batch; return (created, updated, errors).
+
+    `created`/`updated` are `{"index", "id"}` entries and `errors` are
+    `{"index", "errors"}` entries, all in request order. Unless `partial` is
+    set nothing is written when any item is invalid. Updates are limited to
+    buildings linked to `profile_id` unless `is_staff`.
+    """
+    validated, errors = _validate_fields(items)
+
+    names = {attrs['district'] for attrs in validated.values() if 'district' in attrs}
+    district_ids = dict(District.objects.filter(name__in=names).values_list('name', 'id')) if names else {}
+
+    update_ids = [attrs['id'] for attrs in validated.values() if 'id' in attrs]
+    existing = {}
+    if update_ids:
+        queryset = Building.objects.filter(id__in=update_ids)
+        if not is_staff:
+            queryset = queryset.filter(profiles__id=profile_id)
+        existing = {building.id: building for building in queryset}
+
+    checks = {}
+    seen_ids = set()
+    for index, attrs in validated.items():
+        building_id = attrs.get('id')
+        if building_id is not None:
+            if building_id not in existing:
+                errors[index] = {'id': [NOT_FOUND]}
+                continue
+            if building_id in seen_ids:
+                errors[index] = {'id': ['Building appears more than once in this batch.']}
+                continue
+            seen_ids.add(building_id)
+        if 'district' in attrs and attrs['district'] not in district_ids:
+            errors[index] = {'district': [f"Object with name={attrs['district']} does not exist."]}
+            continue
+        if building_id is None or 'district' in attrs or 'location' in attrs:
+            current = existing.get(building_id)
+            district_id = district_ids[attrs['district']] if 'district' in attrs else current.district_id
+            location = attrs.get('location') or current.location
+            checks[index] = (district_id, location)
+
+    for index, district_name in _containment_failures(checks).items():
+        errors[index] = {'location': [
+            f'Based on your district selection, the building location must be within {district_name} district boundary. '
+            'Please check your district and building coordinate data.'
+        ]}
+
+    error_list = [{'index': index, 'errors': errors[index]} for index in sorted(errors)]
+    if errors and not partial:
+        return [], [], error_list
+
+    creates, updates, update_fields = [], [], set()
+    now = timezone.now()
+    for index, attrs in sorted(validated.items()):
+        if index in errors:
+            continue
+        fields = {key: value for key, value in attrs.items() if key not in ('id', 'district')}
+        if 'district' in attrs:
+            fields['district_id'] = district_ids[attrs['district']]
+        if attrs.get('id') is None:
+            creates.append((index, Building(**fields)))
+        else:
+            building = existing[attrs['id']]
+            for key, value in fields.items():
+                setattr(building, key, value)
+            # bulk_update does not run auto_now
+            building.updated_at = now
+            update_fields.update('district' if key == 'district_id' else key for key in fields)
+            updates.append((index, building))
+
+    with transaction.atomic():
+        if creates:
+            Building.objects.bulk_create([building for _, building in creates])
+            ProfileBuilding.objects.bulk_create(
+                [ProfileBuilding(profile_id=profile_id, building_id=building.id) for _, building in creates]
+            )
+        if updates:
+            Building.objects.bulk_update([building for _, building in updates], sorted(update_fields | {'updated_at'}))
+        # bulk writes skip the save handlers that maintain the change log and nearest POIs
+        changed = [building.id for _, building in creates + updates]
+        if changed:
+            record_building_changes(changed, BuildingChange.UPSERT)
+        located = [building.id for _, building in creates]
+        if 'location' in update_fields:
+            located += [building.id for _, building in updates]
+        refresh_nearest_pois(located)
+
+    created = [{'index': index, 'id': building.id} for index, building in creates]
+    updated = [{'index': index, 'id': building.id} for index, building in updates]
+    return created, updated, error_list
@@ -0,0 +1,101 @@
+"""Conditional GET (ETag) for the building read endpoints.
+
+ETags are derived from version counters, not from the response body, so a
+revalidation (`If-None-Match`) is answered with 304 before the view runs
+its main query or serializes anything:
+
+- collections (list, map layer, export): the newest final building
+  change-log position (every create, update and delete appends an entry,
+  see changelog.py; a change committed late still moves it), the POI
+  and district dataset versions, and a signature of the query parameters
+  and negotiated media type;
+- `building_detail`: the building's `updated_at` and the POI and district
+  dataset versions, read with one primary-key lookup.
+
+The change-log position and dataset versions are memoised per process, so a
+collection revalidation usually runs no query at all.
+
+No Last-Modified is sent: a POI or district reload changes the responses
+without moving any timestamp the endpoints have, and two building changes
+within one second share an HTTP date, so `If-Modified-Since` alone would
+get wrong 304s.
+
+Anonymous responses are marked `public` so shared caches may keep them;
+authenticated ones `private`. Both must be revalidated once older than
+`RENTALS_API_CACHE_MAX_AGE` seconds, and vary on Authorization and Accept.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from rentals import metrics, versioning
+from rentals.changelog import latest_position
+from rentals.models import Building
+
+
+def _etag(*parts):
+    return '"' + hashlib.sha1(repr(parts).encode()).hexdigest() + '"'
+
+
+def query_signature(request):
+    """Canonical form of the query string plus the negotiated media type."""
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    return params, getattr(request, 'accepted_media_type', None)
+
+
+def collection_validators(request, *args, **kwargs):
+    return _etag(
+        'buildings', latest_position(), versioning.get_version(versioning.POIS),
+        versioning.get_version(versioning.DISTRICTS), query_signature(request), args, sorted(kwargs.items()),
+    )
+
+
+def detail_validators(request, pk):
+    row = Building.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if row is None:
+        # Let the view answer 404
+        return None
+    # A POI reload refreshes the nearest-POI columns without touching updated_at
+    return _etag('building', pk, row, versioning.get_version(versioning.POIS),
+                 versioning.get_version(versioning.DISTRICTS), query_signature(request))
+
+
+def patch_caching_headers(request, response):
+    anonymous = not (request.user and request.user.is_authenticated)
+    max_age = getattr(settings, 'RENTALS_API_CACHE_MAX_AGE', 0)
+    if anonymous:
+        patch_cache_control(response, public=True, max_age=max_age, must_revalidate=True)
+    else:
+        patch_cache_control(response, private=True, max_age=max_age, must_revalidate=True)
+    patch_vary_headers(response, ('Accept', 'Authorization'))
+
+
+def conditional_get(validators):
+    """Decorate a DRF function view so GET/HEAD honour ETags.
+
+    `validators(request, *args, **kwargs)` returns the etag; None skips the
+    conditional handling. Only 200 responses get an ETag; errors pass
+    through untouched.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            etag = validators(request, *args, **kwargs)
+            if etag is None:
+                return view(request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                metrics.increment('conditional.not_modified', view=view.__name__)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            patch_caching_headers(request, response)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,150 @@
+"""Cache of rendered building list pages.
+
+Popular filter combinations (a district, a price band, a bus stop within
+500 m) are served from the Django cache instead of rerunning the spatial
+filter, the page query and the nearby-POI lookups. A page is stored as the
+JSON body the view would send, `nearby_pois` included, minus its `next`
+and `previous` links: those carry the query string as the client wrote
+it, so they are rebuilt from each request when the page is served.
+
+Keys are built from the *canonical* query: parameters that do not change
+the result (unknown ones, `format`, a default page or page size) are
+dropped, and numbers and dates are normalised, so `?price_min=20000` and
+`?price_min=20000.0&page=1` share an entry. Keys also embed the final
+building change-log position (changelog.latest_position, which moves even
+when a change commits late) and the POI and district dataset versions;
+any change to the data moves every key at once, and entries built from
+the old data are never read again and simply expire.
+
+When several requests miss the same key at once, only one computes the
+page: misses go through rentals.singleflight, across workers too.
+"""
+import hashlib
+import json
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rentals import metrics, singleflight, versioning
+from rentals.api.v1.pagination import CustomPagination, building_ordering
+from rentals.api.v1.query_guard import poi_filter_pairs
+from rentals.changelog import latest_position
+from rentals.middleware import timed_section
+from rentals.proximity import NEAREST_DISTANCE_FILTERS
+from rentals.transit import origin_cell
+
+def _number(value):
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def canonical_params(request):
+    """The list parameters that affect the page, in a fixed order and form."""
+    query_params = request.query_params
+    params = {}
+    district = (query_params.get('district') or '').strip()
+    if district:
+        params['district'] = district
+    for name in ('price_min', 'price_max'):
+        value = (query_params.get(name) or '').strip()
+        if value and _number(value) is not None:
+            params[name] = _number(value)
+    for name in NEAREST_DISTANCE_FILTERS:
+        value = (query_params.get(name) or '').strip()
+        if value and _number(value) is not None:
+            params[name] = _number(value)
+    # Origins in one grid cell share their reachable stops, and so their pages
+    cell = origin_cell(query_params)
+    if cell is not None:
+        params['reachable_from'] = list(cell)
+    ordering = building_ordering(query_params)
+    if ordering is not None:
+        params['ordering'] = ordering[0]
+    available = (query_params.get('available') or '').strip().lower()
+    if available in ('true', 'false'):
+        params['available'] = available
+    available_by = (query_params.get('available_by') or '').strip()
+    if available_by:
+        try:
+            params['available_by'] = date.fromisoformat(available_by).isoformat()
+        except ValueError:
+            pass
+    # Pair order is kept: with a type given twice, the last radius picks its nearby_pois
+    pairs = poi_filter_pairs(query_params)
+    if pairs:
+        params['poi'] = [[poi_type, repr(radius_m)] for poi_type, radius_m in pairs]
+    paginator = CustomPagination()
+    page = (query_params.get(paginator.page_query_param) or '1').strip()
+    if page != '1':
+        params['page'] = page
+    page_size = paginator.get_page_size(request)
+    if page_size != paginator.page_size:
+        params['page_size'] = page_size
+    return params
+
+
+def page_key(request, area=None):
+    """Cache key of the list page `request` asks for, or None when it is not cacheable.
+
+    Only compact JSON is cached; the browsable API and indented responses
+    are rendered per request. `area` is the canonical text of an area
+    search polygon (area_search.canonical_area).
+    """
+    if not getattr(settings, 'RENTALS_PAGE_CACHE_TIMEOUT', 300):
+        return None
+    if request.accepted_renderer.format != 'json' or 'indent' in request.accepted_media_type:
+        return None
+    xact_id, change_id = latest_position()
+    pois = versioning.get_version(versioning.POIS)
+    districts = versioning.get_version(versioning.DISTRICTS)
+    parts = [request.path, canonical_params(request)]
+    if area is not None:
+        parts.append(area)
+    raw = json.dumps(parts)
+    digest = hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+    return f'rentals:page:{xact_id}.{change_id}:{pois}:{districts}:{digest}'
+
+
+def get_or_compute(key, compute):
+    """Return the cached body under `key`, calling `compute()` (-> bytes) on a miss."""
+    with timed_section('page_cache'):
+        content = cache.get(key)
+    if content is not None:
+        metrics.increment('page_cache.hit')
+        return content
+    metrics.increment('page_cache.miss')
+
+    def compute_and_store():
+        content = compute()
+        cache.set(key, content, getattr(settings, 'RENTALS_PAGE_CACHE_TIMEOUT', 300))
+        return content
+
+    # Pages live in the shared cache anyway, so misses are coalesced across workers too
+    return singleflight.coalesce(key, compute_and_store, name='building_page', shared=True)
+
+
+def get_page(request, key, compute):
+    """The list page under `key` with pagination links for `request`.
+
+    `compute()` renders the page (-> bytes) on a miss; the entry keeps the
+    count and results only.
+    """
+    count, results = get_or_compute(key, lambda: _split_links(compute()))
+    paginator = CustomPagination()
+    # The count alone is enough to page through: links need the page numbers only
+    paginator.paginate_queryset(range(count), request)
+    envelope = json.dumps({
+        'count': count,
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+    }, ensure_ascii=False, separators=(',', ':'))
+    return envelope[:-1].encode() + results
+
+
+def _split_links(content):
+    """(count, `,"results":...}` tail) of a rendered page; the links before the tail are dropped."""
+    head, separator, results = content.partition(b',"results":')
+    return json.loads(head + b'}')['count'], separator + results
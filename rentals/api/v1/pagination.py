@@ -4,4 +4,18 @@ class CustomPagination(PageNumberPagination):
     page_size = 5
     max_page_size = 20
     page_size_query_param = 'page_size'
-    page_query_param = 'page'
\ No newline at end of file
+    page_query_param = 'page'
+
+# Columns `?ordering=` accepts, all B-tree indexed; a leading '-' sorts
+# descending. id breaks ties, so pages neither overlap nor skip rows.
+ORDERING_FIELDS = ('rental_price', 'nearest_stop_m', 'nearest_shop_m', 'nearest_route_m')
+
+
+def building_ordering(query_params):
+    """The `ordering` parameter as order_by() arguments, or None when absent or unknown."""
+    value = (query_params.get('ordering') or '').strip()
+    descending = value.startswith('-')
+    field = value[1:] if descending else value
+    if field not in ORDERING_FIELDS:
+        return None
+    return (f'-{field}', '-id') if descending else (field, 'id')
@@ -0,0 +1,190 @@
+"""Admission control for building queries with proximity (POI) filters.
+
+Every `poi_type`/`poi_radius` pair adds an `ST_DWithin` probe per candidate
+building, and the work grows with the radius (and is far higher for route
+lines than for points). Before such a query runs:
+
+1. each radius is capped per POI type and the number of pairs is capped;
+2. its cost is estimated as the larger of the planner's `EXPLAIN` total cost
+   and a radius heuristic (`RENTALS_POI_COST_PER_METRE` x radius), since the
+   planner prices an index probe the same whatever the radius;
+3. queries above `RENTALS_MAX_QUERY_COST` are refused, and queries above
+   `RENTALS_HEAVY_QUERY_COST` need one of `RENTALS_HEAVY_QUERY_CONCURRENCY`
+   per-worker slots, waiting at most `RENTALS_HEAVY_QUERY_WAIT_SECONDS`
+   before getting 503 with Retry-After.
+
+Every decision is counted in rentals.metrics.
+"""
+import json
+import threading
+
+from django.conf import settings
+from rest_framework import status
+
+from rentals import metrics
+
+POI_TYPES = ('shops', 'bus_stop', 'route')
+
+DEFAULT_MAX_RADIUS = {'shops': 5000, 'bus_stop': 5000, 'route': 2000}
+DEFAULT_COST_PER_METRE = {'shops': 20, 'bus_stop': 20, 'route': 200}
+
+
+class QueryRejected(Exception):
+    """The query was refused; carries the HTTP status to answer with."""
+
+    def __init__(self, reason, message, status_code, retry_after=None):
+        super().__init__(message)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def poi_filter_pairs(query_params):
+    """Return the (poi_type, radius_m) pairs the building filters apply.
+
+    Incomplete, non-numeric, non-positive or unknown pairs are skipped, and
+    nothing is applied unless types and radii come in equal numbers.
+    """
+    poi_types = query_params.getlist('poi_type')
+    poi_radii = query_params.getlist('poi_radius')
+    if not poi_types or len(poi_types) != len(poi_radii):
+        return []
+    pairs = []
+    for poi_type, poi_radius in zip(poi_types, poi_radii):
+        if poi_type not in POI_TYPES or not poi_radius or not poi_radius.strip():
+            continue
+        try:
+            radius_m = float(poi_radius)
+        except (ValueError, TypeError):
+            continue
+        if radius_m > 0:
+            pairs.append((poi_type, radius_m))
+    return pairs
+
+
+def max_radii():
+    """Radius cap per POI type: `RENTALS_POI_MAX_RADIUS` over the defaults."""
+    return {**DEFAULT_MAX_RADIUS, **getattr(settings, 'RENTALS_POI_MAX_RADIUS', {})}
+
+
+def check_limits(pairs):
+    max_pairs = getattr(settings, 'RENTALS_POI_MAX_FILTERS', 3)
+    if len(pairs) > max_pairs:
+        raise QueryRejected('pair_limit', f'At most {max_pairs} poi_type/poi_radius filters are allowed.',
+                            status.HTTP_400_BAD_REQUEST)
+    max_radius = max_radii()
+    for poi_type, radius_m in pairs:
+        if radius_m > max_radius[poi_type]:
+            raise QueryRejected('radius_limit', f'poi_radius for {poi_type} must be at most {max_radius[poi_type]} m.',
+                                status.HTTP_400_BAD_REQUEST)
+
+
+def planner_cost(queryset):
+    """Total cost of the query's plan as estimated by PostgreSQL."""
+    return json.loads(queryset.explain(format='json'))['Plan']['Total Cost']
+
+
+def estimate_cost(queryset, pairs):
+    per_metre = {**DEFAULT_COST_PER_METRE, **getattr(settings, 'RENTALS_POI_COST_PER_METRE', {})}
+    radius_cost = sum(per_metre[poi_type] * radius_m for poi_type, radius_m in pairs)
+    return max(planner_cost(queryset), radius_cost)
+
+
+class _HeavyQuerySlots:
+    """Per-worker semaphore bounding concurrently running heavy queries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._semaphore = None
+        self._size = None
+        self.in_flight = 0
+
+    def _current(self):
+        size = getattr(settings, 'RENTALS_HEAVY_QUERY_CONCURRENCY', 4)
+        with self._lock:
+            if size != self._size:
+                self._semaphore = threading.BoundedSemaphore(size)
+                self._size = size
+            return self._semaphore
+
+    def acquire(self):
+        semaphore = self._current()
+        if not semaphore.acquire(timeout=getattr(settings, 'RENTALS_HEAVY_QUERY_WAIT_SECONDS', 0.5)):
+            return None
+        with self._lock:
+            self.in_flight += 1
+        return semaphore
+
+    def release(self, semaphore):
+        with self._lock:
+            self.in_flight -= 1
+        semaphore.release()
+
+
+heavy_query_slots = _HeavyQuerySlots()
+metrics.register_gauge('query_guard.heavy_in_flight', lambda: heavy_query_slots.in_flight)
+
+
+class Admission:
+    """Permission to run a query; holds a heavy-query slot until released."""
+
+    def __init__(self, semaphore=None):
+        self._semaphore = semaphore
+
+    def release(self):
+        if self._semaphore is not None:
+            heavy_query_slots.release(self._semaphore)
+            self._semaphore = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def stream(self, iterable):
+        """Wrap streaming response content so the slot is held until the response is closed."""
+        return _ReleasingIterable(iterable, self)
+
+
+class _ReleasingIterable:
+    def __init__(self, iterable, admission):
+        self._iterable = iterable
+        self._admission = admission
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        # Django closes streaming content once the response is done or aborted
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            self._admission.release()
+
+
+def admit_building_query(queryset, query_params):
+    """Admit the filtered building `queryset` or raise QueryRejected."""
+    pairs = poi_filter_pairs(query_params)
+    if not pairs:
+        return Admission()
+    try:
+        check_limits(pairs)
+        cost = estimate_cost(queryset, pairs)
+        if cost > getattr(settings, 'RENTALS_MAX_QUERY_COST', 5000000):
+            raise QueryRejected('cost_limit', 'Proximity filters are too expensive; use smaller radii or fewer filters.',
+                                status.HTTP_400_BAD_REQUEST)
+        if cost <= getattr(settings, 'RENTALS_HEAVY_QUERY_COST', 100000):
+            metrics.increment('query_guard.admitted', cost_class='light')
+            return Admission()
+        semaphore = heavy_query_slots.acquire()
+        if semaphore is None:
+            raise QueryRejected('concurrency_limit', 'Too many expensive searches are running; try again shortly.',
+                                status.HTTP_503_SERVICE_UNAVAILABLE,
+                                retry_after=getattr(settings, 'RENTALS_HEAVY_QUERY_RETRY_AFTER', 2))
+    except QueryRejected as e:
+        metrics.increment('query_guard.rejected', reason=e.reason)
+        raise
+    metrics.increment('query_guard.admitted', cost_class='heavy')
+    return Admission(semaphore)
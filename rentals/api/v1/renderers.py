@@ -0,0 +1,38 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class PassthroughRenderer(BaseRenderer):
+    """Renderer for binary export formats.
+
+    It only exists so content negotiation (`?format=` or a `.ext` suffix)
+    accepts the format; the view streams the export body itself. Error
+    payloads are still rendered as JSON.
+    """
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (dict, list)):
+            return json.dumps(data).encode('utf-8')
+        return data
+
+
+class FlatGeobufRenderer(PassthroughRenderer):
+    media_type = 'application/flatgeobuf'
+    format = 'fgb'
+
+
+class GeoParquetRenderer(PassthroughRenderer):
+    media_type = 'application/vnd.apache.parquet'
+    format = 'parquet'
+
+
+class ArrowStreamRenderer(PassthroughRenderer):
+    media_type = 'application/vnd.apache.arrow.stream'
+    format = 'arrow'
+
+
+class CSVExportRenderer(PassthroughRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
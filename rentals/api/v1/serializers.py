@@ -178,6 +178,23 @@ class BuildingSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
     
+class BuildingBulkItemSerializer(BuildingSerializer):
+    """One item of a bulk create/update (rentals/api/v1/bulk.py).
+
+    Runs the per-field checks of BuildingSerializer only: the district is
+    taken by name and district lookup and containment are validated for the
+    whole batch at once. Items with an `id` update that building.
+    """
+    id = serializers.IntegerField(required=False, min_value=1)
+    district = serializers.CharField(max_length=100)
+
+    class Meta(BuildingSerializer.Meta):
+        fields = [field for field in BuildingSerializer.Meta.fields if field != 'image']
+
+    def validate(self, attrs):
+        return attrs
+
+
 class BuildingGeoSerializer(serializers.ModelSerializer):
     """Full GeoJSON Feature serializer for building detail responses.
     
@@ -217,6 +234,9 @@ class BuildingGeoSerializer(serializers.ModelSerializer):
             'image': instance.image.name if instance.image else None,
             'description': instance.description,
             'owner_contact': instance.owner_contact,
+            'nearest_stop_m': instance.nearest_stop_m,
+            'nearest_shop_m': instance.nearest_shop_m,
+            'nearest_route_m': instance.nearest_route_m,
             'nearby_pois': instance.nearby_pois if hasattr(instance, 'nearby_pois') else None
         }
 
@@ -0,0 +1,87 @@
+"""Render building GeoJSON Features directly in PostgreSQL.
+
+This is the fast path for read-only building responses: instead of
+instantiating models, `json.loads`-ing the `AsGeoJSON` annotation and having
+DRF `json.dumps` everything again, the database returns the final JSON text
+and the view sends it as-is.
+
+The output is byte-for-byte what `BuildingGeoSerializer` + DRF's compact
+`JSONRenderer` produce. That rules out `json_build_object`/`jsonb_agg`, whose
+text form puts spaces around separators (and, for jsonb, reorders keys), so
+Features are concatenated from the `rentals_json_*` SQL helpers created in
+migration 0003, which mirror Python's encoding of each value type:
+
+- strings: `to_json`, plus DRF's escaping of U+2028/U+2029
+- decimals: rendered as Python floats (`1200.0`, `1234.5`)
+- the `amenities` jsonb: re-encoded compactly with jsonb key order, which is
+  the order Django's JSONField decodes it in
+- geometry: `ST_AsGeoJSON` output, identical to `AsGeoJSON('location')`
+"""
+import json
+
+from django.db import connection
+
+from rentals.models import Building, District
+
+FEATURE_SQL = """
+'{"type":"Feature","id":' || b.id
+|| ',"geometry":' || coalesce(ST_AsGeoJSON(b.location, 8, 0), 'null')
+|| ',"properties":{"id":' || b.id
+|| ',"title":' || rentals_json_string(b.title)
+|| ',"county":' || rentals_json_string(b.county)
+|| ',"district":' || rentals_json_string(d.name)
+|| ',"address":' || rentals_json_string(b.address)
+|| ',"rental_price":' || rentals_json_float(b.rental_price::float8)
+|| ',"num_bedrooms":' || coalesce(b.num_bedrooms::text, 'null')
+|| ',"num_bathrooms":' || coalesce(b.num_bathrooms::text, 'null')
+|| ',"square_meters":' || rentals_json_float(b.square_meters::float8)
+|| ',"amenities":' || rentals_json_compact(b.amenities)
+|| ',"image":' || rentals_json_string(nullif(b.image, ''))
+|| ',"description":' || rentals_json_string(b.description)
+|| ',"owner_contact":' || rentals_json_string(b.owner_contact)
+|| ',"nearest_stop_m":' || rentals_json_float(b.nearest_stop_m)
+|| ',"nearest_shop_m":' || rentals_json_float(b.nearest_shop_m)
+|| ',"nearest_route_m":' || rentals_json_float(b.nearest_route_m)
+|| ',"nearby_pois":null}}'
+"""
+
+FEATURE_COLLECTION_SQL = f"""
+SELECT '{{"type":"FeatureCollection","features":['
+    || coalesce(string_agg({FEATURE_SQL}, ',' ORDER BY page.ord), '')
+    || ']}}'
+FROM unnest(%s::bigint[]) WITH ORDINALITY AS page(id, ord)
+JOIN {Building._meta.db_table} b ON b.id = page.id
+JOIN {District._meta.db_table} d ON d.id = b.district_id
+"""
+
+SINGLE_FEATURE_SQL = f"""
+SELECT {FEATURE_SQL}
+FROM {Building._meta.db_table} b
+JOIN {District._meta.db_table} d ON d.id = b.district_id
+WHERE b.id = %s
+"""
+
+
+def render_feature_collection(building_ids):
+    """Return a FeatureCollection (JSON text) for the given ids, in that order."""
+    with connection.cursor() as cursor:
+        cursor.execute(FEATURE_COLLECTION_SQL, [list(building_ids)])
+        return cursor.fetchone()[0]
+
+
+def render_feature(building_id):
+    """Return a single Feature (JSON text), or None if the building does not exist."""
+    with connection.cursor() as cursor:
+        cursor.execute(SINGLE_FEATURE_SQL, [building_id])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def render_paginated_feature_collection(paginator, building_ids):
+    """Wrap a rendered page the way `CustomPagination.get_paginated_response` does."""
+    envelope = json.dumps({
+        'count': paginator.page.paginator.count,
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+    }, ensure_ascii=False, separators=(',', ':'))
+    return envelope[:-1] + ',"results":' + render_feature_collection(building_ids) + '}'
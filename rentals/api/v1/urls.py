@@ -3,7 +3,14 @@ from rentals.api.v1 import views
 
 urlpatterns = [
     path('buildings/', views.building_list_create, name='building-list-create'),
+    path('buildings/export/', views.building_export, name='building-export'),
+    path('buildings/export.<str:format>', views.building_export, name='building-export-file'),
+    path('buildings/changes/', views.building_changes, name='building-changes'),
+    path('buildings/bulk/', views.building_bulk, name='building-bulk'),
+    path('buildings/search/', views.building_area_search, name='building-area-search'),
     path('buildings/<int:pk>/', views.building_detail, name='building-detail'),
+    path('buildings/<int:pk>/accessibility/', views.building_accessibility, name='building-accessibility'),
+    path('buildings/<int:pk>/similar/', views.building_similar, name='building-similar'),
     path('buildings/<int:building_pk>/profiles/<int:user_pk>/', views.building_profiles, name='building-profiles'),
     path('buildings/<int:building_pk>/profiles/', views.building_profiles_list, name='building-profiles-list'),
     path('users/', views.user_list, name='user-list'),
@@ -18,4 +25,5 @@ urlpatterns = [
     path('users/login/', views.user_login, name='user-login'),
     path('users/logout/', views.user_logout, name='user-logout'),
     path('users/refresh-token/', views.user_refresh_token, name='user-refresh-token'),
+    path('metrics/', views.service_metrics, name='service-metrics'),
 ]
@@ -1,5 +1,6 @@
 # rest_framework imports
-from rest_framework.decorators import api_view, parser_classes
+from rest_framework.decorators import api_view, parser_classes, renderer_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, IsAuthenticatedOrReadOnly
@@ -16,7 +17,26 @@ from django.db import transaction
 from rentals.api.v1.serializers import UserSerializer, ProfileSerializer, BuildingSerializer, BuildingGeoSerializer
 from django.core import serializers
 
-from rentals.api.v1.pagination import CustomPagination
+from rentals.api.v1.pagination import CustomPagination, building_ordering
+from rentals.api.v1.sql_geojson import render_feature, render_paginated_feature_collection
+from rentals.api.v1.renderers import FlatGeobufRenderer, GeoParquetRenderer, ArrowStreamRenderer, CSVExportRenderer
+from rentals.api.v1.bulk import BulkPayloadError, bulk_upsert, parse_items
+from rentals.api.v1 import page_cache
+from rentals.api.v1.area_search import InvalidArea, canonical_area, parse_area
+from rentals.api.v1.accessibility import InvalidProfileRequest, accessibility_profile, parse_nearest, parse_rings
+from rentals.api.v1.conditional import collection_validators, conditional_get, detail_validators
+from rentals.api.v1.query_guard import QueryRejected, admit_building_query, poi_filter_pairs
+from rentals import comparables, metrics, singleflight
+from rentals.poi_cache import nearby_pois
+from rentals.proximity import NEAREST_DISTANCE_FILTERS
+from rentals.transit import origin_cell, reachable_stop_ids
+from rentals.exporters.building_exporter import EXPORT_FORMATS, stream_export
+from rentals.changelog import (
+    InvalidVersion, VersionExpired, changes_since, current_version, decode_version, encode_version, latest_position,
+)
+from rentals.middleware import timed_section
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 
 # Authentication imports
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -27,6 +47,8 @@ from django.contrib.auth import authenticate
 from django.db.models import Exists, OuterRef
 from django.contrib.gis.db.models.functions import Distance, AsGeoJSON
 import json
+import os
+from datetime import date
 
 User = get_user_model()
 
@@ -66,7 +88,6 @@ def user_login(request):
     response = Response({'access': access}, status=status.HTTP_200_OK)
 
     # Set refresh token in secure HttpOnly cookie to reduce XSS risk.
-    from django.conf import settings
     response.set_cookie(
         key='refresh',
         value=str(refresh),
@@ -168,9 +189,8 @@ def profile_detail_me(request):
     """Operate on the authenticated user's profile (GET, PATCH, DELETE).
     Mirrors `profile_detail` but uses request.user.
     """
-    user = request.user
     try:
-        profile = user.profile
+        profile = Profile.objects.get(user_id=request.user.pk)
     except Profile.DoesNotExist:
         return Response({'error': 'User profile not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -192,28 +212,37 @@ def profile_detail_me(request):
 @permission_classes([IsAuthenticated])
 def user_buildings_me(request):
     queryset = Building.objects.filter(
-        profiles__user=request.user
+        profiles__user_id=request.user.pk
     ).select_related('district').annotate(
         geojson_geom=AsGeoJSON('location')
     ).only(
         'id', 'title', 'county', 'address', 'rental_price',
         'num_bedrooms', 'num_bathrooms', 'square_meters', 'amenities',
-        'image', 'description', 'owner_contact', 'district__id', 'district__name'
+        'image', 'description', 'owner_contact', 'nearest_stop_m', 'nearest_shop_m', 'nearest_route_m',
+        'district__id', 'district__name'
     ).order_by('id')  # Stable ordering for consistent pagination
 
     geojson_format = request.query_params.get('geojson', 'false').lower()
 
     if geojson_format == 'true':
-        geojson_response = serializers.serialize('geojson', queryset,
-        geometry_field='location', fields=['address', 'price', 'owner_contact'])
+        with timed_section('serializer'):
+            geojson_response = serializers.serialize('geojson', queryset,
+            geometry_field='location', fields=['address', 'price', 'owner_contact'])
         return Response(geojson_response, status=status.HTTP_200_OK)
 
     paginator = CustomPagination()
+    if _use_sql_geojson(request):
+        page_ids = paginator.paginate_queryset(queryset.values_list('id', flat=True), request)
+        with timed_section('serializer'):
+            content = render_paginated_feature_collection(paginator, page_ids)
+        return HttpResponse(content, content_type='application/json')
+
     page = paginator.paginate_queryset(queryset, request)
-    serializer = BuildingGeoSerializer(page, many=True)
+    with timed_section('serializer'):
+        features = BuildingGeoSerializer(page, many=True).data
     return paginator.get_paginated_response({
         'type': 'FeatureCollection',
-        'features': serializer.data
+        'features': features
     })
 
 @api_view(['GET'])
@@ -231,22 +260,31 @@ def user_buildings(request, pk):
     ).only(
         'id', 'title', 'county', 'address', 'rental_price',
         'num_bedrooms', 'num_bathrooms', 'square_meters', 'amenities',
-        'image', 'description', 'owner_contact', 'district__id', 'district__name'
+        'image', 'description', 'owner_contact', 'nearest_stop_m', 'nearest_shop_m', 'nearest_route_m',
+        'district__id', 'district__name'
     ).order_by('id')  # Stable ordering for consistent pagination
 
     geojson_format = request.query_params.get('geojson', 'false').lower()
 
     if geojson_format == 'true':
-        geojson_response = serializers.serialize('geojson', queryset,
-        geometry_field='location', fields=['address', 'price', 'owner_contact'])
+        with timed_section('serializer'):
+            geojson_response = serializers.serialize('geojson', queryset,
+            geometry_field='location', fields=['address', 'price', 'owner_contact'])
         return Response(geojson_response, status=status.HTTP_200_OK)
 
     paginator = CustomPagination()
+    if _use_sql_geojson(request):
+        page_ids = paginator.paginate_queryset(queryset.values_list('id', flat=True), request)
+        with timed_section('serializer'):
+            content = render_paginated_feature_collection(paginator, page_ids)
+        return HttpResponse(content, content_type='application/json')
+
     page = paginator.paginate_queryset(queryset, request)
-    serializer = BuildingGeoSerializer(page, many=True)
+    with timed_section('serializer'):
+        features = BuildingGeoSerializer(page, many=True).data
     return paginator.get_paginated_response({
         'type': 'FeatureCollection',
-        'features': serializer.data
+        'features': features
     })
 
 
@@ -279,6 +317,9 @@ def profile_detail(request, pk):
 
 # Building Views
 
+# Fields of the map layer features (`geojson=true` and delta sync)
+MAP_LAYER_FIELDS = ['pk', 'address', 'rental_price', 'owner_contact', 'district']
+
 # Building view permissions and implementations
 def check_create_building_permission(request, user_id):
     if not (request.user.is_staff or request.user.pk == user_id):
@@ -292,12 +333,15 @@ def check_modify_building_permission(request, building_id, for_profile=False):
         except Building.DoesNotExist:
             raise PermissionDenied("Building does not exist")
     try:
+        # Token-authenticated users carry their profile id, which saves the join on profile
+        owner = {'profile_id': request.user.profile_id} if getattr(request.user, 'profile_id', None) \
+            else {'profile__user_id': request.user.pk}
         if for_profile:
             profile_building = ProfileBuilding.objects.prefetch_related('profile', 'building')\
-                .filter(profile__user_id=request.user.pk, building_id=building_id).get()
+                .filter(building_id=building_id, **owner).get()
         else:
             profile_building = ProfileBuilding.objects.select_related('profile', 'building', 'building__district')\
-                .filter(profile__user_id=request.user.pk, building_id=building_id).get()
+                .filter(building_id=building_id, **owner).get()
         return profile_building
     except ProfileBuilding.DoesNotExist:
         raise PermissionDenied("You do not have permission to modify this building.")
@@ -305,39 +349,35 @@ def check_modify_building_permission(request, building_id, for_profile=False):
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticatedOrReadOnly])
 @parser_classes([MultiPartParser, FormParser, JSONParser])
+@conditional_get(collection_validators)
 def building_list_create(request):
     if request.method == 'GET':
         geojson = request.query_params.get('geojson', 'false').lower()
         
         if geojson == 'true':
-            # Always return all buildings for map layer (unfiltered)
-            queryset = Building.objects.all()
-            geojson_response = serializers.serialize('geojson', queryset,
-                geometry_field='location', fields=['pk', 'address', 'rental_price', 'owner_contact', 'district'])
-            return Response(geojson_response, status=status.HTTP_200_OK)
+            # Always return all buildings for map layer (unfiltered); concurrent
+            # requests for the same data version share one query (singleflight.py)
+            version, geojson_response = singleflight.coalesce(('map_layer', latest_position()), _map_layer,
+                                                              name='map_layer')
+            response = Response(geojson_response, status=status.HTTP_200_OK)
+            response['X-Buildings-Version'] = version
+            return response
         else:
-            # Apply filters at DB level for paginated response
-            buildings = _apply_building_filters(request.query_params)
-            
-            paginator = CustomPagination()
-            paginated_buildings = paginator.paginate_queryset(buildings, request)
-            
-            for building in paginated_buildings:        
-                # Add all nearby POIs data
-                nearby_pois = _get_all_nearby_pois(building, request.query_params)
-                if nearby_pois:
-                    building.nearby_pois = nearby_pois
-            serializer = BuildingGeoSerializer(paginated_buildings, many=True)
-            return paginator.get_paginated_response({
-                'type': 'FeatureCollection',
-                'features': serializer.data
-            })
+            # Pages of popular filter combinations come from the page cache (page_cache.py)
+            try:
+                key = page_cache.page_key(request)
+                if key is None:
+                    return _building_page(request)
+                content = page_cache.get_page(request, key, lambda: _rendered_content(_building_page(request)))
+            except QueryRejected as e:
+                return _query_rejected_response(e)
+            return HttpResponse(content, content_type='application/json')
 
     elif request.method == 'POST':
         user = request.user
 
         try:
-            profile = Profile.objects.get(user=user)
+            profile = Profile.objects.get(user_id=user.pk)
         except Profile.DoesNotExist:
             return Response({'error': 'Profile not found for the user'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -350,24 +390,149 @@ def building_list_create(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@parser_classes([JSONParser])
+def building_area_search(request):
+    """Buildings inside a GeoJSON polygon drawn on the map (see rentals/api/v1/area_search.py).
+
+    The list filters, ordering and pagination apply as query parameters,
+    and pages are cached by the polygon like list pages.
+    """
+    try:
+        area = parse_area(request.data)
+    except InvalidArea as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        key = page_cache.page_key(request, area=canonical_area(area))
+        if key is None:
+            return _building_page(request, area)
+        content = page_cache.get_page(request, key, lambda: _rendered_content(_building_page(request, area)))
+    except QueryRejected as e:
+        return _query_rejected_response(e)
+    return HttpResponse(content, content_type='application/json')
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def building_bulk(request):
+    """Create and update many buildings in one request (see rentals/api/v1/bulk.py).
+
+    Items without an `id` are created and linked to the caller's profile;
+    items with one update that building. Any invalid item rejects the whole
+    batch unless `?partial=true`, in which case the valid items are written.
+    """
+    profile_id = getattr(request.user, 'profile_id', None) \
+        or Profile.objects.filter(user_id=request.user.pk).values_list('id', flat=True).first()
+    if profile_id is None:
+        return Response({'error': 'Profile not found for the user'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        items = parse_items(request.data)
+    except BulkPayloadError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    partial = request.query_params.get('partial', 'false').lower() == 'true'
+    created, updated, errors = bulk_upsert(items, profile_id, is_staff=request.user.is_staff, partial=partial)
+    body = {'created': created, 'updated': updated, 'errors': errors}
+    if errors and not partial:
+        return Response(body, status=status.HTTP_400_BAD_REQUEST)
+    return Response(body, status=status.HTTP_201_CREATED if created and not errors else status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def building_changes(request):
+    """Delta sync for the map layer.
+
+    Returns the buildings upserted (in the `geojson=true` feature format) and
+    the ids deleted since the `since` version token, plus the token to use
+    next time. Without `since` only the current version is returned.
+    """
+    since = request.query_params.get('since')
+    if not since:
+        return Response({'version': current_version()}, status=status.HTTP_200_OK)
+    try:
+        since_position = decode_version(since)
+    except InvalidVersion as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except VersionExpired as e:
+        return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+
+    # Clients that synced together ask for the same delta; compute it once
+    body = singleflight.coalesce(('building_changes', since_position), lambda: _changes_body(since_position),
+                                 name='building_changes')
+    return Response(body, status=status.HTTP_200_OK)
+
+
+def _changes_body(since_position):
+    upserted_ids, deleted_ids, last_position, has_more = changes_since(since_position)
+    upserted = serializers.serialize('geojson', Building.objects.filter(id__in=upserted_ids).order_by('id'),
+        geometry_field='location', fields=MAP_LAYER_FIELDS)
+    return {
+        'version': encode_version(last_position),
+        'upserted': json.loads(upserted),
+        'deleted': sorted(deleted_ids),
+        'has_more': has_more,
+    }
+
+
+@api_view(['GET'])
+@renderer_classes([JSONRenderer, FlatGeobufRenderer, GeoParquetRenderer, ArrowStreamRenderer, CSVExportRenderer])
+@conditional_get(collection_validators)
+def building_export(request, format=None):
+    """Stream the (filtered) buildings as FlatGeobuf, GeoParquet, Arrow or CSV.
+
+    The format comes from `?format=` or the URL suffix (`export.csv`,
+    `export.parquet`, ...). Accepts the same filter parameters as the
+    building list. Rows are read with a server-side cursor and written batch
+    by batch; nothing counts the rows first.
+    """
+    export_format = request.accepted_renderer.format
+    if export_format not in EXPORT_FORMATS:
+        return Response({'error': f"Unsupported export format. Use format={'|'.join(EXPORT_FORMATS)}."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = _apply_building_filters(request.query_params)
+    try:
+        admission = admit_building_query(queryset, request.query_params)
+    except QueryRejected as e:
+        return _query_rejected_response(e)
+    content_type, extension = EXPORT_FORMATS[export_format]
+    # The heavy-query slot (if any) is held until the stream is closed
+    response = StreamingHttpResponse(admission.stream(stream_export(queryset, export_format)),
+                                     content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="buildings.{extension}"'
+    return response
+
+
 @api_view(['GET', 'PATCH', 'DELETE'])
 @permission_classes([IsAuthenticatedOrReadOnly])
 @parser_classes([MultiPartParser, FormParser, JSONParser])
+@conditional_get(detail_validators)
 def building_detail(request, pk):
     if request.method == 'GET':
+        geojson = request.query_params.get('geojson', 'false').lower()
+        if geojson == 'true' and _use_sql_geojson(request):
+            with timed_section('serializer'):
+                content = render_feature(pk)
+            if content is None:
+                return Response({'error': 'Building not found'}, status=status.HTTP_404_NOT_FOUND)
+            return HttpResponse(content, content_type='application/json')
         try:
-            building = Building.objects.select_related('district').only(
+            building = Building.objects.select_related('district').annotate(
+                geojson_geom=AsGeoJSON('location')
+            ).only(
                 'id', 'title', 'county', 'address', 'rental_price',
                 'num_bedrooms', 'num_bathrooms', 'square_meters', 'amenities',
-                'image', 'description', 'owner_contact', 'district__id', 'district__name'
+                'image', 'description', 'owner_contact', 'nearest_stop_m', 'nearest_shop_m', 'nearest_route_m',
+                'district__id', 'district__name'
             ).get(id=pk)
-            geojson = request.query_params.get('geojson', 'false').lower()
             if geojson == 'true':
-                building_geojson = BuildingGeoSerializer(building)
-                return Response(building_geojson.data, status=status.HTTP_200_OK)
+                with timed_section('serializer'):
+                    data = BuildingGeoSerializer(building).data
+                return Response(data, status=status.HTTP_200_OK)
             else:
-                serializer = BuildingSerializer(building)
-                return Response(serializer.data, status=status.HTTP_200_OK)
+                with timed_section('serializer'):
+                    data = BuildingSerializer(building).data
+                return Response(data, status=status.HTTP_200_OK)
         except Building.DoesNotExist:
             return Response({'error': 'Building not found'}, status=status.HTTP_404_NOT_FOUND)
         
@@ -393,6 +558,50 @@ def building_detail(request, pk):
         except PermissionDenied as e:
             return Response({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
         
+@api_view(['GET'])
+@conditional_get(detail_validators)
+def building_accessibility(request, pk):
+    """POI counts and nearest POIs of each type within several rings (see accessibility.py).
+
+    `?rings=250,500,1000` sets the ring radii in metres and `?nearest=3` how
+    many POIs are listed per ring.
+    """
+    try:
+        rings = parse_rings(request.query_params.get('rings'))
+        nearest = parse_nearest(request.query_params.get('nearest'))
+    except InvalidProfileRequest as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    building = Building.objects.only(
+        'id', 'location', 'nearest_stop_m', 'nearest_shop_m', 'nearest_route_m'
+    ).filter(pk=pk).first()
+    if building is None:
+        return Response({'error': 'Building not found'}, status=status.HTTP_404_NOT_FOUND)
+    with timed_section('serializer'):
+        profile = accessibility_profile(building, rings, nearest, _query_nearby_pois)
+    return Response(profile, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@conditional_get(collection_validators)
+def building_similar(request, pk):
+    """The `?k=10` available listings most comparable to a building (see rentals/comparables.py)."""
+    try:
+        k = int(request.query_params.get('k', 10))
+    except ValueError:
+        k = 0
+    if not 1 <= k <= comparables.MAX_K:
+        return Response({'error': f'k must be an integer between 1 and {comparables.MAX_K}.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    building = Building.objects.only(
+        'id', 'location', 'rental_price', 'num_bedrooms', 'num_bathrooms', 'square_meters', 'amenities'
+    ).filter(pk=pk).first()
+    if building is None:
+        return Response({'error': 'Building not found'}, status=status.HTTP_404_NOT_FOUND)
+    with timed_section('serializer'):
+        results = comparables.similar_listings(building, k)
+    return Response({'id': building.pk, 'results': results}, status=status.HTTP_200_OK)
+
+
 @api_view(['PATCH', 'DELETE'])
 @permission_classes([IsAuthenticated])
 def building_profiles(request, building_pk, user_pk):
@@ -424,13 +633,94 @@ def building_profiles_list(request, building_pk):
         .filter(profile__building__id=building_pk)
     if not users.exists():
         return Response({'error': 'Building not found'}, status=status.HTTP_404_NOT_FOUND)
-    if not user.is_staff and user not in users:
+    if not user.is_staff and not users.filter(pk=user.pk).exists():
         return Response({'error': 'permission denied'}, status=status.HTTP_403_FORBIDDEN)
     paginator = CustomPagination()
     page = paginator.paginate_queryset(users, request)
     serializer = UserSerializer(page, many=True)
     return paginator.get_paginated_response(serializer.data)
 
+# Helper functions for building responses
+
+def _map_layer():
+    """(version token, GeoJSON of every building) for the map layer."""
+    # Read the version first: changes racing the snapshot are replayed by the next sync
+    version = current_version()
+    with timed_section('serializer'):
+        content = serializers.serialize('geojson', Building.objects.all(),
+            geometry_field='location', fields=MAP_LAYER_FIELDS)
+    return version, content
+
+
+def _building_page(request, area=None):
+    """Filter and paginate the buildings at DB level; raises QueryRejected.
+
+    `area` restricts the buildings to a search polygon (see area_search.py).
+    """
+    buildings = _apply_building_filters(request.query_params)
+    if area is not None:
+        buildings = buildings.filter(location__intersects=area)
+    admission = admit_building_query(buildings, request.query_params)
+
+    with admission:
+        paginator = CustomPagination()
+        if _use_sql_geojson(request) and not _has_poi_filters(request.query_params):
+            # No nearby_pois to attach, so PostgreSQL can render the whole page
+            page_ids = paginator.paginate_queryset(buildings.values_list('id', flat=True), request)
+            with timed_section('serializer'):
+                content = render_paginated_feature_collection(paginator, page_ids)
+            return HttpResponse(content, content_type='application/json')
+
+        paginated_buildings = paginator.paginate_queryset(buildings, request)
+
+        for building in paginated_buildings:
+            # Add all nearby POIs data
+            nearby_pois = _get_all_nearby_pois(building, request.query_params)
+            if nearby_pois:
+                building.nearby_pois = nearby_pois
+        with timed_section('serializer'):
+            features = BuildingGeoSerializer(paginated_buildings, many=True).data
+        return paginator.get_paginated_response({
+            'type': 'FeatureCollection',
+            'features': features
+        })
+
+
+def _rendered_content(response):
+    """JSON body of a view response, rendering a DRF Response the way JSONRenderer would.
+
+    Timed as the `render` section: bodies returned as plain HttpResponses
+    skip the middleware's template-response hook that times DRF rendering.
+    """
+    with timed_section('render'):
+        if isinstance(response, Response):
+            return JSONRenderer().render(response.data)
+        return response.content
+
+
+def _use_sql_geojson(request):
+    """Whether a GeoJSON response can be rendered by PostgreSQL (see sql_geojson).
+
+    Only compact JSON is produced there, so browsable-API and indented
+    responses still go through the DRF serializer.
+    """
+    return (
+        getattr(settings, 'RENTALS_SQL_GEOJSON', True)
+        and request.accepted_renderer.format == 'json'
+        and 'indent' not in request.accepted_media_type
+    )
+
+
+def _has_poi_filters(query_params):
+    """Whether the list response will carry nearby_pois (see _get_all_nearby_pois)."""
+    return bool(poi_filter_pairs(query_params))
+
+def _query_rejected_response(error):
+    response = Response({'error': str(error)}, status=error.status_code)
+    if error.retry_after is not None:
+        response['Retry-After'] = str(error.retry_after)
+    return response
+
 # Helper functions for building filtering
 
 def _apply_building_filters(query_params):
@@ -456,153 +746,164 @@ def _apply_building_filters(query_params):
             queryset = queryset.filter(rental_price__lte=float(price_max))
         except (ValueError, TypeError):
             pass
+
+    # Availability filters (served by the partial indexes on available listings)
+    available = query_params.get('available')
+    if available and available.strip().lower() in ('true', 'false'):
+        queryset = queryset.filter(is_available=available.strip().lower() == 'true')
+
+    available_by = query_params.get('available_by')
+    if available_by and available_by.strip():
+        try:
+            queryset = queryset.filter(available_from__lte=date.fromisoformat(available_by.strip()))
+        except ValueError:
+            pass
     
-    # Proximity filters (using Exists subquery at DB level)
-    # Support multiple POI filters by getting lists from query params
-    poi_types = query_params.getlist('poi_type')
-    poi_radii = query_params.getlist('poi_radius')
-    
-    # Process each poi filter pair
-    if poi_types and poi_radii and len(poi_types) == len(poi_radii):
-        for idx, (poi_type, poi_radius) in enumerate(zip(poi_types, poi_radii)):
-            if not poi_type or not poi_type.strip() or not poi_radius or not poi_radius.strip():
-                continue
-                
+    # Nearest-POI distance filters on the precomputed columns (rentals/proximity.py)
+    for param, field in NEAREST_DISTANCE_FILTERS.items():
+        value = query_params.get(param)
+        if value and value.strip():
             try:
-                radius_m = float(poi_radius)
-                if radius_m <= 0:
-                    continue
-                
-                # Use unique annotation names to avoid overwriting and ensure proper AND logic
-                if poi_type == 'shops':
-                    annotation_name = f'has_nearby_shops_{idx}'
-                    queryset = queryset.annotate(**{
-                        annotation_name: Exists(
-                            Shops.objects.filter(
-                                geometry__dwithin=(OuterRef('location'), radius_m)
-                            )
-                        )
-                    }).filter(**{annotation_name: True})
-                
-                elif poi_type == 'bus_stop':
-                    annotation_name = f'has_nearby_stops_{idx}'
-                    queryset = queryset.annotate(**{
-                        annotation_name: Exists(
-                            BusStop.objects.filter(
-                                geometry__dwithin=(OuterRef('location'), radius_m)
-                            )
-                        )
-                    }).filter(**{annotation_name: True})
-                
-                elif poi_type == 'route':
-                    annotation_name = f'has_nearby_routes_{idx}'
-                    queryset = queryset.annotate(**{
-                        annotation_name: Exists(
-                            Route.objects.filter(
-                                geometry__dwithin=(OuterRef('location'), radius_m)
-                            )
-                        )
-                    }).filter(**{annotation_name: True})
-            
+                queryset = queryset.filter(**{f'{field}__lte': float(value)})
             except (ValueError, TypeError):
-                continue
+                pass
+    
+    # Transit reachability: the nearest stop must be reachable from the origin (rentals/transit.py)
+    cell = origin_cell(query_params)
+    if cell is not None:
+        queryset = queryset.filter(
+            nearest_stop_id__in=reachable_stop_ids(cell),
+            nearest_stop_m__lte=getattr(settings, 'RENTALS_TRANSIT_WALK_METRES', 500),
+        )
+    
+    # Proximity filters (using Exists subquery at DB level)
+    # Support multiple POI filters; pairs are parsed by the query guard so
+    # admission control and filtering see the same radii
+    for idx, (poi_type, radius_m) in enumerate(poi_filter_pairs(query_params)):
+        # Use unique annotation names to avoid overwriting and ensure proper AND logic
+        if poi_type == 'shops':
+            annotation_name = f'has_nearby_shops_{idx}'
+            queryset = queryset.annotate(**{
+                annotation_name: Exists(
+                    Shops.objects.filter(
+                        geometry__dwithin=(OuterRef('location'), radius_m)
+                    )
+                )
+            }).filter(**{annotation_name: True})
+
+        elif poi_type == 'bus_stop':
+            annotation_name = f'has_nearby_stops_{idx}'
+            queryset = queryset.annotate(**{
+                annotation_name: Exists(
+                    BusStop.objects.filter(
+                        geometry__dwithin=(OuterRef('location'), radius_m)
+                    )
+                )
+            }).filter(**{annotation_name: True})
+
+        elif poi_type == 'route':
+            annotation_name = f'has_nearby_routes_{idx}'
+            queryset = queryset.annotate(**{
+                annotation_name: Exists(
+                    Route.objects.filter(
+                        geometry__dwithin=(OuterRef('location'), radius_m)
+                    )
+                )
+            }).filter(**{annotation_name: True})
+
+    ordering = building_ordering(query_params)
+    if ordering is not None:
+        queryset = queryset.order_by(*ordering)
     return queryset
 
 
-def _get_nearby_pois(building, poi_type, query_params):
-    """Get nearby POIs with distances."""
-    try:
-        poi_radius = query_params.get('poi_radius')
-        if not poi_radius or not poi_radius.strip():
-            return None
-        
-        radius_m = float(poi_radius)
-        pois = []
+def _get_nearby_pois(building, poi_type, radius_m):
+    """Get nearby POIs with distances (cached, see rentals/poi_cache.py)."""
+    pois = nearby_pois(building, poi_type, radius_m,
+                       lambda radius: _query_nearby_pois(building, poi_type, radius))
+    return pois if pois else None
+
+
+def _query_nearby_pois(building, poi_type, radius_m):
+    """Query POIs within radius_m as (exact distance, response entry) pairs, nearest first."""
+    pois = []
+
+    if poi_type == 'shops':
+        shops = Shops.objects.annotate(
+            distance=Distance('geometry', building.location)
+        ).filter(
+            distance__lte=radius_m
+        ).values('name', 'category', 'distance').order_by('distance')
         
-        if poi_type == 'shops':
-            shops = Shops.objects.annotate(
-                distance=Distance('geometry', building.location)
-            ).filter(
-                distance__lte=radius_m
-            ).values('name', 'category', 'distance').order_by('distance')
-            
-            for shop in shops:
-                distance_m = shop['distance'].m if shop['distance'] else 0
-                pois.append({
-                    'name': shop['name'] or 'N/A',
-                    'category': shop['category'] or 'N/A',
-                    'distance_m': round(distance_m, 2)
-                })
+        for shop in shops:
+            distance_m = shop['distance'].m if shop['distance'] else 0
+            pois.append((distance_m, {
+                'name': shop['name'] or 'N/A',
+                'category': shop['category'] or 'N/A',
+                'distance_m': round(distance_m, 2)
+            }))
+    
+    elif poi_type == 'bus_stop':
+        stops = BusStop.objects.annotate(
+            distance=Distance('geometry', building.location)
+        ).filter(
+            distance__lte=radius_m
+        ).values('name', 'distance').order_by('distance')
         
-        elif poi_type == 'bus_stop':
-            stops = BusStop.objects.annotate(
-                distance=Distance('geometry', building.location)
-            ).filter(
-                distance__lte=radius_m
-            ).values('name', 'distance').order_by('distance')
-            
-            for stop in stops:
-                distance_m = stop['distance'].m if stop['distance'] else 0
-                pois.append({
-                    'name': stop['name'] or 'N/A',
-                    'distance_m': round(distance_m, 2)
-                })
+        for stop in stops:
+            distance_m = stop['distance'].m if stop['distance'] else 0
+            pois.append((distance_m, {
+                'name': stop['name'] or 'N/A',
+                'distance_m': round(distance_m, 2)
+            }))
+    
+    elif poi_type == 'route':
+        routes = Route.objects.annotate(
+            distance=Distance('geometry', building.location)
+        ).filter(
+            distance__lte=radius_m
+        ).values('route_name', 'headsign', 'route_long_name', 'distance').order_by('distance')
         
-        elif poi_type == 'route':
-            routes = Route.objects.annotate(
-                distance=Distance('geometry', building.location)
-            ).filter(
-                distance__lte=radius_m
-            ).values('route_name', 'headsign', 'route_long_name', 'distance').order_by('distance')
+        # Keep only the nearest occurrence of each route name; since that is
+        # also the nearest, filtering this list by a smaller radius gives the
+        # same result as querying with it
+        seen_routes = set()
+        for route in routes:
+            route_name = route['route_long_name']
+            if route_name in seen_routes:
+                continue
+            seen_routes.add(route_name)
             
-            seen_routes = set()
-            for route in routes:
-                route_name = route['route_long_name']
-                # Skip duplicate route names, keep only first occurrence
-                if route_name in seen_routes:
-                    continue
-                seen_routes.add(route_name)
-                
-                distance_m = route['distance'].m if route['distance'] else 0
-                pois.append({
-                    'name': route['route_long_name'] or 'N/A',
-                    'distance_m': round(distance_m, 2)
-                })
-        
-        return pois if pois else None
+            distance_m = route['distance'].m if route['distance'] else 0
+            pois.append((distance_m, {
+                'name': route['route_long_name'] or 'N/A',
+                'distance_m': round(distance_m, 2)
+            }))
     
-    except (ValueError, TypeError):
-        return None
+    return pois
 
 
 def _get_all_nearby_pois(building, query_params):
-    """Get nearby POIs with distances. Fetches only requested types or all types if none specified."""
-    poi_types = query_params.getlist('poi_type')
-    poi_radii = query_params.getlist('poi_radius')
-    
-    # If specific poi_types requested, only fetch those types
-    if poi_types and poi_radii and len(poi_types) == len(poi_radii):
-        nearby_pois = {}
-        
-        # Create a temporary query params object for each filter
-        for poi_type, poi_radius in zip(poi_types, poi_radii):
-            if not poi_type or not poi_type.strip():
-                continue
-                
-            # Create mock query params with single filter
-            class SingleFilterParams:
-                def get(self, key, default=None):
-                    if key == 'poi_radius':
-                        return poi_radius
-                    return default
-            
-            poi_list = _get_nearby_pois(building, poi_type, SingleFilterParams())
-            if poi_list:
-                # Map singular to plural for response keys
-                key = 'routes' if poi_type == 'route' else 'bus_stops' if poi_type == 'bus_stop' else 'shops'
-                nearby_pois[key] = poi_list
-        
-        return nearby_pois if nearby_pois else None
-    
-    # Otherwise, no specific filters - don't fetch anything to save resources
-    return None
\ No newline at end of file
+    """Get nearby POIs with distances for the POI filters, or None without any.
+
+    The pairs are the validated ones the filters, the page cache key and the
+    query guard use (poi_filter_pairs), so unknown types and unusable radii
+    never reach the POI cache.
+    """
+    nearby_pois = {}
+    for poi_type, radius_m in poi_filter_pairs(query_params):
+        poi_list = _get_nearby_pois(building, poi_type, radius_m)
+        if poi_list:
+            # Map singular to plural for response keys
+            key = 'routes' if poi_type == 'route' else 'bus_stops' if poi_type == 'bus_stop' else 'shops'
+            nearby_pois[key] = poi_list
+    return nearby_pois if nearby_pois else None
+
+
+# Service views
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def service_metrics(request):
+    """Counters and gauges of the worker process that served the request."""
+    return Response({'pid': os.getpid(), **metrics.snapshot()}, status=status.HTTP_200_OK)
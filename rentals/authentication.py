@@ -0,0 +1,106 @@
+"""JWT authentication without a User query on every request.
+
+simplejwt's `JWTAuthentication` loads the User row for each authenticated
+request. `CachedJWTAuthentication` instead keeps a small snapshot per user
+(active/staff flags and profile id) in the Django cache for
+`RENTALS_AUTH_CACHE_SECONDS`, and returns a `SnapshotUser` built from it.
+Saving or deleting a User or Profile drops the snapshot (see signals.py);
+with a per-process cache backend other workers pick the change up when the
+TTL runs out.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from rentals import metrics
+
+SNAPSHOT_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser', 'profile__id')
+
+
+def snapshot_cache_key(user_id):
+    return f'rentals:auth:user:{user_id}'
+
+
+def invalidate_user_snapshot(user_id):
+    cache.delete(snapshot_cache_key(user_id))
+
+
+def load_user_snapshot(user_id):
+    """Read the snapshot fields of a user (one query), or None if there is no such user."""
+    row = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*SNAPSHOT_FIELDS).first()
+    if row is None:
+        return None
+    row['profile_id'] = row.pop('profile__id')
+    return row
+
+
+class SnapshotUser:
+    """Authenticated user backed by the cached snapshot.
+
+    Answers `pk`, `username`, the permission flags and `profile_id` without
+    touching the database; any other attribute loads the full User once.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, snapshot):
+        self.id = self.pk = snapshot['id']
+        self.username = snapshot['username']
+        self.is_active = snapshot['is_active']
+        self.is_staff = snapshot['is_staff']
+        self.is_superuser = snapshot['is_superuser']
+        self.profile_id = snapshot['profile_id']
+
+    @cached_property
+    def user(self):
+        metrics.increment('auth.full_user_loaded')
+        return get_user_model().objects.get(pk=self.pk)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __eq__(self, other):
+        if isinstance(other, (SnapshotUser, get_user_model())):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.username
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """`JWTAuthentication` that resolves the token's user from a cached snapshot."""
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares against the password hash, which is not cached
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = snapshot_cache_key(user_id)
+        snapshot = cache.get(key)
+        if snapshot is None:
+            metrics.increment('auth.snapshot', result='miss')
+            snapshot = load_user_snapshot(user_id)
+            if snapshot is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.set(key, snapshot, getattr(settings, 'RENTALS_AUTH_CACHE_SECONDS', 60))
+        else:
+            metrics.increment('auth.snapshot', result='hit')
+
+        if not snapshot['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return SnapshotUser(snapshot)
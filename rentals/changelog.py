@@ -0,0 +1,179 @@
+"""Building change log used by the delta sync endpoint.
+
+Every building create/update/delete appends a BuildingChange row (see
+signals.py). Clients hold an opaque version token and ask for everything
+that changed after it. Tokens carry the change id they point at and the
+time they were issued; a token older than the retention window may point
+at pruned entries, so the client has to resync from a full snapshot.
+
+Sequence ids are taken when a row is inserted, not when it commits: a
+long transaction can hold id 10 while id 11 commits first, so "everything
+after id 11" would skip id 10 for good. Sync positions are therefore
+(xact_id, id) pairs, where xact_id is the writing transaction, and only
+*final* entries are handed out: those written by a transaction older than
+every transaction still running, which nothing can be inserted before any
+more. An entry committed behind a running transaction waits for it, then
+comes out in the next sync.
+
+The newest final position also serves as the version of the whole
+buildings table for HTTP validators (api/v1/conditional.py); unlike the
+highest id, it moves when an entry holding a lower id commits late.
+`latest_position()` memoises it per process like dataset versions
+(rentals/versioning.py).
+"""
+import base64
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import BigIntegerField, Max, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from rentals.models import BuildingChange
+
+# Most change-log entries read per sync request; clients follow `has_more`
+MAX_CHANGES_PER_SYNC = 5000
+
+
+# Oldest transaction still running besides this one, taken from the snapshot of
+# the statement it is part of; with none, every visible entry is final
+_FINAL_XACT_SQL = (
+    'coalesce((SELECT min(x::text::bigint) FROM pg_snapshot_xip(pg_current_snapshot()) AS x), '
+    '9223372036854775807)'
+)
+
+
+class InvalidVersion(ValueError):
+    """The version token could not be decoded."""
+
+
+class VersionExpired(Exception):
+    """The version token is older than the change-log retention window."""
+
+
+def retention():
+    return timedelta(days=getattr(settings, 'RENTALS_CHANGELOG_RETENTION_DAYS', 30))
+
+
+_latest_lock = threading.Lock()
+_position = None
+
+
+def record_building_changes(building_ids, operation):
+    """Append one change-log entry per building id."""
+    BuildingChange.objects.bulk_create(
+        [BuildingChange(building_id=building_id, operation=operation) for building_id in building_ids]
+    )
+    # Dropped now for this transaction's own reads, and again once the change is visible to others
+    forget_latest_change()
+    transaction.on_commit(forget_latest_change)
+
+
+def latest_position():
+    """`current_position()`, memoised for `RENTALS_DATASET_VERSION_TTL` seconds.
+
+    Changes made by this process drop the memo when written and on commit,
+    other workers see them within the TTL. The position only moves once an
+    entry is final, so changes committed behind a running transaction show
+    up when it ends.
+    """
+    global _position
+    ttl = getattr(settings, 'RENTALS_DATASET_VERSION_TTL', 1.0)
+    now = time.monotonic()
+    with _latest_lock:
+        cached = _position
+    if cached is not None and now - cached[1] < ttl:
+        return cached[0]
+    position = current_position()
+    with _latest_lock:
+        _position = (position, now)
+    return position
+
+
+def forget_latest_change():
+    global _position
+    with _latest_lock:
+        _position = None
+
+
+def encode_version(position):
+    """Token for the sync position `(xact_id, change_id)`."""
+    xact_id, change_id = position
+    raw = f'{xact_id}.{change_id}:{int(timezone.now().timestamp())}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_version(token):
+    """Return the (xact_id, change_id) position of a token, or raise InvalidVersion/VersionExpired.
+
+    Tokens issued before positions carried a transaction id hold the change
+    id alone; they point into entries that are all final, at xact_id 0.
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        position, issued_at = base64.urlsafe_b64decode(padded.encode()).decode().split(':')
+        xact_id, _, change_id = position.rpartition('.')
+        xact_id, change_id, issued_at = int(xact_id or 0), int(change_id), int(issued_at)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidVersion('Invalid version token.')
+    if xact_id < 0 or change_id < 0:
+        raise InvalidVersion('Invalid version token.')
+    if timezone.now().timestamp() - issued_at > retention().total_seconds():
+        raise VersionExpired('Version token has expired; reload the full dataset.')
+    return xact_id, change_id
+
+
+def current_change_id():
+    return BuildingChange.objects.aggregate(last=Max('id'))['last'] or 0
+
+
+def _final_changes():
+    """Entries no running transaction can still insert before (see the module docstring)."""
+    return BuildingChange.objects.filter(xact_id__lt=RawSQL(_FINAL_XACT_SQL, (), output_field=BigIntegerField()))
+
+
+def current_position():
+    """(xact_id, change_id) of the newest final entry, (0, 0) for an empty log."""
+    return _final_changes().order_by('-xact_id', '-id').values_list('xact_id', 'id').first() or (0, 0)
+
+
+def current_version():
+    """Token for the current state of the buildings table."""
+    return encode_version(current_position())
+
+
+def changes_since(position, limit=MAX_CHANGES_PER_SYNC):
+    """Collapse the final log entries after `position` into (upserted ids, deleted ids, last position, has_more).
+
+    Only the last operation per building counts, so a building created and
+    then deleted within the window is reported as deleted only.
+    """
+    xact_id, change_id = position
+    entries = list(
+        _final_changes().filter(Q(xact_id__gt=xact_id) | Q(xact_id=xact_id, id__gt=change_id))
+        .order_by('xact_id', 'id').values_list('xact_id', 'id', 'building_id', 'operation')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for _, _, building_id, operation in entries:
+        latest[building_id] = operation
+    upserted = [bid for bid, op in latest.items() if op == BuildingChange.UPSERT]
+    deleted = [bid for bid, op in latest.items() if op == BuildingChange.DELETE]
+    last_position = entries[-1][:2] if entries else (xact_id, change_id)
+    return upserted, deleted, last_position, has_more
+
+
+def prune_changes():
+    """Delete entries older than the retention window; return how many were removed.
+
+    The newest entry is always kept: it is the table's current version, and
+    an emptied log would hand out version 0 again.
+    """
+    cutoff = timezone.now() - retention()
+    deleted, _ = BuildingChange.objects.filter(changed_at__lt=cutoff).exclude(id=current_change_id()).delete()
+    return deleted
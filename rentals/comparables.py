@@ -0,0 +1,245 @@
+"""Comparable listings: available buildings near one, at a similar price.
+
+Two steps per request:
+
+1. a KNN query (`ORDER BY location <-> point LIMIT n`, served by the GiST
+   index on `location`) picks the `RENTALS_SIMILAR_CANDIDATES` available
+   buildings nearest to the one being viewed;
+2. the candidates are re-ranked in numpy over their price, bedrooms,
+   bathrooms, square metres, amenity overlap and distance, read from an
+   in-memory `ListingIndex`.
+
+The index holds one row per available building in compact arrays (ids,
+float32 attributes and coordinates, a 64-bit amenity mask), about 40 bytes
+per building. It is tied to the final building change-log position
+(changelog.latest_position) and rebuilt with one query on the first
+request after a change, at most every `RENTALS_SIMILAR_INDEX_MIN_AGE`
+seconds; requests in between rank against the previous arrays. Concurrent rebuilds are coalesced.
+
+The cost of a candidate is the weighted sum of its differences from the
+building (`RENTALS_SIMILAR_WEIGHTS`):
+
+- price and square metres: |log(candidate / building)|;
+- bedrooms and bathrooms: absolute difference;
+- amenities: Jaccard distance of the amenity sets;
+- distance: metres / 1000.
+
+A value missing on either side costs MISSING_PENALTY. Results are sorted
+by cost and reported with `score = 1 / (1 + cost)`.
+"""
+import math
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.contrib.gis.db.models.functions import GeometryDistance
+from django.db.models.expressions import RawSQL
+
+from rentals import metrics, singleflight
+from rentals.changelog import latest_position
+from rentals.models import Building
+
+# Attribute columns of ListingIndex.features
+FEATURES = ('rental_price', 'num_bedrooms', 'num_bathrooms', 'square_meters')
+
+DEFAULT_WEIGHTS = {
+    'rental_price': 3.0,
+    'num_bedrooms': 1.0,
+    'num_bathrooms': 0.5,
+    'square_meters': 1.0,
+    'amenities': 1.0,
+    'distance': 1.0,
+}
+
+# Cost of a comparison where either side has no value
+MISSING_PENALTY = 1.0
+
+# Amenities beyond the most common 64 are ignored (one bit each)
+MAX_AMENITIES = 64
+
+EARTH_RADIUS_M = 6371008.8
+
+MAX_K = 50
+
+
+def _amenity_names(value):
+    """Amenity names of a Building.amenities value (a list, or a dict of flags)."""
+    if isinstance(value, dict):
+        return {str(name) for name, present in value.items() if present}
+    if isinstance(value, list):
+        return {str(name) for name in value if isinstance(name, (str, int))}
+    return set()
+
+
+def _float(value):
+    return float(value) if value is not None else math.nan
+
+
+class ListingIndex:
+    """Attributes of the available buildings as numpy arrays, sorted by id."""
+
+    def __init__(self, ids, features, coordinates, amenity_masks, vocabulary, version=(0, 0)):
+        self.ids = ids
+        self.features = features
+        self.coordinates = coordinates
+        self.amenity_masks = amenity_masks
+        self.vocabulary = vocabulary
+        self.version = version
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def from_rows(cls, rows, version=(0, 0)):
+        """Build from (id, price, bedrooms, bathrooms, square metres, amenities, lon, lat) rows."""
+        rows = sorted(rows, key=lambda row: row[0])
+        amenities = [_amenity_names(row[5]) for row in rows]
+        counts = Counter(name for names in amenities for name in names)
+        vocabulary = {name: bit for bit, (name, _) in enumerate(counts.most_common(MAX_AMENITIES))}
+        index = cls(
+            ids=np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+            features=np.array([[_float(value) for value in row[1:5]] for row in rows],
+                              dtype=np.float32).reshape(len(rows), len(FEATURES)),
+            coordinates=np.array([row[6:8] for row in rows], dtype=np.float32).reshape(len(rows), 2),
+            amenity_masks=np.zeros(len(rows), dtype=np.uint64),
+            vocabulary=vocabulary,
+            version=version,
+        )
+        for position, names in enumerate(amenities):
+            index.amenity_masks[position] = index.amenity_mask(names)
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + self.features.nbytes + self.coordinates.nbytes + self.amenity_masks.nbytes
+
+    def amenity_mask(self, names):
+        mask = 0
+        for name in names:
+            bit = self.vocabulary.get(name)
+            if bit is not None:
+                mask |= 1 << bit
+        return np.uint64(mask)
+
+    def positions(self, ids):
+        """Row positions of the given ids; ids not in the index are dropped."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.empty(0, dtype=np.intp)
+        positions = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        return positions[self.ids[positions] == ids]
+
+    def rank(self, target, candidate_ids, k, weights=None):
+        """The `k` candidates most similar to `target`, best first.
+
+        `target` maps FEATURES to values and has `amenities`, `lon` and `lat`.
+        """
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        positions = self.positions(candidate_ids)
+        if not len(positions) or k <= 0:
+            return []
+        features = self.features[positions]
+        wanted = np.array([_float(target.get(name)) for name in FEATURES], dtype=np.float32)
+
+        cost = np.zeros(len(positions), dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for column, name in enumerate(FEATURES):
+                if name in ('rental_price', 'square_meters'):
+                    difference = np.abs(np.log(features[:, column] / wanted[column]))
+                else:
+                    difference = np.abs(features[:, column] - wanted[column])
+                # NaN (a missing value) or inf (a zero price or area) costs the flat penalty
+                difference = np.where(np.isfinite(difference), difference, MISSING_PENALTY)
+                cost += weights[name] * difference
+
+        target_mask = self.amenity_mask(_amenity_names(target.get('amenities')))
+        masks = self.amenity_masks[positions]
+        shared = np.bitwise_count(masks & target_mask)
+        union = np.bitwise_count(masks | target_mask)
+        jaccard = np.where(union > 0, 1.0 - shared / np.maximum(union, 1), 0.0)
+        cost += weights['amenities'] * jaccard
+
+        distance_m = _haversine_m(self.coordinates[positions], target['lon'], target['lat'])
+        cost += weights['distance'] * distance_m / 1000
+
+        # Stable sort: equal costs keep the KNN (nearest first) order
+        best = np.argsort(cost, kind='stable')[:k]
+        return [self._result(positions[i], cost[i], distance_m[i], shared[i]) for i in best]
+
+    def _result(self, position, cost, distance_m, shared_amenities):
+        values = self.features[position]
+        result = {'id': int(self.ids[position]), 'score': round(1 / (1 + float(cost)), 4),
+                  'distance_m': round(float(distance_m), 1)}
+        for name, value in zip(FEATURES, values):
+            if math.isnan(value):
+                result[name] = None
+            elif name in ('num_bedrooms', 'num_bathrooms'):
+                result[name] = int(value)
+            else:
+                result[name] = round(float(value), 2)
+        result['shared_amenities'] = int(shared_amenities)
+        return result
+
+
+def _haversine_m(coordinates, lon, lat):
+    lon1, lat1 = np.radians(coordinates[:, 0].astype(np.float64)), np.radians(coordinates[:, 1].astype(np.float64))
+    lon2, lat2 = math.radians(lon), math.radians(lat)
+    a = np.sin((lat1 - lat2) / 2) ** 2 + np.cos(lat1) * math.cos(lat2) * np.sin((lon1 - lon2) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def _index_rows():
+    table = Building._meta.db_table
+    return Building.objects.filter(is_available=True).annotate(
+        lon=RawSQL(f'ST_X({table}.location::geometry)', ()),
+        lat=RawSQL(f'ST_Y({table}.location::geometry)', ()),
+    ).values_list('id', *FEATURES, 'amenities', 'lon', 'lat').iterator(chunk_size=10000)
+
+
+_index_lock = threading.Lock()
+_index = None
+
+metrics.register_gauge('comparables.index_rows', lambda: len(_index) if _index is not None else 0)
+
+
+def listing_index():
+    """The current ListingIndex, rebuilt when the building change log has moved on."""
+    global _index
+    version = latest_position()
+    with _index_lock:
+        index = _index
+    min_age = getattr(settings, 'RENTALS_SIMILAR_INDEX_MIN_AGE', 1.0)
+    if index is not None and (index.version == version or time.monotonic() - index.built_at < min_age):
+        return index
+
+    def build():
+        metrics.increment('comparables.index_builds')
+        return ListingIndex.from_rows(_index_rows(), version)
+
+    index = singleflight.coalesce(('comparables_index', version), build, name='comparables_index')
+    with _index_lock:
+        if _index is None or _index.version <= index.version:
+            _index = index
+    return index
+
+
+def forget_listing_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def similar_listings(building, k):
+    """The `k` available buildings most comparable to `building`, best first."""
+    candidates = getattr(settings, 'RENTALS_SIMILAR_CANDIDATES', 200)
+    candidate_ids = list(
+        Building.objects.filter(is_available=True).exclude(pk=building.pk)
+        .order_by(GeometryDistance('location', building.location))
+        .values_list('id', flat=True)[:max(candidates, k)]
+    )
+    target = {name: getattr(building, name) for name in FEATURES}
+    target.update(amenities=building.amenities, lon=building.location.x, lat=building.location.y)
+    return listing_index().rank(target, candidate_ids, k, getattr(settings, 'RENTALS_SIMILAR_WEIGHTS', None))
@@ -0,0 +1,111 @@
+"""Content-encoding helpers shared by the static-file pipeline and the API.
+
+gzip is always available; brotli (`br`) and zstd need the `brotli` and
+`zstandard` packages and are skipped when those are not installed.
+"""
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+# Levels used when none is given: the maximum, for one-off (static) compression
+MAX_LEVELS = {'gzip': 9, 'br': 11, 'zstd': 19}
+
+
+def available_encodings():
+    """Encodings this process can produce, most preferred first."""
+    encodings = ['gzip']
+    if brotli is not None:
+        encodings.insert(0, 'br')
+    if zstandard is not None:
+        encodings.insert(0, 'zstd')
+    return encodings
+
+
+def compress(data, encoding, level=None):
+    """Compress `data` in one go; `level` defaults to the encoder's maximum."""
+    if level is None:
+        level = MAX_LEVELS.get(encoding)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data, quality=level)
+    if encoding == 'zstd' and zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f'Unsupported content encoding: {encoding}')
+
+
+class StreamCompressor:
+    """Incremental compressor: feed chunks to `compress`, then call `flush` once.
+
+    Each `compress` call returns whatever compressed output is ready (often
+    b''); `flush(final=False)` forces out everything buffered so far, so a
+    streamed response can push a chunk to the client without ending the
+    stream.
+    """
+
+    def __init__(self, encoding, level=None):
+        if level is None:
+            level = MAX_LEVELS.get(encoding)
+        self.encoding = encoding
+        if encoding == 'gzip':
+            # wbits 16 + 15: gzip container, 32 KB window
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif encoding == 'br' and brotli is not None:
+            self._obj = brotli.Compressor(quality=level)
+        elif encoding == 'zstd' and zstandard is not None:
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            raise ValueError(f'Unsupported content encoding: {encoding}')
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self, final=True):
+        if self.encoding == 'gzip':
+            return self._obj.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+        if self.encoding == 'br':
+            return self._obj.finish() if final else self._obj.flush()
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+def parse_accept_encoding(header):
+    """Map each encoding in an Accept-Encoding header to its q-value ('*' included)."""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header, offered):
+    """Pick the encoding in `offered` with the highest q-value (> 0), earlier entries
+    winning ties; None means identity."""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoding in offered:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
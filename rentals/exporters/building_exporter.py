@@ -0,0 +1,265 @@
+import json
+import os
+import struct
+import tempfile
+from itertools import islice
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import pyogrio
+from django.contrib.gis.db.models.functions import AsWKB
+from django.db.models.expressions import RawSQL
+
+from rentals.models import Building
+
+# Export formats and their content types / file extensions
+EXPORT_FORMATS = {
+    'fgb': ('application/flatgeobuf', 'fgb'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+    'csv': ('text/csv', 'csv'),
+}
+
+DEFAULT_BATCH_SIZE = 10000
+
+# (queryset field, exported column, arrow type)
+EXPORT_COLUMNS = [
+    ('id', 'id', pa.int64()),
+    ('title', 'title', pa.string()),
+    ('county', 'county', pa.string()),
+    ('district__name', 'district', pa.string()),
+    ('address', 'address', pa.string()),
+    ('rental_price', 'rental_price', pa.float64()),
+    ('num_bedrooms', 'num_bedrooms', pa.int32()),
+    ('num_bathrooms', 'num_bathrooms', pa.int32()),
+    ('square_meters', 'square_meters', pa.float64()),
+    ('pets_allowed', 'pets_allowed', pa.bool_()),
+    ('is_available', 'is_available', pa.bool_()),
+    ('available_from', 'available_from', pa.date32()),
+    ('amenities', 'amenities', pa.string()),
+    ('owner_contact', 'owner_contact', pa.string()),
+    ('updated_at', 'updated_at', pa.timestamp('us', tz='UTC')),
+    ('wkb', 'geometry', pa.binary()),
+]
+
+GEOMETRY_FIELD = pa.field('geometry', pa.binary(), metadata={
+    'ARROW:extension:name': 'geoarrow.wkb',
+    'ARROW:extension:metadata': json.dumps({'crs': 'OGC:CRS84'}),
+})
+
+# GeoParquet 1.1 file metadata; WKB from PostGIS is lon/lat, i.e. OGC:CRS84
+GEOPARQUET_METADATA = {
+    'version': '1.1.0',
+    'primary_column': 'geometry',
+    'columns': {
+        'geometry': {'encoding': 'WKB', 'geometry_types': ['Point']},
+    },
+}
+
+
+def _to_float(value):
+    return float(value) if value is not None else None
+
+
+def _to_json(value):
+    return json.dumps(value) if value is not None else None
+
+
+# Per-column conversion of queryset values to arrow-friendly Python values
+_CONVERTERS = {
+    'rental_price': _to_float,
+    'square_meters': _to_float,
+    'amenities': _to_json,
+    'geometry': bytes,
+}
+
+
+def export_schema():
+    fields = [pa.field(name, arrow_type) for _, name, arrow_type in EXPORT_COLUMNS[:-1]]
+    return pa.schema(fields + [GEOMETRY_FIELD])
+
+
+def export_queryset(queryset):
+    """Prepare a (filtered) Building queryset for export.
+
+    Rows come out in PostGIS geometry sort order, which follows a Hilbert
+    curve, so neighbouring rows (and Parquet row groups) are spatially close.
+    """
+    table = Building._meta.db_table
+    return queryset.annotate(wkb=AsWKB('location')).order_by(
+        RawSQL(f'{table}.location::geometry', ()).asc(), 'id'
+    ).values_list(*[field for field, _, _ in EXPORT_COLUMNS])
+
+
+def iter_record_batches(queryset, batch_size=DEFAULT_BATCH_SIZE):
+    """Stream the queryset as Arrow record batches of at most `batch_size` rows.
+
+    `iterator()` uses a server-side cursor on PostgreSQL, so only one batch
+    of rows is held in memory at a time.
+    """
+    schema = export_schema()
+    rows = export_queryset(queryset).iterator(chunk_size=batch_size)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return
+        columns = []
+        for index, (_, name, arrow_type) in enumerate(EXPORT_COLUMNS):
+            convert = _CONVERTERS.get(name)
+            values = [row[index] for row in chunk]
+            if convert:
+                values = [convert(v) if v is not None else None for v in values]
+            columns.append(pa.array(values, type=arrow_type))
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object that buffers writes until they are drained.
+
+    Lets the Arrow/Parquet writers feed a streaming HTTP response.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def writable(self):
+        return True
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_arrow(batches):
+    """Yield an Arrow IPC stream, one record batch at a time."""
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, export_schema()) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_parquet(batches):
+    """Yield a GeoParquet file, writing each batch as its own row group."""
+    schema = export_schema().with_metadata({'geo': json.dumps(GEOPARQUET_METADATA)})
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _point_coordinates(wkb):
+    """(lon, lat) of a 2D WKB point."""
+    return struct.unpack_from('<dd' if wkb[0] == 1 else '>dd', wkb, 5)
+
+
+def csv_batch(batch):
+    """Replace the WKB geometry column of a record batch with longitude/latitude columns."""
+    coordinates = [_point_coordinates(wkb) for wkb in batch.column('geometry').to_pylist()]
+    columns = batch.columns[:-1] + [
+        pa.array([lon for lon, _ in coordinates], type=pa.float64()),
+        pa.array([lat for _, lat in coordinates], type=pa.float64()),
+    ]
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names[:-1] + ['longitude', 'latitude'])
+
+
+def stream_csv(batches):
+    """Yield a CSV file (header first), one record batch at a time."""
+    sink = _ChunkSink()
+    writer = None
+    for batch in batches:
+        batch = csv_batch(batch)
+        if writer is None:
+            writer = pacsv.CSVWriter(sink, batch.schema)
+        writer.write_batch(batch)
+        yield sink.drain()
+    if writer is None:
+        # No rows: still send the header
+        writer = pacsv.CSVWriter(sink, csv_batch(pa.RecordBatch.from_pylist([], schema=export_schema())).schema)
+    writer.close()
+    yield sink.drain()
+
+
+def write_flatgeobuf(batches, path):
+    """Write a FlatGeobuf file with a packed Hilbert R-tree index to `path`.
+
+    GDAL needs every feature before it can write the index, so it spools
+    features to a temporary file rather than holding them in memory.
+    """
+    reader = pa.RecordBatchReader.from_batches(export_schema(), batches)
+    pyogrio.write_arrow(
+        reader, path, driver='FlatGeobuf', layer='buildings',
+        geometry_name='geometry', geometry_type='Point', crs='EPSG:4326',
+        layer_options={'SPATIAL_INDEX': 'YES'},
+    )
+
+
+def stream_flatgeobuf(batches, chunk_size=1024 * 1024):
+    """Yield a FlatGeobuf file built in a temporary directory."""
+    with tempfile.TemporaryDirectory(prefix='rentals-export-') as tmpdir:
+        path = os.path.join(tmpdir, 'buildings.fgb')
+        write_flatgeobuf(batches, path)
+        with open(path, 'rb') as fh:
+            while True:
+                data = fh.read(chunk_size)
+                if not data:
+                    return
+                yield data
+
+
+def stream_export(queryset, export_format, batch_size=DEFAULT_BATCH_SIZE):
+    """Return an iterator of bytes for `queryset` in one of EXPORT_FORMATS."""
+    batches = iter_record_batches(queryset, batch_size=batch_size)
+    if export_format == 'fgb':
+        return stream_flatgeobuf(batches)
+    if export_format == 'parquet':
+        return stream_parquet(batches)
+    if export_format == 'arrow':
+        return stream_arrow(batches)
+    if export_format == 'csv':
+        return stream_csv(batches)
+    raise ValueError(f'Unsupported export format: {export_format}')
+
+
+def export_to_file(queryset, export_format, path, batch_size=DEFAULT_BATCH_SIZE):
+    """Write an export to `path` and return the number of rows written."""
+    count = 0
+
+    def counted(batches):
+        nonlocal count
+        for batch in batches:
+            count += batch.num_rows
+            yield batch
+
+    batches = counted(iter_record_batches(queryset, batch_size=batch_size))
+    if export_format == 'fgb':
+        write_flatgeobuf(batches, path)
+        return count
+    writers = {'parquet': stream_parquet, 'arrow': stream_arrow, 'csv': stream_csv}
+    if export_format not in writers:
+        raise ValueError(f'Unsupported export format: {export_format}')
+    with open(path, 'wb') as fh:
+        for data in writers[export_format](batches):
+            fh.write(data)
+    return count
@@ -0,0 +1,16 @@
+"""Cached template fragments and their invalidation.
+
+The district pickers on the map and account pages are rendered once and
+kept in the Django cache under a fixed fragment name, so repeat page views
+run no query at all. Any District save or delete drops them (signals.py)
+once the transaction commits; with a per-process cache backend other
+workers refresh after RENTALS_FRAGMENT_CACHE_TIMEOUT.
+"""
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+DISTRICT_FRAGMENTS = ('district_options', 'district_datalist')
+
+
+def invalidate_district_fragments():
+    cache.delete_many([make_template_fragment_key(name) for name in DISTRICT_FRAGMENTS])
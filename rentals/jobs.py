@@ -0,0 +1,67 @@
+"""Minimal in-process job queue.
+
+`enqueue(func, *args)` hands the call to one daemon worker thread per
+process and returns immediately. Jobs live in memory only: anything still
+queued when the process exits is lost, so only enqueue work that is safe to
+skip (e.g. clean-ups). With `RENTALS_JOBS_EAGER` set, jobs run inline in
+the caller, which is what the tests use.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from rentals import metrics
+
+logger = logging.getLogger(__name__)
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+metrics.register_gauge('jobs.queued', _queue.qsize)
+
+
+def _run(func, args):
+    try:
+        func(*args)
+    except Exception:
+        metrics.increment('jobs.failed', job=func.__name__)
+        logger.exception('Background job %s failed', func.__name__)
+    else:
+        metrics.increment('jobs.done', job=func.__name__)
+
+
+def _work():
+    while True:
+        func, args = _queue.get()
+        close_old_connections()
+        try:
+            _run(func, args)
+        finally:
+            # Do not keep a connection (or an aborted transaction) between jobs
+            connection.close()
+            _queue.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name='rentals-jobs', daemon=True)
+            _worker.start()
+
+
+def enqueue(func, *args):
+    if getattr(settings, 'RENTALS_JOBS_EAGER', False):
+        _run(func, args)
+        return
+    _ensure_worker()
+    _queue.put((func, args))
+
+
+def join():
+    """Block until every queued job has run."""
+    _queue.join()
@@ -0,0 +1,238 @@
+"""Building import engine used by `manage.py import_buildings`.
+
+The source (CSV, GeoJSON, GeoPackage or (Geo)Parquet) is read in shards of
+`shard_size` rows. Shards are parsed and validated (building_rows.py) in a
+pool of worker processes, and the parsed shards flow back, in source
+order, to a single writer in this process that inserts each one with
+`bulk_create` in its own transaction. At most two shards per worker are in
+flight, so memory stays bounded whatever the file size.
+
+Each run is tracked by an ImportJob keyed by the file's sha256. The
+transaction that writes a shard also moves the job's `next_row` past it, so
+after a failure a rerun over the same file resumes at the first row not
+committed. Rows are upserted on their `import_key`, so rows that are
+imported twice (an overlapping file, a restart) update the building they
+created the first time.
+"""
+import hashlib
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pyogrio
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.utils import timezone
+
+from rentals.changelog import record_building_changes
+from rentals.loaders.building_rows import parse_shard
+from rentals.models import Building, BuildingChange, District, ImportJob, ProfileBuilding
+from rentals.proximity import refresh_nearest_pois
+
+DEFAULT_SHARD_SIZE = 5000
+
+SOURCE_FORMATS = {
+    '.csv': 'csv',
+    '.geojson': 'ogr',
+    '.json': 'ogr',
+    '.gpkg': 'ogr',
+    '.parquet': 'parquet',
+    '.geoparquet': 'parquet',
+}
+
+# Coordinate systems the importer accepts as lon/lat WGS 84
+WGS84 = {None, 'EPSG:4326', 'OGC:CRS84'}
+
+# Columns an import sets; on an import_key conflict these are overwritten
+IMPORT_FIELDS = [
+    'title', 'county', 'district', 'address', 'location', 'pets_allowed', 'rental_price', 'num_bedrooms',
+    'num_bathrooms', 'square_meters', 'available_from', 'is_available', 'description', 'amenities',
+    'owner_contact', 'updated_at',
+]
+
+
+class ImportSourceError(ValueError):
+    """The source file cannot be read as buildings."""
+
+
+class AlreadyImported(Exception):
+    """The file was imported completely before; carries that ImportJob."""
+
+    def __init__(self, job):
+        super().__init__(f'{job.source} was already imported on {job.finished_at:%Y-%m-%d %H:%M}.')
+        self.job = job
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_format(path):
+    fmt = SOURCE_FORMATS.get(Path(path).suffix.lower())
+    if fmt is None:
+        raise ImportSourceError(f"Unsupported file type {Path(path).suffix!r}; use one of {', '.join(SOURCE_FORMATS)}.")
+    return fmt
+
+
+def _read_csv(path, shard_size):
+    yield from pd.read_csv(path, chunksize=shard_size)
+
+
+def _read_parquet(path, shard_size):
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=shard_size):
+        yield batch.to_pandas()
+
+
+def _read_ogr(path, shard_size):
+    with pyogrio.open_arrow(path, batch_size=shard_size, use_pyarrow=True) as (meta, reader):
+        if meta.get('crs') not in WGS84:
+            raise ImportSourceError(f"Expected lon/lat (EPSG:4326) coordinates, got {meta.get('crs')}.")
+        geometry_name = meta.get('geometry_name') or 'wkb_geometry'
+        for batch in reader:
+            yield batch.to_pandas().rename(columns={geometry_name: 'geometry'})
+
+
+_READERS = {'csv': _read_csv, 'parquet': _read_parquet, 'ogr': _read_ogr}
+
+
+def read_shards(path, shard_size=DEFAULT_SHARD_SIZE, start_row=0):
+    """Yield (first row number, DataFrame) shards of the source file, from row `start_row` on."""
+    start = 0
+    for frame in _READERS[source_format(path)](str(path), shard_size):
+        end = start + len(frame)
+        if end > start_row:
+            skip = max(start_row - start, 0)
+            yield start + skip, frame.iloc[skip:]
+        start = end
+
+
+def parse_shards(shards, workers=1):
+    """Parse shards in `workers` processes; yield (start, rows, skipped) in source order."""
+    if workers <= 1:
+        for start, frame in shards:
+            yield parse_shard(start, frame)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for start, frame in shards:
+            pending.append(executor.submit(parse_shard, start, frame))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class BuildingWriter:
+    """Upserts parsed rows and links them to `profile`, one transaction per shard."""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.district_ids = dict(District.objects.values_list('name', 'id'))
+
+    def build(self, rows):
+        """Return ([(row number, Building)], [(row number, reason)]) for parsed rows.
+
+        Of several rows with the same import key only the last is kept, as
+        an upsert would leave it.
+        """
+        buildings, skipped = {}, []
+        for row_number, data in rows:
+            data = dict(data)
+            district_id = self.district_ids.get(data.pop('district'))
+            if district_id is None:
+                skipped.append((row_number, 'Skipping row with an unknown district.'))
+                continue
+            location = Point(data.pop('lon'), data.pop('lat'), srid=4326)
+            previous = buildings.pop(data['import_key'], None)
+            if previous is not None:
+                skipped.append((previous[0], f'Skipping row duplicated by row {row_number + 1}.'))
+            buildings[data['import_key']] = (row_number, Building(district_id=district_id, location=location, **data))
+        return sorted(buildings.values(), key=lambda item: item[0]), skipped
+
+    def write(self, buildings, job=None, next_row=None):
+        """Upsert Building instances; return how many were written.
+
+        When given, `job` is saved with `next_row` in the same transaction.
+        """
+        with transaction.atomic():
+            if buildings:
+                Building.objects.bulk_create(
+                    buildings, update_conflicts=True, unique_fields=['import_key'], update_fields=IMPORT_FIELDS,
+                )
+                ProfileBuilding.objects.bulk_create(
+                    [ProfileBuilding(profile=self.profile, building_id=building.id) for building in buildings],
+                    ignore_conflicts=True,
+                )
+                # bulk_create skips the save handlers that maintain the change log and nearest POIs
+                record_building_changes([building.id for building in buildings], BuildingChange.UPSERT)
+                refresh_nearest_pois([building.id for building in buildings])
+            if job is not None:
+                job.next_row = next_row
+                job.save()
+        return len(buildings)
+
+
+def _start_job(path, file_hash, restart):
+    job = ImportJob.objects.filter(file_hash=file_hash).order_by('-started_at', '-id').first()
+    if job is None or restart:
+        return ImportJob.objects.create(source=str(path), file_hash=file_hash)
+    if job.status == ImportJob.DONE:
+        raise AlreadyImported(job)
+    job.status = ImportJob.RUNNING
+    job.source = str(path)
+    job.save()
+    return job
+
+
+def import_buildings(path, profile, workers=None, shard_size=DEFAULT_SHARD_SIZE, on_skip=None, on_progress=None,
+                     dry_run=False, restart=False):
+    """Import the buildings in `path` for `profile`; return the ImportJob.
+
+    Resumes an unfinished job for the same file unless `restart` is set, and
+    raises AlreadyImported for a finished one. `dry_run` parses and
+    validates everything (including districts) but writes nothing; the
+    returned job is then unsaved. `on_skip(row_number, reason)` is called
+    for every row that is not imported and `on_progress(job, rows, seconds)`
+    after every shard, with the rows processed by this run so far.
+    """
+    workers = workers or os.cpu_count() or 1
+    writer = BuildingWriter(profile)
+    if dry_run:
+        job = ImportJob(source=str(path))
+    else:
+        job = _start_job(path, file_hash=file_sha256(path), restart=restart)
+    start_row = job.next_row
+    started = time.monotonic()
+    try:
+        for start, rows, parse_skipped in parse_shards(read_shards(path, shard_size, start_row), workers):
+            buildings, write_skipped = writer.build(rows)
+            next_row = start + len(rows) + len(parse_skipped)
+            skipped = sorted(parse_skipped + write_skipped)
+            job.created_count += len(buildings)
+            job.skipped_count += len(skipped)
+            if dry_run:
+                job.next_row = next_row
+            else:
+                writer.write([building for _, building in buildings], job=job, next_row=next_row)
+            if on_skip:
+                for row_number, reason in skipped:
+                    on_skip(row_number, reason)
+            if on_progress:
+                on_progress(job, job.next_row - start_row, time.monotonic() - started)
+    except BaseException:
+        if not dry_run:
+            ImportJob.objects.filter(pk=job.pk).update(status=ImportJob.FAILED, updated_at=timezone.now())
+        raise
+    if not dry_run:
+        job.status = ImportJob.DONE
+        job.finished_at = timezone.now()
+        job.save()
+    return job
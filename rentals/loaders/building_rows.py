@@ -0,0 +1,223 @@
+"""Parsing and validation of building rows for `import_buildings`.
+
+This module deliberately imports nothing from Django, so shards can be
+parsed in worker processes (see building_loader.py) without setting up
+Django there. A parsed row is a plain dict of Building field values plus
+`lon`/`lat` and the district *name*; the writer resolves the rest.
+
+Every row also gets an `import_key`: a hash of its `source_id` column when
+the source has one, else of its coordinates (to 6 decimals, ~0.1 m) and
+address (title when there is no address). Re-importing a row with the same
+key updates the building instead of adding a second one.
+"""
+import hashlib
+import json
+import random
+import struct
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+
+
+def normalize_column(name: str) -> str:
+    return name.strip().lower().replace(" ", "_")
+
+
+def parse_bool(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(int(value))
+    str_value = str(value).strip().lower()
+    if str_value in {"true", "1", "yes", "y"}:
+        return True
+    if str_value in {"false", "0", "no", "n"}:
+        return False
+    return None
+
+
+def parse_decimal(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return Decimal(str(value))
+
+
+def parse_int(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return int(value)
+
+
+def parse_date(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    parsed = pd.to_datetime(value, errors="coerce")
+    if pd.isna(parsed):
+        return None
+    return parsed.date()
+
+
+def random_amenities():
+    options = ["wifi", "pool", "parking", "gym"]
+    count = random.randint(0, len(options))
+    return random.sample(options, count)
+
+
+def point_from_wkb(value):
+    """(lon, lat) of a WKB/EWKB point, or None for anything else."""
+    if not isinstance(value, (bytes, bytearray, memoryview)) or len(value) < 21:
+        return None
+    value = bytes(value)
+    order = '<' if value[0] == 1 else '>'
+    (geom_type,) = struct.unpack_from(order + 'I', value, 1)
+    offset = 5
+    if geom_type & 0x20000000:
+        # EWKB with an embedded SRID
+        offset += 4
+    if (geom_type & 0x0FFFFFFF) % 1000 != 1:
+        return None
+    return struct.unpack_from(order + 'dd', value, offset)
+
+
+def import_key(source_id, lon, lat, address=None, title=None):
+    """Natural key of an imported row (64 hex characters)."""
+    if source_id is not None and str(source_id).strip():
+        raw = f"id:{str(source_id).strip()}"
+    else:
+        label = " ".join(str(address if address is not None else title or "").lower().split())
+        raw = f"loc:{lon:.6f},{lat:.6f}|{label}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class RowError(ValueError):
+    """The row cannot be imported; the message says why."""
+
+
+class RowParser:
+    """Turns source rows into Building field values.
+
+    Columns are matched by `normalize_column`, so "Rental Price" and
+    "rental_price" are the same column. Coordinates come from
+    latitude/longitude columns, a "lat,lon" location string or a WKB point
+    geometry, in that order.
+    """
+
+    def __init__(self, columns):
+        self._positions = {}
+        for position, column in enumerate(columns):
+            self._positions.setdefault(normalize_column(str(column)), position)
+
+    def get_value(self, row, key):
+        position = self._positions.get(normalize_column(key))
+        if position is None:
+            return None
+        value = row[position]
+        if value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and pd.isna(value)):
+            return None
+        return value
+
+    def _coordinates(self, row):
+        lat = self.get_value(row, "latitude")
+        lon = self.get_value(row, "longitude")
+
+        if lat is None or lon is None:
+            location_value = self.get_value(row, "location")
+            if isinstance(location_value, str):
+                coords = [c for c in location_value.replace(" ", "").split(",") if c]
+                if len(coords) == 2:
+                    lat = lat or coords[0]
+                    lon = lon or coords[1]
+            elif isinstance(location_value, (list, tuple)) and len(location_value) == 2:
+                lat = lat or location_value[0]
+                lon = lon or location_value[1]
+
+        if lat is None or lon is None:
+            point = point_from_wkb(self.get_value(row, "geometry"))
+            if point is not None:
+                lon, lat = point
+
+        if lat is None or lon is None:
+            raise RowError("Skipping row without valid coordinates.")
+        try:
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            raise RowError("Skipping row with invalid coordinates.")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise RowError("Skipping row with invalid coordinates.")
+        return lon, lat
+
+    def parse(self, row):
+        """Return the field values of one row, or raise RowError."""
+        get_value = self.get_value
+        lon, lat = self._coordinates(row)
+        district = get_value(row, "district")
+        if district is None:
+            raise RowError("Skipping row without a district.")
+
+        try:
+            building_data = {
+                "title": get_value(row, "title"),
+                "county": get_value(row, "county"),
+                "district": str(district).strip(),
+                "address": get_value(row, "address"),
+                "lon": lon,
+                "lat": lat,
+                "pets_allowed": parse_bool(get_value(row, "pets_allowed")),
+                "rental_price": parse_decimal(
+                    get_value(row, "rental_price") or get_value(row, "rent")
+                ),
+                "num_bedrooms": parse_int(
+                    get_value(row, "num_bedrooms") or get_value(row, "bedroom")
+                ),
+                "num_bathrooms": parse_int(
+                    get_value(row, "num_bathrooms") or get_value(row, "bathroom")
+                ),
+                "square_meters": parse_decimal(
+                    get_value(row, "square_meters") or get_value(row, "area")
+                ),
+                "available_from": parse_date(get_value(row, "available_from")),
+                "is_available": parse_bool(get_value(row, "is_available")),
+                "description": get_value(row, "description"),
+                "amenities": get_value(row, "amenities"),
+                "owner_contact": get_value(row, "owner_contact"),
+            }
+        except (InvalidOperation, TypeError, ValueError, OverflowError):
+            raise RowError("Skipping row with invalid numeric values.")
+
+        building_data["import_key"] = import_key(
+            get_value(row, "source_id"), lon, lat, building_data["address"], building_data["title"],
+        )
+
+        if hasattr(building_data["amenities"], "tolist"):
+            # list columns (Parquet) arrive as numpy arrays
+            building_data["amenities"] = building_data["amenities"].tolist()
+        if isinstance(building_data["amenities"], str):
+            raw_amenities = building_data["amenities"].strip()
+            if raw_amenities.startswith("{") or raw_amenities.startswith("["):
+                try:
+                    building_data["amenities"] = json.loads(raw_amenities)
+                except json.JSONDecodeError:
+                    pass
+
+        if not building_data.get("amenities"):
+            building_data["amenities"] = random_amenities()
+
+        return {k: v for k, v in building_data.items() if v is not None}
+
+
+def parse_shard(start, frame):
+    """Parse one shard (a DataFrame whose first row is source row `start`).
+
+    Returns (start, rows, skipped): `rows` are (row number, field values)
+    pairs and `skipped` are (row number, reason) pairs.
+    """
+    parser = RowParser(frame.columns)
+    rows, skipped = [], []
+    for offset, row in enumerate(frame.itertuples(index=False, name=None)):
+        try:
+            rows.append((start + offset, parser.parse(row)))
+        except RowError as e:
+            skipped.append((start + offset, str(e)))
+    return start, rows, skipped
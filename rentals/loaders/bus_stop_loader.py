@@ -3,6 +3,8 @@ from django.conf import settings
 from django.contrib.gis.utils import LayerMapping
 from rentals.models import BusStop
 from django.db import transaction
+from rentals import versioning
+from rentals.transit import rebuild_stop_routes
 
 bus_stop_mapping = {
     'name': 'stop_name',
@@ -17,4 +19,6 @@ def import_bus_stops(verbose=True):
         BusStop.objects.all().delete()
         lm = LayerMapping(BusStop, bus_stop_shp, bus_stop_mapping, transform=False, encoding='utf-8')
         lm.save(strict=True, verbose=verbose)
+        rebuild_stop_routes()
+        versioning.bump(versioning.POIS)
 
@@ -3,6 +3,7 @@ from django.conf import settings
 from django.contrib.gis.utils import LayerMapping
 from rentals.models import District
 from django.db import transaction
+from rentals import versioning
 
 district_mapping = {
     'name': 'adm2_name',
@@ -17,4 +18,5 @@ def import_districts(verbose=True):
     with transaction.atomic():
         District.objects.all().delete()
         lm = LayerMapping(District, district_shp, district_mapping, transform=False, encoding='utf-8')
-        lm.save(strict=True, verbose=verbose)
\ No newline at end of file
+        lm.save(strict=True, verbose=verbose)
+        versioning.bump(versioning.DISTRICTS)
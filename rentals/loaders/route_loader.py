@@ -2,6 +2,8 @@ import os
 from django.contrib.gis.utils import LayerMapping
 from rentals.models import Route
 from django.db import transaction
+from rentals import versioning
+from rentals.transit import rebuild_stop_routes
 from django.conf import settings
 
 route_mapping = {
@@ -18,3 +20,5 @@ def import_routes(verbose=True):
         Route.objects.all().delete()
         lm = LayerMapping(Route, route_shp, route_mapping, transform=False, encoding='utf-8')
         lm.save(strict=True, verbose=verbose)
+        rebuild_stop_routes()
+        versioning.bump(versioning.POIS)
@@ -2,6 +2,7 @@ import os
 from django.contrib.gis.utils import LayerMapping
 from rentals.models import Shops
 from django.db import transaction
+from rentals import versioning
 from django.conf import settings
 
 shop_mapping = {
@@ -17,4 +18,5 @@ def import_shops(verbose=True):
         Shops.objects.all().delete()
         lm = LayerMapping(Shops, shop_shp, shop_mapping, transform=False, encoding='utf-8')
         lm.save(strict=True, verbose=verbose)
+        versioning.bump(versioning.POIS)
 
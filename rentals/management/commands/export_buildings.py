@@ -0,0 +1,59 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from rentals.api.v1.views import _apply_building_filters
+from rentals.exporters.building_exporter import EXPORT_FORMATS, DEFAULT_BATCH_SIZE, export_to_file
+from rentals.proximity import NEAREST_DISTANCE_FILTERS
+
+# List API filters forwarded as they are (option dest == parameter name); ordering does not
+# apply, exports come out in spatial order
+LIST_PARAMS = ('district', 'price_min', 'price_max', 'available', 'available_by', *NEAREST_DISTANCE_FILTERS,
+               'reachable_from', 'max_transfers')
+
+class Command(BaseCommand):
+    help = 'Export buildings to FlatGeobuf, GeoParquet, Arrow or CSV, using the same filters as the list API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', choices=sorted(EXPORT_FORMATS), required=True,
+                            help='Output format.')
+        parser.add_argument('--output', default=None,
+                            help='Output file path (default: buildings.<ext> in the current directory).')
+        parser.add_argument('--district', default=None, help='Only export buildings in this district.')
+        parser.add_argument('--price-min', default=None, help='Minimum rental price.')
+        parser.add_argument('--price-max', default=None, help='Maximum rental price.')
+        parser.add_argument('--available', choices=('true', 'false'), default=None,
+                            help='Only export available (true) or unavailable (false) buildings.')
+        parser.add_argument('--available-by', default=None, metavar='YYYY-MM-DD',
+                            help='Only export buildings available on or before this date.')
+        for param, field in NEAREST_DISTANCE_FILTERS.items():
+            parser.add_argument(f"--{param.replace('_', '-')}", default=None, metavar='METRES',
+                                help=f'Maximum {field} (precomputed distance to the nearest POI).')
+        parser.add_argument('--reachable-from', default=None, metavar='LAT,LON',
+                            help='Only export buildings reachable by matatu from this point.')
+        parser.add_argument('--max-transfers', default=None, help='Route changes allowed with --reachable-from.')
+        parser.add_argument('--poi', action='append', default=[], metavar='TYPE:RADIUS',
+                            help='Proximity filter, e.g. shops:500 (repeatable; TYPE is shops, bus_stop or route).')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Rows fetched and written per batch.')
+
+    def handle(self, *args, **kwargs):
+        export_format = kwargs['export_format']
+        _, extension = EXPORT_FORMATS[export_format]
+        output = Path(kwargs['output'] or f'buildings.{extension}').expanduser().resolve()
+
+        params = QueryDict(mutable=True)
+        for key in LIST_PARAMS:
+            if kwargs[key]:
+                params[key] = kwargs[key]
+        for poi in kwargs['poi']:
+            poi_type, sep, radius = poi.partition(':')
+            if not sep:
+                raise CommandError(f'Invalid --poi value {poi!r}; expected TYPE:RADIUS.')
+            params.appendlist('poi_type', poi_type)
+            params.appendlist('poi_radius', radius)
+
+        queryset = _apply_building_filters(params)
+        count = export_to_file(queryset, export_format, str(output), batch_size=kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Exported {count} buildings to {output}'))
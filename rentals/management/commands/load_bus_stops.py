@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from rentals.loaders.bus_stop_loader import import_bus_stops
 
@@ -7,3 +8,5 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         import_bus_stops(verbose=True)
         self.stdout.write(self.style.SUCCESS('Successfully loaded bus stops from shapefile'))
+        # The buildings' nearest-POI columns point at the replaced rows until refreshed
+        call_command('refresh_nearest_pois', stdout=self.stdout)
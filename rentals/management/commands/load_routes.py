@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from rentals.loaders.route_loader import import_routes
 
@@ -7,3 +8,5 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         import_routes(verbose=True)
         self.stdout.write(self.style.SUCCESS('Successfully loaded matatu routes from shapefile'))
+        # The buildings' nearest-POI columns point at the replaced rows until refreshed
+        call_command('refresh_nearest_pois', stdout=self.stdout)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from rentals.changelog import prune_changes, retention
+
+class Command(BaseCommand):
+    help = 'Delete building change-log entries older than RENTALS_CHANGELOG_RETENTION_DAYS'
+
+    def handle(self, *args, **kwargs):
+        deleted = prune_changes()
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {deleted} building change-log entries older than {retention().days} days'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rentals import versioning
+from rentals.transit import rebuild_stop_routes
+
+class Command(BaseCommand):
+    help = 'Relink bus stops to the matatu routes passing within RENTALS_TRANSIT_SNAP_METRES'
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            links = rebuild_stop_routes()
+            versioning.bump(versioning.POIS)
+        self.stdout.write(self.style.SUCCESS(f'Linked stops and routes with {links} stop-route pairs'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from rentals.proximity import refresh_nearest_pois
+
+class Command(BaseCommand):
+    help = 'Recompute the nearest bus stop, shop and route columns of every building'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Buildings per UPDATE (default: RENTALS_NEAREST_POI_BATCH_SIZE).')
+
+    def handle(self, *args, **options):
+        updated = refresh_nearest_pois(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated the nearest POIs of {updated} buildings'))
@@ -0,0 +1,44 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from benchmarks.suite import run_suite, compare_results
+
+class Command(BaseCommand):
+    help = 'Time the rentals hot paths and optionally compare against a previous run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case (loaders and imports run once).')
+        parser.add_argument('--only', default=None, help='Only run cases whose name contains this string.')
+        parser.add_argument('--output', default=None, help='Write results as JSON to this path.')
+        parser.add_argument('--compare', default=None, help='Baseline results JSON to compare against.')
+        parser.add_argument('--threshold', type=float, default=0.15,
+                            help='Allowed median slowdown as a fraction before a case is flagged (default 0.15).')
+
+    def handle(self, *args, **kwargs):
+        baseline = None
+        if kwargs['compare']:
+            baseline_path = Path(kwargs['compare']).expanduser()
+            if not baseline_path.exists():
+                raise CommandError(f'Baseline file not found: {baseline_path}')
+            baseline = json.loads(baseline_path.read_text())
+
+        try:
+            results = run_suite(repeat=kwargs['repeat'], only=kwargs['only'], stdout=self.stdout)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if kwargs['output']:
+            Path(kwargs['output']).expanduser().write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Wrote results to {kwargs['output']}"))
+
+        if baseline is not None:
+            regressions = compare_results(baseline, results, threshold=kwargs['threshold'])
+            if regressions:
+                for r in regressions:
+                    self.stdout.write(self.style.ERROR(
+                        f"REGRESSION {r['case']}: {r['baseline_ms']} ms -> {r['current_ms']} ms "
+                        f"(x{r['ratio']}), queries {r['baseline_queries']} -> {r['current_queries']}"
+                    ))
+                raise CommandError(f'{len(regressions)} benchmark case(s) regressed')
+            self.stdout.write(self.style.SUCCESS('No regressions against baseline'))
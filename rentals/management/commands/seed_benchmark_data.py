@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from benchmarks.dataset import generate_dataset, clear_dataset
+
+class Command(BaseCommand):
+    help = 'Generate a seeded synthetic dataset (buildings, shops, stops, routes) for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buildings', type=int, default=1000, help='Number of buildings to generate.')
+        parser.add_argument('--shops', type=int, default=200, help='Number of shops to generate.')
+        parser.add_argument('--stops', type=int, default=200, help='Number of bus stops to generate.')
+        parser.add_argument('--routes', type=int, default=20, help='Number of matatu routes to generate.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed yields the same dataset.')
+        parser.add_argument('--clear', action='store_true', help='Only delete previously generated benchmark data.')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['clear']:
+            clear_dataset()
+            self.stdout.write(self.style.SUCCESS('Removed benchmark data'))
+            return
+        try:
+            counts = generate_dataset(
+                buildings=kwargs['buildings'],
+                shops=kwargs['shops'],
+                stops=kwargs['stops'],
+                routes=kwargs['routes'],
+                seed=kwargs['seed'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            'Generated {buildings} buildings, {shops} shops, {stops} bus stops and {routes} routes (seed {seed})'.format(**counts)
+        ))
@@ -0,0 +1,42 @@
+"""Process-local counters and gauges exposed on the metrics endpoint.
+
+Each worker process keeps its own numbers (the endpoint reports the pid it
+was served by); scrape every worker or aggregate downstream.
+"""
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters = Counter()
+_gauges = {}
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{k}={v}' for k, v in sorted(labels.items())) + '}'
+
+
+def increment(name, value=1, **labels):
+    """Add `value` to the counter `name`, e.g. increment('query_guard.rejected', reason='pair_limit')."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] += value
+
+
+def register_gauge(name, func):
+    """Report `func()` under `name` whenever metrics are read."""
+    _gauges[name] = func
+
+
+def snapshot():
+    with _lock:
+        counters = dict(sorted(_counters.items()))
+    gauges = {name: func() for name, func in sorted(_gauges.items())}
+    return {'counters': counters, 'gauges': gauges}
+
+
+def reset():
+    """Zero all counters (tests)."""
+    with _lock:
+        _counters.clear()
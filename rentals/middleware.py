@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+
+from rentals import metrics
+from rentals.compression import StreamCompressor, available_encodings, compress, negotiate
+from rentals.poi_cache import LRUCache
+
+logger = logging.getLogger('rentals.timing')
+
+# Timings of the request currently being handled, None when instrumentation is off
+_current_timings = ContextVar('rentals_request_timings', default=None)
+
+# Upper bound on the statements kept per request for the slow-request dump
+MAX_CAPTURED_QUERIES = 200
+
+
+class RequestTimings:
+    """Collects SQL and section timings for a single request.
+
+    Instances are installed as a `connection.execute_wrapper` so every
+    statement run on the default connection is counted and timed.
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0
+        self.slowest_sql = None
+        self.slowest_time = 0.0
+        self.queries = []
+        self.sections = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.query_count += 1
+            self.query_time += elapsed
+            if elapsed >= self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_sql = sql
+            if len(self.queries) < MAX_CAPTURED_QUERIES:
+                self.queries.append((sql, elapsed))
+
+    def add_section(self, name, elapsed):
+        self.sections[name] = self.sections.get(name, 0.0) + elapsed
+
+
+@contextmanager
+def timed_section(name):
+    """Time a block of view code (e.g. serialization) for the current request.
+
+    This is a no-op when the timing middleware is not installed.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_section(name, time.perf_counter() - start)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+class RequestTimingMiddleware:
+    """Opt-in per-request SQL and latency instrumentation.
+
+    Enabled with the `RENTALS_REQUEST_TIMING` setting. When disabled the
+    middleware removes itself from the chain (MiddlewareNotUsed), so it adds
+    no overhead. When enabled, each response gets a `Server-Timing` header
+    and a structured log line on the `rentals.timing` logger; requests slower
+    than `RENTALS_SLOW_REQUEST_MS` also log every captured SQL statement.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'RENTALS_REQUEST_TIMING', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.slow_request_ms = getattr(settings, 'RENTALS_SLOW_REQUEST_MS', None)
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        request._timing_view_start = None
+        request._timing_view_end = None
+        token = _current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timings):
+                response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        total = time.perf_counter() - start
+
+        view_time = None
+        if request._timing_view_start is not None:
+            view_end = request._timing_view_end or time.perf_counter()
+            view_time = view_end - request._timing_view_start
+
+        self._add_server_timing(response, timings, view_time, total)
+        self._log(request, response, timings, view_time, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing_view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, so the view ends here
+        # and rendering is timed separately through a post-render callback.
+        request._timing_view_end = time.perf_counter()
+        timings = _current_timings.get()
+        if timings is not None:
+            render_start = time.perf_counter()
+
+            def _record_render(rendered):
+                timings.add_section('render', time.perf_counter() - render_start)
+                return rendered
+
+            response.add_post_render_callback(_record_render)
+        return response
+
+    def _add_server_timing(self, response, timings, view_time, total):
+        metrics = [f'db;dur={_ms(timings.query_time)};desc="{timings.query_count} queries"']
+        for name, elapsed in timings.sections.items():
+            metrics.append(f'{name};dur={_ms(elapsed)}')
+        if view_time is not None:
+            metrics.append(f'view;dur={_ms(view_time)}')
+        metrics.append(f'total;dur={_ms(total)}')
+        response['Server-Timing'] = ', '.join(metrics)
+
+    def _log(self, request, response, timings, view_time, total):
+        record = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'queries': timings.query_count,
+            'db_ms': _ms(timings.query_time),
+            'slowest_query_ms': _ms(timings.slowest_time),
+            'slowest_query': timings.slowest_sql,
+            'view_ms': _ms(view_time) if view_time is not None else None,
+            'total_ms': _ms(total),
+        }
+        for name, elapsed in timings.sections.items():
+            record[f'{name}_ms'] = _ms(elapsed)
+        logger.info(json.dumps(record))
+
+        if self.slow_request_ms is not None and record['total_ms'] >= self.slow_request_ms:
+            statements = '\n'.join(f'[{_ms(elapsed)} ms] {sql}' for sql, elapsed in timings.queries)
+            logger.warning(
+                'Slow request %s %s took %s ms (%s queries):\n%s',
+                request.method, request.get_full_path(), record['total_ms'], timings.query_count, statements
+            )
+
+
+# Media types worth compressing; everything else (images, and Parquet and FlatGeobuf,
+# which clients read by byte range) passes through
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/geo+json', 'application/x-ndjson',
+    'application/vnd.apache.arrow.stream', 'text/',
+)
+
+DEFAULT_COMPRESSION_ENCODINGS = ('zstd', 'br', 'gzip')
+
+# Fast settings for on-the-fly compression; the static pipeline uses the maximum
+DEFAULT_COMPRESSION_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+
+# Compressed bodies of cacheable responses, keyed by (encoding, level, body digest)
+compressed_cache = LRUCache(getattr(settings, 'RENTALS_COMPRESS_CACHE_SIZE', 32))
+
+# A streamed response is flushed to the client after at least this much input
+STREAM_FLUSH_BYTES = 64 * 1024
+
+
+def _compress_stream(chunks, encoding, level):
+    compressor = StreamCompressor(encoding, level)
+    pending = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_BYTES:
+            data += compressor.flush(final=False)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def _compress_async_stream(chunks, encoding, level):
+    compressor = StreamCompressor(encoding, level)
+    pending = 0
+    async for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_BYTES:
+            data += compressor.flush(final=False)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CompressionMiddleware:
+    """Negotiated gzip/brotli/zstd compression of API responses.
+
+    Only paths under `RENTALS_COMPRESS_PATHS` are touched: API responses
+    carry no session or CSRF secrets next to user input, so compressing them
+    does not open the BREACH side channel that compressing HTML pages would.
+    The encoding is the one the client prefers (Accept-Encoding q-values)
+    among `RENTALS_COMPRESSION_ENCODINGS`, compressed at the level from
+    `RENTALS_COMPRESSION_LEVELS`.
+
+    Buffered bodies smaller than `RENTALS_COMPRESS_MIN_SIZE` are sent as is.
+    Streamed responses (exports) are compressed chunk by chunk and flushed
+    every STREAM_FLUSH_BYTES of input. Cacheable buffered responses (with
+    an ETag or a public max-age) keep their compressed bytes in an
+    in-process LRU keyed by the body's digest, so repeated reads of the same
+    payload are compressed once.
+    """
+
+    def __init__(self, get_response):
+        installed = available_encodings()
+        self.encodings = [e for e in getattr(settings, 'RENTALS_COMPRESSION_ENCODINGS', DEFAULT_COMPRESSION_ENCODINGS)
+                          if e in installed]
+        if not self.encodings:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.levels = {**DEFAULT_COMPRESSION_LEVELS, **getattr(settings, 'RENTALS_COMPRESSION_LEVELS', {})}
+        self.min_size = getattr(settings, 'RENTALS_COMPRESS_MIN_SIZE', 1024)
+        self.paths = tuple(getattr(settings, 'RENTALS_COMPRESS_PATHS', ('/rentals/api/',)))
+        self.cache_max_bytes = getattr(settings, 'RENTALS_COMPRESS_CACHE_MAX_BYTES', 2 * 1024 * 1024)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self._eligible(request, response):
+            return response
+        # Cached copies must be keyed on Accept-Encoding whether or not this one is compressed
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate(request.headers.get('Accept-Encoding'), self.encodings)
+        if encoding is None:
+            return response
+        level = self.levels[encoding]
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _compress_async_stream(response.streaming_content, encoding, level)
+            else:
+                response.streaming_content = _compress_stream(response.streaming_content, encoding, level)
+            del response.headers['Content-Length']
+            mode = 'stream'
+        else:
+            body = self._compressed_body(response, encoding, level)
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response.headers['Content-Length'] = str(len(body))
+            mode = 'buffer'
+
+        # The bytes differ from the uncompressed representation, so a strong ETag must be weakened
+        etag = response.headers.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        metrics.increment('compression.responses', encoding=encoding, mode=mode)
+        return response
+
+    def _eligible(self, request, response):
+        if not request.path.startswith(self.paths) or response.has_header('Content-Encoding'):
+            return False
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return False
+        return response.streaming or len(response.content) >= self.min_size
+
+    def _compressed_body(self, response, encoding, level):
+        if not self._is_cacheable(response):
+            return compress(response.content, encoding, level)
+        key = (encoding, level, hashlib.blake2b(response.content, digest_size=16).digest())
+        body = compressed_cache.get(key)
+        if body is not None:
+            metrics.increment('compression.cache', result='hit')
+            return body
+        metrics.increment('compression.cache', result='miss')
+        body = compress(response.content, encoding, level)
+        if len(body) <= self.cache_max_bytes:
+            compressed_cache.set(key, body)
+        return body
+
+    @staticmethod
+    def _is_cacheable(response):
+        cache_control = response.get('Cache-Control', '')
+        if 'no-store' in cache_control or 'private' in cache_control:
+            return False
+        return response.has_header('ETag') or 'public' in cache_control or 'max-age' in cache_control
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+
+# SQL helpers used by rentals.api.v1.sql_geojson to render building Features in
+# PostgreSQL. Each one returns JSON text encoded exactly like DRF's compact
+# JSONRenderer would encode the equivalent Python value (see that module).
+# Kept as separate statements so the dollar-quoted bodies are never split.
+CREATE_FUNCTIONS = [r"""
+CREATE OR REPLACE FUNCTION rentals_json_string(value text) RETURNS text AS $$
+    SELECT CASE
+        WHEN value IS NULL THEN 'null'
+        ELSE replace(replace(to_json(value)::text, U&'\2028', '\u2028'), U&'\2029', '\u2029')
+    END
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+""", r"""
+CREATE OR REPLACE FUNCTION rentals_json_float(value float8) RETURNS text AS $$
+    SELECT CASE
+        WHEN value IS NULL THEN 'null'
+        WHEN value::text ~ '[.e]' THEN value::text
+        ELSE value::text || '.0'
+    END
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE
+""", r"""
+CREATE OR REPLACE FUNCTION rentals_json_compact(value jsonb) RETURNS text AS $$
+DECLARE
+    result text;
+BEGIN
+    IF value IS NULL THEN
+        RETURN 'null';
+    END IF;
+    CASE jsonb_typeof(value)
+        WHEN 'object' THEN
+            SELECT '{' || coalesce(string_agg(rentals_json_string(t.key) || ':' || rentals_json_compact(t.val), ',' ORDER BY t.ord), '') || '}'
+            INTO result
+            FROM jsonb_each(value) WITH ORDINALITY AS t(key, val, ord);
+            RETURN result;
+        WHEN 'array' THEN
+            SELECT '[' || coalesce(string_agg(rentals_json_compact(t.elem), ',' ORDER BY t.ord), '') || ']'
+            INTO result
+            FROM jsonb_array_elements(value) WITH ORDINALITY AS t(elem, ord);
+            RETURN result;
+        WHEN 'string' THEN
+            RETURN rentals_json_string(value #>> '{}');
+        WHEN 'number' THEN
+            IF (value #>> '{}') ~ '[.eE]' THEN
+                RETURN rentals_json_float((value #>> '{}')::float8);
+            END IF;
+            RETURN value #>> '{}';
+        ELSE
+            RETURN value::text;
+    END CASE;
+END
+$$ LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE
+"""]
+
+DROP_FUNCTIONS = [
+    "DROP FUNCTION IF EXISTS rentals_json_compact(jsonb)",
+    "DROP FUNCTION IF EXISTS rentals_json_float(float8)",
+    "DROP FUNCTION IF EXISTS rentals_json_string(text)",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0002_alter_profilebuilding_building_and_more'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_FUNCTIONS, DROP_FUNCTIONS),
+    ]
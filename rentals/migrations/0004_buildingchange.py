@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0003_geojson_sql_functions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuildingChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('building_id', models.BigIntegerField()),
+                ('operation', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], max_length=6)),
+                ('changed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'building_change',
+            },
+        ),
+    ]
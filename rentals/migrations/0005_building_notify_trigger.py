@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+# Publishes every building insert/update/delete on the `rentals_buildings`
+# channel for the SSE stream (rentals/realtime.py). Payloads carry only what
+# subscribers filter on; updates also carry the previous position so streams
+# filtered by bbox/district hear about buildings moving out of them.
+CREATE_TRIGGER = [r"""
+CREATE OR REPLACE FUNCTION rentals_notify_building_change() RETURNS trigger AS $$
+DECLARE
+    payload jsonb;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        payload := jsonb_build_object(
+            'op', 'delete', 'id', OLD.id, 'district_id', OLD.district_id,
+            'lon', ST_X(OLD.location::geometry), 'lat', ST_Y(OLD.location::geometry));
+    ELSE
+        payload := jsonb_build_object(
+            'op', 'upsert', 'id', NEW.id, 'district_id', NEW.district_id,
+            'lon', ST_X(NEW.location::geometry), 'lat', ST_Y(NEW.location::geometry));
+        IF TG_OP = 'UPDATE' THEN
+            payload := payload || jsonb_build_object('prev', jsonb_build_object(
+                'district_id', OLD.district_id,
+                'lon', ST_X(OLD.location::geometry), 'lat', ST_Y(OLD.location::geometry)));
+        END IF;
+    END IF;
+    PERFORM pg_notify('rentals_buildings', payload::text);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+""", """
+CREATE TRIGGER building_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON building
+    FOR EACH ROW EXECUTE FUNCTION rentals_notify_building_change()
+"""]
+
+DROP_TRIGGER = [
+    "DROP TRIGGER IF EXISTS building_notify_change ON building",
+    "DROP FUNCTION IF EXISTS rentals_notify_building_change()",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0004_buildingchange'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0006_datasetversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=500)),
+                ('file_hash', models.CharField(db_index=True, max_length=64)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('failed', 'Failed'), ('done', 'Done')], default='running', max_length=7)),
+                ('next_row', models.BigIntegerField(default=0)),
+                ('created_count', models.BigIntegerField(default=0)),
+                ('skipped_count', models.BigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(default=None, null=True)),
+            ],
+            options={
+                'db_table': 'import_job',
+            },
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='import_key',
+            field=models.CharField(default=None, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:46
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction; it keeps the building table writable
+    atomic = False
+
+    dependencies = [
+        ('rentals', '0007_importjob_building_import_key'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='building',
+            index=models.Index(fields=['district', 'rental_price'], name='building_district_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='building',
+            index=models.Index(fields=['rental_price'], name='building_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='building',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['district', 'rental_price'], name='building_avail_dist_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='building',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['available_from'], name='building_avail_from_idx'),
+        ),
+    ]
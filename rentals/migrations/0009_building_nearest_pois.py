@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:54
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The columns are nullable (no table rewrite); the indexes are built without blocking writes.
+    # Fill them with `manage.py refresh_nearest_pois` once migrated.
+    atomic = False
+
+    dependencies = [
+        ('rentals', '0008_building_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='building',
+            name='nearest_route_id',
+            field=models.BigIntegerField(default=None, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='nearest_route_m',
+            field=models.FloatField(default=None, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='nearest_shop_id',
+            field=models.BigIntegerField(default=None, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='nearest_shop_m',
+            field=models.FloatField(default=None, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='nearest_stop_id',
+            field=models.BigIntegerField(default=None, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='nearest_stop_m',
+            field=models.FloatField(default=None, editable=False, null=True),
+        ),
+        AddIndexConcurrently(
+            model_name='building',
+            index=models.Index(fields=['nearest_stop_m', 'id'], name='building_nearest_stop_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='building',
+            index=models.Index(fields=['nearest_shop_m', 'id'], name='building_nearest_shop_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='building',
+            index=models.Index(fields=['nearest_route_m', 'id'], name='building_nearest_route_idx'),
+        ),
+    ]
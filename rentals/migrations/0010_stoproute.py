@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rentals', '0009_building_nearest_pois'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StopRoute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_m', models.FloatField()),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stop_links', to='rentals.route')),
+                ('stop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='route_links', to='rentals.busstop')),
+            ],
+            options={
+                'db_table': 'stop_route',
+                'constraints': [models.UniqueConstraint(fields=('stop', 'route'), name='unique_stop_route')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:16
+
+import rentals.models
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Existing entries get xact_id 0 (all committed, in id order; no table rewrite) and
+    # new ones the id of their transaction. The index is built without blocking writes.
+    atomic = False
+
+    dependencies = [
+        ('rentals', '0010_stoproute'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buildingchange',
+            name='xact_id',
+            field=models.BigIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='buildingchange',
+            name='xact_id',
+            field=models.BigIntegerField(db_default=rentals.models.CurrentXactId(), editable=False),
+        ),
+        AddIndexConcurrently(
+            model_name='buildingchange',
+            index=models.Index(fields=['xact_id', 'id'], name='building_change_xact_idx'),
+        ),
+    ]
@@ -36,14 +36,116 @@ class Building(models.Model):
     description = models.TextField(max_length=1000, null=True, default=None)
     amenities = models.JSONField(null=True, default=None)
     owner_contact = models.CharField(max_length=100, null=True, default=None)
+    # Natural key of imported rows (see rentals/loaders/building_rows.py); re-imports update instead of duplicating
+    import_key = models.CharField(max_length=64, null=True, default=None, unique=True, editable=False)
+    # Nearest POI of each layer and its distance in metres, kept up to date by rentals/proximity.py;
+    # plain ids, since the loaders replace the POI tables wholesale
+    nearest_stop_id = models.BigIntegerField(null=True, default=None, editable=False)
+    nearest_stop_m = models.FloatField(null=True, default=None, editable=False)
+    nearest_shop_id = models.BigIntegerField(null=True, default=None, editable=False)
+    nearest_shop_m = models.FloatField(null=True, default=None, editable=False)
+    nearest_route_id = models.BigIntegerField(null=True, default=None, editable=False)
+    nearest_route_m = models.FloatField(null=True, default=None, editable=False)
 
     def __str__(self):
         return f"[{self.location.x}, {self.location.y}] - owner: {self.owner_contact}"
     
     class Meta:
         db_table = "building"
+        # B-tree indexes for the list/export filters (_apply_building_filters); the
+        # partial ones only hold available listings, which is what the map searches
+        indexes = [
+            models.Index(fields=['district', 'rental_price'], name='building_district_price_idx'),
+            models.Index(fields=['rental_price'], name='building_price_idx'),
+            models.Index(fields=['district', 'rental_price'], condition=models.Q(is_available=True),
+                         name='building_avail_dist_price_idx'),
+            models.Index(fields=['available_from'], condition=models.Q(is_available=True),
+                         name='building_avail_from_idx'),
+            # Distance filters and `ordering=nearest_*_m`; id breaks ties for stable pages
+            models.Index(fields=['nearest_stop_m', 'id'], name='building_nearest_stop_idx'),
+            models.Index(fields=['nearest_shop_m', 'id'], name='building_nearest_shop_idx'),
+            models.Index(fields=['nearest_route_m', 'id'], name='building_nearest_route_idx'),
+        ]
     
 
+class CurrentXactId(models.Func):
+    """Id of the running transaction (PostgreSQL 13+), as a bigint."""
+    template = 'pg_current_xact_id()::text::bigint'
+    output_field = models.BigIntegerField()
+
+
+class BuildingChange(models.Model):
+    """Append-only log of building upserts and deletions, used for delta sync.
+
+    building_id is a plain integer (not a foreign key) so entries outlive
+    the buildings they describe. xact_id is the writing transaction, filled
+    by the database for ORM and raw SQL inserts alike; sync cursors order
+    entries by (xact_id, id), see rentals/changelog.py.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    OPERATION_CHOICES = [(UPSERT, 'Upsert'), (DELETE, 'Delete')]
+
+    building_id = models.BigIntegerField()
+    operation = models.CharField(max_length=6, choices=OPERATION_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    xact_id = models.BigIntegerField(db_default=CurrentXactId(), editable=False)
+
+    def __str__(self):
+        return f"#{self.pk} {self.operation} building {self.building_id}"
+
+    class Meta:
+        db_table = "building_change"
+        indexes = [
+            models.Index(fields=['xact_id', 'id'], name='building_change_xact_idx'),
+        ]
+
+
+class DatasetVersion(models.Model):
+    """Counter bumped whenever a dataset (e.g. the POI layers) is reloaded.
+
+    Cache keys embed the current version, so a bump invalidates every entry
+    derived from the old data. See rentals/versioning.py.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    class Meta:
+        db_table = "dataset_version"
+
+
+class ImportJob(models.Model):
+    """Progress of one `import_buildings` run over a source file.
+
+    Rows before `next_row` are committed, so a rerun over the same file
+    (same sha256) resumes there. See rentals/loaders/building_loader.py.
+    """
+    RUNNING = 'running'
+    FAILED = 'failed'
+    DONE = 'done'
+    STATUS_CHOICES = [(RUNNING, 'Running'), (FAILED, 'Failed'), (DONE, 'Done')]
+
+    source = models.CharField(max_length=500)
+    file_hash = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default=RUNNING)
+    next_row = models.BigIntegerField(default=0)
+    created_count = models.BigIntegerField(default=0)
+    skipped_count = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, default=None)
+
+    def __str__(self):
+        return f"{self.source} ({self.status}, next row {self.next_row})"
+
+    class Meta:
+        db_table = "import_job"
+
+
 class Profile(models.Model):
     """Model representing a user profile."""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile', null=True, default=None)
@@ -99,6 +201,26 @@ class Route(models.Model):
         db_table = "matatu_route"
 
 
+class StopRoute(models.Model):
+    """A bus stop served by a matatu route: one lying within the snapping tolerance of its path.
+
+    Rebuilt from the geometries whenever stops or routes are loaded; the
+    transit reachability graph is built from these rows (rentals/transit.py).
+    """
+    stop = models.ForeignKey(BusStop, on_delete=models.CASCADE, related_name='route_links')
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name='stop_links')
+    distance_m = models.FloatField()
+
+    def __str__(self):
+        return f"Stop {self.stop_id} on route {self.route_id} ({self.distance_m:.0f} m)"
+
+    class Meta:
+        db_table = "stop_route"
+        constraints = [
+            models.UniqueConstraint(fields=['stop', 'route'], name='unique_stop_route')
+        ]
+
+
 class Shops(models.Model):
     """Model representing shops with geographic location."""
     name = models.CharField(max_length=150, null=True, default=None)
@@ -0,0 +1,90 @@
+"""Removal of buildings left without any profile.
+
+A building is deleted together with the last profile linked to it. Each
+statement below is a single anti-join `DELETE ... WHERE NOT EXISTS
+(profile_building)` whose deleted ids feed the change-log insert through a
+CTE, so no building ids or model instances pass through Python and no
+per-building signals run. (The NOTIFY trigger still fires for every row.)
+
+`RENTALS_ORPHAN_CLEANUP` picks when it runs:
+
+- 'inline': in the profile's own delete transaction (pre_delete signal);
+- 'deferred': after the delete commits, from the local job queue
+  (rentals/jobs.py), `RENTALS_ORPHAN_SWEEP_BATCH` buildings per
+  transaction, so the user's DELETE request returns immediately.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+
+from rentals import metrics
+from rentals.changelog import forget_latest_change
+from rentals.models import Building, BuildingChange, ProfileBuilding
+
+INLINE = 'inline'
+DEFERRED = 'deferred'
+
+_TABLES = {
+    'building': Building._meta.db_table,
+    'profile_building': ProfileBuilding._meta.db_table,
+    'building_change': BuildingChange._meta.db_table,
+}
+
+_LOG_DELETED = """
+INSERT INTO {building_change} (building_id, operation, changed_at)
+SELECT id, '{delete}', now() FROM deleted
+"""
+
+# Buildings linked to the profile and to no other profile. Runs before the
+# profile's profile_building rows are removed; the FK from those rows is
+# deferred, so they can outlive the building until commit.
+DELETE_PROFILE_ORPHANS_SQL = ("""
+WITH deleted AS (
+    DELETE FROM {building} b
+    USING {profile_building} own
+    WHERE own.profile_id = %s AND own.building_id = b.id
+      AND NOT EXISTS (
+          SELECT 1 FROM {profile_building} pb WHERE pb.building_id = b.id AND pb.profile_id <> own.profile_id
+      )
+    RETURNING b.id
+)""" + _LOG_DELETED).format(delete=BuildingChange.DELETE, **_TABLES)
+
+# The given candidates that no longer have any profile, one batch at a time
+DELETE_ORPHANS_SQL = ("""
+WITH deleted AS (
+    DELETE FROM {building} b
+    WHERE b.id = ANY(%s)
+      AND NOT EXISTS (SELECT 1 FROM {profile_building} pb WHERE pb.building_id = b.id)
+    RETURNING b.id
+)""" + _LOG_DELETED).format(delete=BuildingChange.DELETE, **_TABLES)
+
+
+def cleanup_mode():
+    return getattr(settings, 'RENTALS_ORPHAN_CLEANUP', INLINE)
+
+
+def delete_profile_orphans(profile_id):
+    """Delete the buildings only `profile_id` is linked to; return how many."""
+    with connection.cursor() as cursor:
+        cursor.execute(DELETE_PROFILE_ORPHANS_SQL, [profile_id])
+        deleted = cursor.rowcount
+    if deleted:
+        forget_latest_change()
+        transaction.on_commit(forget_latest_change)
+    metrics.increment('orphans.deleted', deleted, mode=INLINE)
+    return deleted
+
+
+def sweep_orphans(building_ids, batch_size=None):
+    """Delete those of `building_ids` that have no profile left, in batches; return how many."""
+    batch_size = batch_size or getattr(settings, 'RENTALS_ORPHAN_SWEEP_BATCH', 500)
+    building_ids = list(building_ids)
+    total = 0
+    for start in range(0, len(building_ids), batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(DELETE_ORPHANS_SQL, [building_ids[start:start + batch_size]])
+            if cursor.rowcount:
+                forget_latest_change()
+                transaction.on_commit(forget_latest_change)
+            total += cursor.rowcount
+    metrics.increment('orphans.deleted', total, mode=DEFERRED)
+    return total
@@ -0,0 +1,103 @@
+"""Cache of per-building nearby-POI lists.
+
+`_get_nearby_pois` results are cached per (building id, location hash,
+poi_type, radius bucket): the list is computed once for the bucket's upper
+bound and smaller radii in the same bucket are answered by filtering it in
+memory. A bounded in-process LRU sits in front of the Django cache backend.
+
+Keys embed the building's location hash (a moved building gets new keys)
+and the `pois` dataset version, which the POI loaders bump on every rerun.
+"""
+import hashlib
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rentals import metrics, versioning
+
+# Upper bounds (metres) lists are computed for; larger radii are not cached
+RADIUS_BUCKETS = (100, 250, 500, 1000, 2000, 5000)
+
+
+class LRUCache:
+    """Thread-safe mapping that evicts the least recently used key beyond `maxsize`."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return None
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+local_cache = LRUCache(getattr(settings, 'RENTALS_POI_CACHE_LRU_SIZE', 4096))
+
+
+def radius_bucket(radius_m):
+    """Smallest bucket covering `radius_m`, or None when it is above the largest."""
+    index = bisect_left(RADIUS_BUCKETS, radius_m)
+    return RADIUS_BUCKETS[index] if index < len(RADIUS_BUCKETS) else None
+
+
+def location_hash(location):
+    return hashlib.blake2b(bytes(location.ewkb), digest_size=8).hexdigest()
+
+
+def cache_key(building, poi_type, bucket):
+    version = versioning.get_version(versioning.POIS)
+    return f'rentals:pois:{version}:{building.pk}:{location_hash(building.location)}:{poi_type}:{bucket}'
+
+
+def _within(entries, radius_m):
+    return [dict(entry) for distance_m, entry in entries if distance_m <= radius_m]
+
+
+def nearby_pois(building, poi_type, radius_m, compute):
+    """Return the POI entries of `poi_type` within `radius_m` of `building`.
+
+    `compute(radius)` runs the query and returns `(exact distance, entry)`
+    pairs sorted by distance; it is only called on a cache miss, with the
+    bucket's radius.
+    """
+    bucket = radius_bucket(radius_m)
+    if bucket is None:
+        metrics.increment('poi_cache.bypass')
+        return _within(compute(radius_m), radius_m)
+
+    key = cache_key(building, poi_type, bucket)
+    entries = local_cache.get(key)
+    if entries is not None:
+        metrics.increment('poi_cache.hit', layer='memory')
+    else:
+        entries = cache.get(key)
+        if entries is not None:
+            metrics.increment('poi_cache.hit', layer='shared')
+        else:
+            metrics.increment('poi_cache.miss')
+            entries = compute(bucket)
+            cache.set(key, entries, getattr(settings, 'RENTALS_POI_CACHE_TIMEOUT', 86400))
+        local_cache.set(key, entries)
+    return _within(entries, radius_m)
@@ -0,0 +1,135 @@
+"""Nearest bus stop, shop and route of every building, stored on the row.
+
+`Building.nearest_<poi>_id` / `nearest_<poi>_m` hold the closest POI of each
+layer and its distance in metres, so the list API filters and sorts on
+plain B-tree indexed columns (`max_stop_distance=300`,
+`ordering=nearest_stop_m`) instead of running spatial queries.
+
+The values come from index-assisted KNN lookups (`ORDER BY geometry <->
+location LIMIT 1`, one per layer):
+
+- `assign_nearest_pois(building)` sets them on an instance before it is
+  saved (signals.py), unless its stored location is unchanged;
+- `refresh_nearest_pois(ids)` recomputes them in SQL for rows written in
+  bulk (bulk API, import loader), or for the whole table in id-range
+  batches, which the `refresh_nearest_pois` command runs after a POI
+  loader. Only rows whose values changed are written.
+
+The ids are plain integers rather than foreign keys: the loaders replace a
+POI table wholesale, and the next refresh points every row at the new ids.
+"""
+from django.conf import settings
+from django.db import connection
+
+from rentals import versioning
+from rentals.models import Building, BusStop, Route, Shops
+
+# (column prefix, POI model) of each layer
+NEAREST_POIS = (
+    ('stop', BusStop),
+    ('shop', Shops),
+    ('route', Route),
+)
+
+NEAREST_FIELDS = tuple(
+    field for prefix, _ in NEAREST_POIS for field in (f'nearest_{prefix}_id', f'nearest_{prefix}_m')
+)
+
+# List/export query parameter -> distance column it caps
+NEAREST_DISTANCE_FILTERS = {
+    'max_stop_distance': 'nearest_stop_m',
+    'max_shop_distance': 'nearest_shop_m',
+    'max_route_distance': 'nearest_route_m',
+}
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def _nearest_joins(location):
+    """LEFT JOIN LATERAL KNN lookups of the nearest POI of each layer to `location`."""
+    return '\n'.join(
+        f"""LEFT JOIN LATERAL (
+    SELECT p.id, round(ST_Distance(p.geometry, {location})::numeric, 2)::float8 AS distance
+    FROM {model._meta.db_table} p
+    ORDER BY p.geometry <-> {location}
+    LIMIT 1
+) {prefix}_poi ON true"""
+        for prefix, model in NEAREST_POIS
+    )
+
+
+NEAREST_COLUMNS = ', '.join(f'{prefix}_poi.id, {prefix}_poi.distance' for prefix, _ in NEAREST_POIS)
+
+LOCATION_SQL = f"""
+SELECT {NEAREST_COLUMNS}
+FROM (SELECT %s::geography AS location) b
+{_nearest_joins('b.location')}
+"""
+
+REFRESH_SQL = f"""
+UPDATE {Building._meta.db_table} AS t
+SET ({', '.join(NEAREST_FIELDS)}) = ({', '.join(f'n.{field}' for field in NEAREST_FIELDS)})
+FROM (
+    SELECT b.id, {', '.join(f'{prefix}_poi.id AS nearest_{prefix}_id, {prefix}_poi.distance AS nearest_{prefix}_m'
+                           for prefix, _ in NEAREST_POIS)}
+    FROM {Building._meta.db_table} b
+    {_nearest_joins('b.location')}
+    WHERE {{where}}
+) n
+WHERE t.id = n.id
+  AND ({', '.join(f't.{field}' for field in NEAREST_FIELDS)})
+      IS DISTINCT FROM ({', '.join(f'n.{field}' for field in NEAREST_FIELDS)})
+"""
+
+
+def assign_nearest_pois(building):
+    """Set the nearest POI columns of an (unsaved) Building from its location.
+
+    A saved building whose location is unchanged keeps the stored values
+    (one primary-key read) instead of running the KNN lookups again; they
+    are copied over, since a refresh may have changed them since the
+    instance was loaded.
+    """
+    if building.pk is not None:
+        stored = Building.objects.filter(pk=building.pk).values('location', *NEAREST_FIELDS).first()
+        if stored is not None and stored['location'] == building.location:
+            for field in NEAREST_FIELDS:
+                setattr(building, field, stored[field])
+            return
+    with connection.cursor() as cursor:
+        cursor.execute(LOCATION_SQL, [building.location.ewkt])
+        row = cursor.fetchone()
+    for field, value in zip(NEAREST_FIELDS, row):
+        setattr(building, field, value)
+
+
+def refresh_nearest_pois(building_ids=None, batch_size=None):
+    """Recompute the nearest POI columns; return how many buildings changed.
+
+    With `building_ids` one statement updates those rows in the caller's
+    transaction. Without, the whole table is walked in id ranges of
+    `batch_size` (`RENTALS_NEAREST_POI_BATCH_SIZE`), each its own statement,
+    and the `pois` dataset version is bumped so cached pages and validators
+    built from the old values are dropped.
+    """
+    if building_ids is not None:
+        building_ids = list(building_ids)
+        if not building_ids:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(REFRESH_SQL.format(where='b.id = ANY(%s)'), [building_ids])
+            return cursor.rowcount
+
+    batch_size = batch_size or getattr(settings, 'RENTALS_NEAREST_POI_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT min(id), max(id) FROM {Building._meta.db_table}')
+        low, high = cursor.fetchone()
+    updated = 0
+    if low is not None:
+        sql = REFRESH_SQL.format(where='b.id >= %s AND b.id < %s')
+        for start in range(low, high + 1, batch_size):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [start, start + batch_size])
+                updated += cursor.rowcount
+    versioning.bump(versioning.POIS)
+    return updated
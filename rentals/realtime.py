@@ -0,0 +1,295 @@
+"""Live building change push over Server-Sent Events.
+
+A trigger on the building table (migration 0005) issues
+`pg_notify('rentals_buildings', ...)` for every inserted, updated or deleted
+row, so bulk loads and raw SQL are covered as well as ORM saves. NOTIFY is
+transactional: events are only delivered once the change commits.
+
+Each worker process keeps one async psycopg connection LISTENing on that
+channel while it has subscribers, and fans every event out to the
+subscribers whose bbox/district filter matches. `sse_app` is a plain ASGI
+app mounted in rentals_root/asgi.py; an open stream costs one queue and one
+coroutine, not a thread.
+
+Events are hints, not data: clients react to them by calling the delta sync
+endpoint (/buildings/changes/). `ready` is sent once the worker is
+LISTENing (again, after a reconnect) and `resync` when events were dropped
+(slow consumer, bulk load); on both the client should sync.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+import psycopg
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'rentals_buildings'
+
+# Events buffered per subscriber before it is told to resync instead
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Notifications received in one go above which subscribers get a single
+# `resync` instead of one event per row (bulk imports, loaders)
+RESYNC_THRESHOLD = 500
+
+RECONNECT_DELAYS = (1, 2, 5, 10, 30)
+
+RESYNC = b'event: resync\ndata: {}\n\n'
+READY = b'retry: 5000\nevent: ready\ndata: {}\n\n'
+PING = b': ping\n\n'
+
+
+def heartbeat_seconds():
+    return getattr(settings, 'RENTALS_SSE_HEARTBEAT_SECONDS', 15)
+
+
+def max_subscribers():
+    return getattr(settings, 'RENTALS_SSE_MAX_SUBSCRIBERS', 10000)
+
+
+def encode_event(event):
+    """Format a decoded notification as an SSE message."""
+    return f"event: {event['op']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n".encode()
+
+
+def parse_bbox(value):
+    """Parse `min_lon,min_lat,max_lon,max_lat`; raise ValueError if malformed."""
+    parts = [float(p) for p in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError('bbox must be min_lon,min_lat,max_lon,max_lat')
+    min_lon, min_lat, max_lon, max_lat = parts
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError('bbox minimums must not exceed maximums')
+    return min_lon, min_lat, max_lon, max_lat
+
+
+class Subscriber:
+    """One open stream and its optional bbox/district filter."""
+
+    def __init__(self, bbox=None, district_id=None):
+        self.bbox = bbox
+        self.district_id = district_id
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def _position_matches(self, district_id, lon, lat):
+        if self.district_id is not None and district_id != self.district_id:
+            return False
+        if self.bbox is not None:
+            if lon is None or lat is None:
+                return False
+            min_lon, min_lat, max_lon, max_lat = self.bbox
+            return min_lon <= lon <= max_lon and min_lat <= lat <= max_lat
+        return True
+
+    def matches(self, event):
+        """True if the building is (or, for moves, was) inside the filter."""
+        if self._position_matches(event.get('district_id'), event.get('lon'), event.get('lat')):
+            return True
+        prev = event.get('prev')
+        return bool(prev) and self._position_matches(prev.get('district_id'), prev.get('lon'), prev.get('lat'))
+
+    def push(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind: drop what is queued and ask for a full delta sync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class Broker:
+    """Per-worker LISTEN connection shared by all subscribers of the process."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self._task = None
+        self._loop = None
+        self._ready = False
+        # Subscribers that joined while the worker was not LISTENing yet
+        self._waiting = set()
+
+    def _listening(self):
+        return (self._task is not None and not self._task.done()
+                and self._loop is asyncio.get_running_loop())
+
+    def subscribe(self, subscriber):
+        """Register `subscriber`; it gets `ready` once the worker is LISTENing."""
+        self.subscribers.add(subscriber)
+        if not self._listening():
+            self._loop = asyncio.get_running_loop()
+            self._ready = False
+            self._task = asyncio.create_task(self._listen())
+        if self._ready:
+            subscriber.push(READY)
+        else:
+            self._waiting.add(subscriber)
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+        self._waiting.discard(subscriber)
+        if not self.subscribers and self._task is not None:
+            # Idle workers do not hold a database connection
+            self._task.cancel()
+            self._task = None
+            self._ready = False
+
+    def dispatch(self, payloads):
+        """Fan a batch of raw notification payloads out to the subscribers."""
+        if len(payloads) > RESYNC_THRESHOLD:
+            self.broadcast(RESYNC)
+            return
+        for payload in payloads:
+            try:
+                event = json.loads(payload)
+            except ValueError:
+                logger.warning('Ignoring malformed %s notification: %r', CHANNEL, payload)
+                continue
+            message = encode_event(event)
+            for subscriber in self.subscribers:
+                if subscriber.matches(event):
+                    subscriber.push(message)
+
+    def broadcast(self, message):
+        for subscriber in self.subscribers - self._waiting:
+            subscriber.push(message)
+
+    def _mark_ready(self):
+        self._ready = True
+        for subscriber in self._waiting:
+            subscriber.push(READY)
+        self._waiting.clear()
+
+    def _connection_params(self):
+        params = connections['default'].get_connection_params()
+        # Django's sync cursor class and adapter context do not apply here
+        params.pop('cursor_factory', None)
+        params.pop('context', None)
+        return params
+
+    async def _listen(self):
+        attempt = 0
+        while True:
+            try:
+                conn = await psycopg.AsyncConnection.connect(autocommit=True, **self._connection_params())
+            except psycopg.OperationalError:
+                delay = RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)]
+                logger.exception('SSE listener could not connect; retrying in %ss', delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            try:
+                async with conn:
+                    await conn.execute(f'LISTEN {CHANNEL}')
+                    attempt = 0
+                    self._mark_ready()
+                    await self._pump(conn)
+            except psycopg.OperationalError:
+                logger.exception('SSE listener lost its connection; reconnecting')
+                attempt += 1
+            # Events committed while disconnected are lost, so every stream
+            # gets a fresh `ready` (and syncs) once LISTEN is back
+            self._ready = False
+            self._waiting.update(self.subscribers)
+
+    async def _pump(self, conn):
+        # The reader only queues payloads; the dispatcher drains whatever has
+        # arrived since it last ran, so a burst is handled as one batch.
+        pending = asyncio.Queue()
+
+        async def dispatcher():
+            while True:
+                batch = [await pending.get()]
+                while not pending.empty():
+                    batch.append(pending.get_nowait())
+                self.dispatch(batch)
+
+        dispatch_task = asyncio.create_task(dispatcher())
+        try:
+            async for notify in conn.notifies():
+                pending.put_nowait(notify.payload)
+        finally:
+            dispatch_task.cancel()
+
+
+broker = Broker()
+
+
+async def _send_error(send, status, message):
+    body = json.dumps({'error': message}).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+@sync_to_async
+def _district_id(name):
+    from rentals.models import District
+    return District.objects.filter(name=name).values_list('id', flat=True).first()
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def sse_app(scope, receive, send):
+    """ASGI app streaming building changes as `text/event-stream`.
+
+    Query parameters: `bbox=min_lon,min_lat,max_lon,max_lat` and/or
+    `district=<name>`, with the same meaning as on the building list.
+    """
+    if scope['method'] != 'GET':
+        await _send_error(send, 405, 'Method not allowed.')
+        return
+    query = {k: v[-1] for k, v in parse_qs(scope.get('query_string', b'').decode()).items()}
+    bbox = district_id = None
+    if 'bbox' in query:
+        try:
+            bbox = parse_bbox(query['bbox'])
+        except ValueError as e:
+            await _send_error(send, 400, f'Invalid bbox: {e}')
+            return
+    if 'district' in query:
+        district_id = await _district_id(query['district'])
+        if district_id is None:
+            await _send_error(send, 404, 'District not found.')
+            return
+    if len(broker.subscribers) >= max_subscribers():
+        await _send_error(send, 503, 'Too many open streams, try again later.')
+        return
+
+    subscriber = Subscriber(bbox=bbox, district_id=district_id)
+    disconnected = asyncio.create_task(_wait_for_disconnect(receive))
+    try:
+        broker.subscribe(subscriber)
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ]})
+        while True:
+            next_message = asyncio.ensure_future(subscriber.queue.get())
+            await asyncio.wait({next_message, disconnected}, timeout=heartbeat_seconds(),
+                               return_when=asyncio.FIRST_COMPLETED)
+            if next_message.done():
+                body = next_message.result()
+            else:
+                next_message.cancel()
+                if disconnected.done():
+                    break
+                body = PING
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    except OSError:
+        # Client went away mid-send
+        pass
+    finally:
+        disconnected.cancel()
+        broker.unsubscribe(subscriber)
@@ -1,8 +1,8 @@
 from django.apps import apps
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save, pre_delete, post_delete
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from django.db.models import Count
+from django.db import transaction
 
 User = get_user_model()
 
@@ -20,23 +20,78 @@ def create_user_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance)
 
 
-@receiver(pre_delete, sender=apps.get_model('rentals', 'Profile')) # lazy import of Profile model
-def save_related_buildings_before_profile_deletion(sender, instance, **kwargs):
-    """
-    Cache related Building IDs before the Profile is deleted.
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_auth_snapshot(sender, instance, **kwargs):
+    """Drop the cached authentication snapshot (rentals/authentication.py) of a changed User."""
+    from .authentication import invalidate_user_snapshot
+    invalidate_user_snapshot(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=apps.get_model('rentals', 'Profile'))
+def invalidate_profile_auth_snapshot(sender, instance, **kwargs):
+    """The snapshot carries the profile id, so Profile changes drop it too."""
+    from .authentication import invalidate_user_snapshot
+    if instance.user_id:
+        invalidate_user_snapshot(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=apps.get_model('rentals', 'District'))
+def invalidate_district_fragments(sender, instance, **kwargs):
+    """Drop the cached district pickers (fragments.py) once the change is committed."""
+    from .fragments import invalidate_district_fragments
+    transaction.on_commit(invalidate_district_fragments)
+
+
+@receiver(pre_save, sender=apps.get_model('rentals', 'Building'))
+def fill_nearest_pois(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Look up the nearest stop, shop and route of the saved location (see proximity.py)."""
+    if raw or update_fields is not None:
+        return
+    from .proximity import assign_nearest_pois
+    assign_nearest_pois(instance)
+
+
+@receiver(post_save, sender=apps.get_model('rentals', 'Building'))
+def refresh_nearest_pois_after_partial_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """`save(update_fields=[..., 'location'])` would not write the columns set in pre_save."""
+    if not raw and update_fields is not None and 'location' in update_fields:
+        from .proximity import refresh_nearest_pois
+        refresh_nearest_pois([instance.pk])
+
+
+@receiver(post_save, sender=apps.get_model('rentals', 'Building'))
+def log_building_upsert(sender, instance, **kwargs):
+    """Record a created or updated Building in the delta-sync change log."""
+    from .changelog import record_building_changes
+    BuildingChange = apps.get_model('rentals', 'BuildingChange')
+    record_building_changes([instance.pk], BuildingChange.UPSERT)
+
+
+@receiver(post_delete, sender=apps.get_model('rentals', 'Building'))
+def log_building_delete(sender, instance, **kwargs):
+    """Record a deleted Building in the delta-sync change log.
+
+    The orphan cleanup below deletes in SQL and logs its own entries.
     """
-    instance._related_building_ids = list(instance.building.values_list('id', flat=True))
+    from .changelog import record_building_changes
+    BuildingChange = apps.get_model('rentals', 'BuildingChange')
+    record_building_changes([instance.pk], BuildingChange.DELETE)
 
 
-@receiver(post_delete, sender=apps.get_model('rentals', 'Profile'))
-def delete_orphaned_buildings_after_profile_deletion(sender, instance, **kwargs):
+@receiver(pre_delete, sender=apps.get_model('rentals', 'Profile')) # lazy import of Profile model
+def delete_orphaned_buildings_with_profile(sender, instance, **kwargs):
     """
-    After a Profile is deleted, delete any Buildings that no longer have
-    related Profiles.
+    Delete the Buildings that only this Profile is linked to (see orphans.py).
+
+    Inline, one anti-join DELETE runs in the Profile's delete transaction.
+    Deferred, the candidate ids are swept by the job queue once the delete
+    has committed.
     """
-    Building = apps.get_model('rentals', 'Building')
-    building_ids = getattr(instance, '_related_building_ids', [])
-    Building.objects.filter(id__in=building_ids)\
-        .annotate(profile_count=Count('profiles'))\
-        .filter(profile_count=0)\
-        .delete()
+    from . import jobs, orphans
+
+    if orphans.cleanup_mode() == orphans.DEFERRED:
+        building_ids = list(instance.building.values_list('id', flat=True))
+        if building_ids:
+            transaction.on_commit(lambda: jobs.enqueue(orphans.sweep_orphans, building_ids))
+    else:
+        orphans.delete_profile_orphans(instance.pk)
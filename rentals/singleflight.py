@@ -0,0 +1,108 @@
+"""Request coalescing ("single-flight") for expensive reads.
+
+`coalesce(key, func)` runs `func()` once for all callers that ask for the
+same `key` while it is running: the first caller (the leader) computes, the
+others block until it finishes and get its result, or its exception. Only
+calls in flight are shared; nothing is kept afterwards, so results are as
+fresh as if every caller had computed them itself.
+
+With `shared=True` (default `RENTALS_SINGLEFLIGHT_SHARED`) the leader also
+coordinates with other worker processes through the Django cache: it takes
+`cache.add(<key>:lock)` and publishes its result for
+`RENTALS_SINGLEFLIGHT_RESULT_TTL` seconds, and leaders in other workers that
+lose the lock poll for that result for up to `RENTALS_SINGLEFLIGHT_WAIT`
+seconds before computing it themselves. That needs a cache backend shared
+by the workers (e.g. Redis) and a picklable result.
+
+Metrics: `singleflight.executed{flight}` counts computations and
+`singleflight.coalesced{flight, scope=process|shared}` the callers that
+reused another one's.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rentals import metrics
+
+# How often a caller waiting on another worker's computation checks the cache
+POLL_INTERVAL = 0.05
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_lock = threading.Lock()
+_calls = {}
+
+metrics.register_gauge('singleflight.in_flight', lambda: len(_calls))
+
+
+def coalesce(key, func, name='default', shared=None):
+    """Return `func()`, sharing one computation between concurrent callers with `key`."""
+    with _lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+    if not leader:
+        call.done.wait()
+        metrics.increment('singleflight.coalesced', flight=name, scope='process')
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    if shared is None:
+        shared = getattr(settings, 'RENTALS_SINGLEFLIGHT_SHARED', False)
+    try:
+        call.result = _run_shared(key, func, name) if shared else _run(func, name)
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            del _calls[key]
+        call.done.set()
+
+
+def _run(func, name):
+    metrics.increment('singleflight.executed', flight=name)
+    return func()
+
+
+def _run_shared(key, func, name):
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+    lock_key = f'rentals:flight:{digest}:lock'
+    result_key = f'rentals:flight:{digest}:result'
+    wait = getattr(settings, 'RENTALS_SINGLEFLIGHT_WAIT', 5.0)
+
+    # The lock outlives a crashed holder by at most `wait` seconds
+    if cache.add(lock_key, 1, max(1, int(wait))):
+        try:
+            result = _run(func, name)
+            # Wrapped, so a None result is not mistaken for a miss
+            cache.set(result_key, (result,), getattr(settings, 'RENTALS_SINGLEFLIGHT_RESULT_TTL', 5))
+        finally:
+            cache.delete(lock_key)
+        return result
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        # Lock first: once it is gone the result is either published or never will be
+        released = cache.get(lock_key) is None
+        published = cache.get(result_key)
+        if published is not None:
+            metrics.increment('singleflight.coalesced', flight=name, scope='shared')
+            return published[0]
+        if released:
+            # The holder failed (or its result already expired); compute ourselves
+            break
+    return _run(func, name)
@@ -3,6 +3,10 @@
   const API_BASE = '/rentals/api/v1';
   const CENTER_COORDINATES = [-1.281058090000000, 36.712155400000000];
   const MAP_ZOOM_LEVEL = 15;
+  // Static asset URLs come from the template ({% static %}) so they carry content hashes
+  const MAP_DATASET = (document.getElementById('map') || {}).dataset || {};
+  const OUTLINE_URL = MAP_DATASET.outlineUrl || '/static/rentals/data/nairobi_outline.geojson';
+  const BUILDING_ICON_URL = MAP_DATASET.iconUrl || '/static/rentals/icons/building-icon.svg';
 
 
   let map = null;
@@ -29,7 +33,7 @@
     const customBuildingIcon = L.Icon.extend(
     {
         options: {
-            iconUrl: '/static/rentals/icons/building-icon.svg',
+            iconUrl: BUILDING_ICON_URL,
             shadowUrl: 'https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.9.4/images/marker-shadow.png',
             iconSize:     [32, 37],
             iconAnchor:   [16, 37],
@@ -118,7 +122,7 @@
     layerControl.addTo(map);
     
     // Load boundary layer asynchronously and add to map when ready
-    fetch('/static/rentals/data/nairobi_outline.geojson')
+    fetch(OUTLINE_URL)
       .then(resp => resp.json())
       .then(data => {
         const boundaryLayer = L.geoJSON(data, {
@@ -164,6 +168,7 @@
             showOnMap(layer.feature);
         }
       }
+      subscribeBuildingChanges();
     });
     
     // add event listeners for filtering listings
@@ -231,16 +236,76 @@
     listings.fetchPage(1);
   }
 
+  const SNAPSHOT_KEY = 'rentals.buildings.snapshot';
+
+  function readSnapshot(){
+    try{
+      const raw = localStorage.getItem(SNAPSHOT_KEY);
+      return raw ? JSON.parse(raw) : null;
+    }catch(e){ return null; }
+  }
+
+  function writeSnapshot(version, data){
+    if(!version) return;
+    try{
+      localStorage.setItem(SNAPSHOT_KEY, JSON.stringify({version: version, data: data}));
+    }catch(e){
+      // Quota exceeded or storage disabled: fall back to full loads
+      try{ localStorage.removeItem(SNAPSHOT_KEY); }catch(_){}
+    }
+  }
+
+  async function fetchFullBuildings(){
+    const resp = await fetch(`${API_BASE}/buildings/?geojson=true`);
+    if(!resp.ok) throw new Error('Failed to fetch all buildings: '+resp.status);
+    let data = await resp.json();
+    if(typeof data === 'string') data = JSON.parse(data);
+    writeSnapshot(resp.headers.get('X-Buildings-Version'), data);
+    return {data: data, changed: true};
+  }
+
+  // Bring a cached snapshot up to date with /buildings/changes/; null when a full reload is needed
+  async function syncSnapshot(snapshot){
+    let version = snapshot.version;
+    let changed = false;
+    const byId = new Map((snapshot.data.features || []).map(f => [String(f.id), f]));
+    for(;;){
+      const resp = await fetch(`${API_BASE}/buildings/changes/?since=${encodeURIComponent(version)}`);
+      if(!resp.ok) return null;
+      const delta = await resp.json();
+      const upserted = (delta.upserted && delta.upserted.features) || [];
+      const deleted = delta.deleted || [];
+      upserted.forEach(f => byId.set(String(f.id), f));
+      deleted.forEach(id => byId.delete(String(id)));
+      changed = changed || upserted.length > 0 || deleted.length > 0;
+      version = delta.version;
+      if(!delta.has_more) break;
+    }
+    const data = Object.assign({}, snapshot.data, {features: Array.from(byId.values())});
+    writeSnapshot(version, data);
+    return {data: data, changed: changed};
+  }
+
+  // Resolves to {data, changed}; changed is false when the cached snapshot was already current
+  async function fetchAllBuildings(){
+    const snapshot = readSnapshot();
+    if(snapshot && snapshot.version && snapshot.data){
+      try{
+        const synced = await syncSnapshot(snapshot);
+        if(synced) return synced;
+      }catch(e){ console.warn('buildings delta sync failed, reloading', e); }
+    }
+    return fetchFullBuildings();
+  }
+
   // Load all buildings (GeoJSON) for map layer with clustering
   async function loadAllBuildings(){
     try{
-      const url = `${API_BASE}/buildings/?geojson=true`;
-      const resp = await fetch(url);
-      if(!resp.ok) throw new Error('Failed to fetch all buildings: '+resp.status);
-      let data = await resp.json();
-      if(typeof data === 'string') data = JSON.parse(data);
-      allBuildingsGeoJSON = data;
+      const result = await fetchAllBuildings();
+      if(allBuildingsLayer && !result.changed) return;
+      allBuildingsGeoJSON = result.data;
       if(allBuildingsLayer) map.removeLayer(allBuildingsLayer);
+      idToLayer.clear();
 
       // Create marker cluster group with custom styling (no hover polygon)
       allBuildingsLayer = L.markerClusterGroup({
@@ -250,7 +315,7 @@
         iconCreateFunction: function(cluster) {
           const count = cluster.getChildCount();
           return new L.DivIcon({
-            html: `<div class="cluster-marker"><img src="/static/rentals/icons/building-icon.svg" alt="cluster"/><span class="cluster-count">${count}</span></div>`,
+            html: `<div class="cluster-marker"><img src="${BUILDING_ICON_URL}" alt="cluster"/><span class="cluster-count">${count}</span></div>`,
             className: '',
             iconSize: [40, 45],
             iconAnchor: [20, 45]
@@ -302,5 +367,17 @@
     }
   }
 
+  // Live updates: stream events only say that something changed, the delta sync fetches it
+  function subscribeBuildingChanges(){
+    if(!window.EventSource) return;
+    let pending = null;
+    const refresh = () => {
+      if(pending) return;
+      pending = setTimeout(() => { pending = null; loadAllBuildings(); }, 1000);
+    };
+    const source = new EventSource(`${API_BASE}/buildings/stream/`);
+    ['ready', 'upsert', 'delete', 'resync'].forEach(type => source.addEventListener(type, refresh));
+  }
+
   document.addEventListener('DOMContentLoaded', init);
 })();
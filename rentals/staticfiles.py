@@ -0,0 +1,79 @@
+"""Serve collected static files with precompressed variants and long-lived caching.
+
+For deployments without a web server in front of Django (enable with
+`RENTALS_SERVE_STATIC`). Files come from STATIC_ROOT as written by
+rentals.storage.PrecompressedManifestStaticFilesStorage:
+
+- the `.br`/`.gz` variant the client accepts is sent with Content-Encoding;
+- hashed names (those listed in the manifest) never change, so they get
+  `Cache-Control: public, max-age=RENTALS_STATIC_MAX_AGE, immutable`;
+- other names get a short max-age and answer If-Modified-Since with 304.
+"""
+import mimetypes
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.utils.cache import patch_vary_headers
+from django.views.static import was_modified_since
+
+from rentals.compression import negotiate
+from rentals.storage import ENCODING_SUFFIXES
+
+CONTENT_TYPES = {'.geojson': 'application/geo+json'}
+
+# Max-age for files whose name is not content-hashed
+UNHASHED_MAX_AGE = 60
+
+
+@lru_cache(maxsize=1)
+def _hashed_names(manifest_hash):
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def is_hashed(path):
+    return path in _hashed_names(getattr(staticfiles_storage, 'manifest_hash', ''))
+
+
+def _content_type(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in CONTENT_TYPES:
+        return CONTENT_TYPES[extension]
+    content_type, _ = mimetypes.guess_type(path)
+    return content_type or 'application/octet-stream'
+
+
+def serve(request, path):
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Not found')
+    if not os.path.isfile(fullpath):
+        raise Http404('Not found')
+
+    encoding = negotiate(request.headers.get('Accept-Encoding'),
+                         [e for e, suffix in ENCODING_SUFFIXES.items() if os.path.isfile(fullpath + suffix)])
+    filename = fullpath + ENCODING_SUFFIXES[encoding] if encoding else fullpath
+    stat = os.stat(fullpath)
+
+    hashed = is_hashed(path)
+    if not hashed and not was_modified_since(request.headers.get('If-Modified-Since'), int(stat.st_mtime)):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(filename, 'rb'), content_type=_content_type(path),
+                                filename=os.path.basename(fullpath))
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.headers['Last-Modified'] = http_date(stat.st_mtime)
+    if hashed:
+        max_age = getattr(settings, 'RENTALS_STATIC_MAX_AGE', 60 * 60 * 24 * 365)
+        response.headers['Cache-Control'] = f'public, max-age={max_age}, immutable'
+    else:
+        response.headers['Cache-Control'] = f'public, max-age={UNHASHED_MAX_AGE}'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,50 @@
+"""Static files storage with content-hashed names and precompressed variants.
+
+`collectstatic` writes every file under its hashed name (map-ui.3f2a1c.js)
+plus a manifest, like ManifestStaticFilesStorage, and then writes `.br` and
+`.gz` siblings of the text assets in PRECOMPRESS_EXTENSIONS. Web servers
+(nginx `gzip_static`/`brotli_static`) or rentals.staticfiles.serve pick
+the variant the client accepts.
+"""
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from rentals.compression import available_encodings, compress
+
+PRECOMPRESS_EXTENSIONS = ('.js', '.css', '.geojson', '.json', '.svg')
+
+# Variant suffix per content encoding (no zstd: web servers do not serve .zst siblings)
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# Keep a variant only if it saves at least this fraction of the original size
+MIN_SAVING = 0.05
+
+
+class PrecompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and name.endswith(PRECOMPRESS_EXTENSIONS):
+                hashed_names.append(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        # The unhashed copies are compressed too, for URLs built without {% static %}
+        for name in sorted(set(hashed_names) | {self.clean_name(n) for n in paths if n.endswith(PRECOMPRESS_EXTENSIONS)}):
+            for variant in self._write_variants(name):
+                yield name, variant, True
+
+    def _write_variants(self, name):
+        with self.open(name) as fh:
+            data = fh.read()
+        for encoding in available_encodings():
+            if encoding not in ENCODING_SUFFIXES:
+                continue
+            variant = name + ENCODING_SUFFIXES[encoding]
+            if self.exists(variant):
+                self.delete(variant)
+            compressed = compress(data, encoding)
+            if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                self._save(variant, ContentFile(compressed))
+                yield variant
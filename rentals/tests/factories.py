@@ -0,0 +1,24 @@
+"""Districts and buildings shared by the test modules."""
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+
+from rentals.models import Building, District
+
+
+def square(west, south, size=1.0):
+    """A `size`-degree square Polygon with its south-west corner at (west, south)."""
+    east, north = west + size, south + size
+    return Polygon(((west, south), (west, north), (east, north), (east, south), (west, south)), srid=4326)
+
+
+# Most test buildings sit at (-121.5, 37.5), in the middle of this square
+polygon = square(-122.0, 37.0)
+
+
+def make_district(name, area=polygon, county='Test County'):
+    """A District covering the Polygon `area`."""
+    return District.objects.create(name=name, county=county, geometry=MultiPolygon(area, srid=4326))
+
+
+def make_building(district, address, lon=-121.5, lat=37.5, **fields):
+    """A Building at (lon, lat) in `district`; `fields` set the other columns."""
+    return Building.objects.create(address=address, location=Point(lon, lat, srid=4326), district=district, **fields)
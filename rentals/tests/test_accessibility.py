@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rentals import metrics, versioning
+from rentals.api.v1.accessibility import DEFAULT_RINGS, InvalidProfileRequest, parse_nearest, parse_rings
+from rentals.models import BusStop, Shops
+from rentals.poi_cache import local_cache
+from rentals.tests.factories import make_building, make_district
+
+
+class ParseRingsTests(SimpleTestCase):
+    def test_rings_are_sorted_and_distinct(self):
+        self.assertEqual(parse_rings('1000, 250,500,250'), [250, 500, 1000])
+        self.assertEqual(parse_rings('100.5'), [100.5])
+        self.assertEqual(parse_rings(''), list(DEFAULT_RINGS))
+
+    def test_invalid_rings(self):
+        for value in ('abc', '0,100', '-5', 'nan', '1,2,3,4,5,6', '2500'):
+            with self.subTest(value), self.assertRaises(InvalidProfileRequest):
+                parse_rings(value)
+
+    def test_nearest(self):
+        self.assertEqual(parse_nearest('5'), 5)
+        for value in ('x', '-1', '11'):
+            with self.subTest(value), self.assertRaises(InvalidProfileRequest):
+                parse_nearest(value)
+
+
+class AccessibilityProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        metrics.reset()
+        versioning._forget(versioning.POIS)
+        self.client = APIClient()
+        self.district = make_district("Access District")
+        # Roughly 44 m, 177 m and 442 m east of the building
+        for name, lon in (('Corner', -121.4995), ('Market', -121.498), ('Mall', -121.495)):
+            Shops.objects.create(name=name, category='food', geometry=Point(lon, 37.5, srid=4326))
+        self.building = make_building(self.district, 'Profiled', rental_price=Decimal('1000.00'))
+        self.url = reverse('rentals:building-accessibility', kwargs={'pk': self.building.pk})
+
+    def test_counts_and_nearest_per_ring(self):
+        r = self.client.get(self.url, {'rings': '100,250,500', 'nearest': '1'})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data['rings'], [100, 250, 500])
+        shops = r.data['shops']
+        self.assertAlmostEqual(shops['nearest_m'], 44, delta=1)
+        self.assertEqual([ring['count'] for ring in shops['rings']], [1, 2, 3])
+        self.assertEqual([[p['name'] for p in ring['nearest']] for ring in shops['rings']],
+                         [['Corner'], ['Corner'], ['Corner']])
+        self.assertEqual([ring['count'] for ring in r.data['bus_stops']['rings']], [0, 0, 0])
+        self.assertIsNone(r.data['bus_stops']['nearest_m'])
+
+    def test_one_spatial_query_per_type_then_cached(self):
+        self.client.get(self.url)
+        self.assertEqual(metrics.snapshot()['counters']['poi_cache.miss'], 3)
+        # Smaller rings in the same radius bucket come from the cached lists
+        r = self.client.get(self.url, {'rings': '300,600'})
+        self.assertEqual(r.data['shops']['rings'][1]['count'], 3)
+        self.assertEqual(metrics.snapshot()['counters']['poi_cache.miss'], 3)
+
+    def test_new_pois_are_seen_after_a_reload(self):
+        self.client.get(self.url)
+        BusStop.objects.create(name='Stop', geometry=Point(-121.5, 37.5005, srid=4326))
+        versioning.bump(versioning.POIS)
+        versioning._forget(versioning.POIS)
+        r = self.client.get(self.url)
+        self.assertEqual(r.data['bus_stops']['rings'][0]['count'], 1)
+
+    def test_errors(self):
+        self.assertEqual(self.client.get(self.url, {'rings': 'far'}).status_code, 400)
+        missing = reverse('rentals:building-accessibility', kwargs={'pk': 999999})
+        self.assertEqual(self.client.get(missing).status_code, 404)
@@ -0,0 +1,100 @@
+import math
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rentals import metrics
+from rentals.api.v1.area_search import InvalidArea, canonical_area, parse_area
+from rentals.tests.factories import make_building, make_district
+
+
+def square(west, south, east, north):
+    return {'type': 'Polygon', 'coordinates': [[[west, south], [east, south], [east, north], [west, north], [west, south]]]}
+
+
+def circle(lon, lat, radius, vertices):
+    ring = [[lon + radius * math.cos(2 * math.pi * i / vertices), lat + radius * math.sin(2 * math.pi * i / vertices)]
+            for i in range(vertices)]
+    return {'type': 'Polygon', 'coordinates': [ring + [ring[0]]]}
+
+
+class ParseAreaTests(SimpleTestCase):
+    def test_polygon_and_feature(self):
+        area = parse_area(square(36.8, -1.3, 36.9, -1.2))
+        self.assertEqual((area.geom_type, area.srid, area.num_coords), ('Polygon', 4326, 5))
+        feature = parse_area({'type': 'Feature', 'properties': {}, 'geometry': square(36.8, -1.3, 36.9, -1.2)})
+        self.assertTrue(feature.equals(area))
+
+    def test_detailed_outlines_are_simplified(self):
+        area = parse_area(circle(36.8, -1.3, 0.05, 5000))
+        self.assertLessEqual(area.num_coords, 500)
+        self.assertAlmostEqual(area.area, math.pi * 0.05 ** 2, delta=0.0001)
+
+    @override_settings(RENTALS_AREA_MAX_VERTICES=20)
+    def test_tolerance_grows_until_under_the_cap(self):
+        self.assertLessEqual(parse_area(circle(36.8, -1.3, 0.005, 200)).num_coords, 20)
+
+    def test_self_intersections_are_repaired(self):
+        bowtie = {'type': 'Polygon', 'coordinates': [[[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]]]}
+        area = parse_area(bowtie)
+        self.assertEqual(area.geom_type, 'MultiPolygon')
+        self.assertAlmostEqual(area.area, 0.5)
+
+    def test_invalid_areas(self):
+        for body in (None, [], {'type': 'Point', 'coordinates': [36.8, -1.3]}, {'type': 'Polygon', 'coordinates': 'x'},
+                     {'type': 'Polygon', 'coordinates': [[[0, 0], [1, 1], [2, 2], [0, 0]]]},
+                     square(170, 0, 190, 10)):
+            with self.subTest(body), self.assertRaises(InvalidArea):
+                parse_area(body)
+
+    @override_settings(RENTALS_AREA_MAX_INPUT_VERTICES=100)
+    def test_input_vertex_cap(self):
+        with self.assertRaises(InvalidArea):
+            parse_area(circle(36.8, -1.3, 0.05, 200))
+
+    def test_canonical_area_ignores_start_and_direction(self):
+        ring = square(36.8, -1.3, 36.9, -1.2)['coordinates'][0]
+        rotated = {'type': 'Polygon', 'coordinates': [list(reversed(ring[1:] + ring[1:2]))]}
+        self.assertEqual(canonical_area(parse_area(square(36.8, -1.3, 36.9, -1.2))), canonical_area(parse_area(rotated)))
+
+
+class AreaSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+        district = make_district("Area District")
+        for address, lon, price in (('Inside cheap', -121.5, '800.00'), ('Inside dear', -121.45, '2000.00'),
+                                    ('Outside', -121.2, '800.00')):
+            make_building(district, address, lon, rental_price=Decimal(price))
+        self.url = reverse('rentals:building-area-search')
+        self.area = square(-121.6, 37.4, -121.4, 37.6)
+
+    def _search(self, body, params=''):
+        return self.client.post(f'{self.url}{params}', body, format='json')
+
+    def _addresses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return sorted(feature['properties']['address'] for feature in response.json()['results']['features'])
+
+    def test_buildings_inside_the_area(self):
+        self.assertEqual(self._addresses(self._search(self.area)), ['Inside cheap', 'Inside dear'])
+
+    def test_list_filters_apply(self):
+        self.assertEqual(self._addresses(self._search(self.area, '?price_max=1000')), ['Inside cheap'])
+
+    def test_invalid_area(self):
+        r = self._search({'type': 'Point', 'coordinates': [-121.5, 37.5]})
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('error', r.json())
+
+    def test_pages_are_cached_by_polygon(self):
+        self._search(self.area)
+        ring = self.area['coordinates'][0]
+        self._addresses(self._search({'type': 'Polygon', 'coordinates': [list(reversed(ring))]}))
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['page_cache.miss'], 1)
+        self.assertEqual(counters['page_cache.hit'], 1)
@@ -0,0 +1,114 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rentals.models import Building, BuildingChange, ProfileBuilding
+from rentals.tests.factories import make_building, make_district, square
+
+
+class BuildingBulkTests(TestCase):
+    def setUp(self):
+        self.district = make_district("Bulk District")
+        self.other = make_district("Other District", square(-120.0, 37.0))
+        self.user = User.objects.create_user(username='bulk', password='pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('rentals:building-bulk')
+
+    def _item(self, i, **extra):
+        item = {'address': f'Bulk {i}', 'location': f'37.5,{-121.9 + i * 0.01}',
+                'district': self.district.name, 'rental_price': '1000.00'}
+        item.update(extra)
+        return item
+
+    def _own(self, address='Mine'):
+        building = make_building(self.district, address, rental_price=Decimal('1000.00'))
+        ProfileBuilding.objects.create(profile=self.user.profile, building=building)
+        return building
+
+    def test_creates_buildings_linked_to_the_caller(self):
+        r = self.client.post(self.url, [self._item(i) for i in range(3)], format='json')
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual([c['index'] for c in r.data['created']], [0, 1, 2])
+        ids = [c['id'] for c in r.data['created']]
+        self.assertEqual(ProfileBuilding.objects.filter(profile=self.user.profile, building_id__in=ids).count(), 3)
+        self.assertEqual(set(BuildingChange.objects.filter(building_id__in=ids).values_list('operation', flat=True)),
+                         {BuildingChange.UPSERT})
+
+    def test_accepts_geojson_feature_collection(self):
+        payload = {'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [-121.4, 37.6]},
+             'properties': {'address': 'Feature', 'district': self.district.name}},
+        ]}
+        r = self.client.post(self.url, payload, format='json')
+        self.assertEqual(r.status_code, 201)
+        building = Building.objects.get(pk=r.data['created'][0]['id'])
+        self.assertAlmostEqual(building.location.x, -121.4)
+        self.assertAlmostEqual(building.location.y, 37.6)
+
+    def test_any_invalid_item_rejects_the_batch(self):
+        items = [self._item(0), self._item(1, rental_price='-5'), self._item(2, district='Nowhere')]
+        r = self.client.post(self.url, {'buildings': items}, format='json')
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual([e['index'] for e in r.data['errors']], [1, 2])
+        self.assertIn('rental_price', r.data['errors'][0]['errors'])
+        self.assertIn('district', r.data['errors'][1]['errors'])
+        self.assertFalse(Building.objects.filter(address__startswith='Bulk').exists())
+
+    def test_partial_writes_the_valid_items(self):
+        items = [self._item(0), self._item(1, district=self.other.name)]
+        r = self.client.post(self.url + '?partial=true', items, format='json')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([c['index'] for c in r.data['created']], [0])
+        self.assertEqual(r.data['errors'][0]['index'], 1)
+        self.assertIn('location', r.data['errors'][0]['errors'])
+        self.assertEqual(Building.objects.filter(address__startswith='Bulk').count(), 1)
+
+    def test_updates_only_the_callers_buildings(self):
+        mine = self._own()
+        theirs = make_building(self.district, 'Theirs')
+        items = [{'id': mine.id, 'address': 'Renamed'}, {'id': theirs.id, 'address': 'Stolen'}]
+        r = self.client.post(self.url + '?partial=true', items, format='json')
+        self.assertEqual(r.data['updated'], [{'index': 0, 'id': mine.id}])
+        self.assertEqual(r.data['errors'][0]['index'], 1)
+        mine.refresh_from_db()
+        theirs.refresh_from_db()
+        self.assertEqual(mine.address, 'Renamed')
+        self.assertEqual(theirs.address, 'Theirs')
+
+    def test_update_location_is_checked_against_current_district(self):
+        mine = self._own()
+        r = self.client.post(self.url, [{'id': mine.id, 'location': '37.5,-119.5'}], format='json')
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('location', r.data['errors'][0]['errors'])
+
+    def test_duplicate_ids_are_rejected(self):
+        mine = self._own()
+        r = self.client.post(self.url, [{'id': mine.id, 'address': 'A'}, {'id': mine.id, 'address': 'B'}], format='json')
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.data['errors'][0]['index'], 1)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def queries(n, offset):
+            mine = [self._own(f'Own {offset + i}') for i in range(n)]
+            items = [self._item(offset + i) for i in range(n)] + [{'id': b.id, 'address': 'Changed'} for b in mine]
+            with CaptureQueriesContext(connection) as captured:
+                r = self.client.post(self.url, items, format='json')
+            self.assertEqual(r.status_code, 201)
+            return len(captured)
+
+        self.assertEqual(queries(2, 0), queries(10, 100))
+
+    def test_rejects_non_list_payload(self):
+        r = self.client.post(self.url, {'address': 'single'}, format='json')
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('error', r.data)
+
+    def test_requires_authentication(self):
+        r = APIClient().post(self.url, [self._item(0)], format='json')
+        self.assertIn(r.status_code, (401, 403))
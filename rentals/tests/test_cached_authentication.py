@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from rentals import metrics
+from rentals.authentication import snapshot_cache_key
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.user = User.objects.create_user(username='cached', password='StrongP@ss1')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.buildings_url = reverse('rentals:user-buildings-me')
+
+    def _auth_user_queries(self, captured):
+        return [q['sql'] for q in captured.captured_queries if '"auth_user"' in q['sql']]
+
+    def test_steady_state_requests_skip_the_user_query(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.assertEqual(self.client.get(self.buildings_url).status_code, 200)
+        with CaptureQueriesContext(connection) as warm:
+            self.assertEqual(self.client.get(self.buildings_url).status_code, 200)
+
+        self.assertEqual(len(self._auth_user_queries(cold)), 1)
+        self.assertEqual(self._auth_user_queries(warm), [])
+        self.assertEqual(len(cold) - len(warm), 1)
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['auth.snapshot{result=miss}'], 1)
+        self.assertEqual(counters['auth.snapshot{result=hit}'], 1)
+
+    def test_deactivating_the_user_takes_effect_immediately(self):
+        self.client.get(self.buildings_url)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.buildings_url).status_code, 401)
+
+    def test_profile_changes_drop_the_snapshot(self):
+        self.client.get(self.buildings_url)
+        self.assertIsNotNone(cache.get(snapshot_cache_key(self.user.pk)))
+        self.user.profile.save()
+        self.assertIsNone(cache.get(snapshot_cache_key(self.user.pk)))
+
+    def test_staff_flag_comes_from_snapshot(self):
+        admin = User.objects.create_superuser(username='boss', password='StrongP@ss1')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(admin).access_token}')
+        self.assertEqual(client.get(reverse('rentals:user-list')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('rentals:user-list')).status_code, 403)
+
+    def test_profile_endpoint_with_snapshot_user(self):
+        r = self.client.get(reverse('rentals:profile-detail-me'))
+        self.assertEqual(r.status_code, 200)
@@ -0,0 +1,152 @@
+import base64
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+import psycopg
+
+from rentals.changelog import changes_since, current_version, decode_version, encode_version
+from rentals.models import BuildingChange, ProfileBuilding
+from rentals.tests.factories import make_building, make_district
+
+
+class BuildingChangesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.district = make_district("Sync District")
+        self.building = make_building(self.district, 'Initial', rental_price=Decimal('1000.00'))
+        self.changes_url = reverse('rentals:building-changes')
+        self.list_url = reverse('rentals:building-list-create')
+
+    def _snapshot_version(self):
+        r = self.client.get(self.list_url, {'geojson': 'true'})
+        self.assertEqual(r.status_code, 200)
+        return r['X-Buildings-Version']
+
+    def test_without_since_returns_current_version(self):
+        r = self.client.get(self.changes_url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(set(r.data), {'version'})
+
+    def test_snapshot_version_is_up_to_date(self):
+        r = self.client.get(self.changes_url, {'since': self._snapshot_version()})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data['upserted']['features'], [])
+        self.assertEqual(r.data['deleted'], [])
+        self.assertFalse(r.data['has_more'])
+
+    def test_reports_created_updated_and_deleted_buildings(self):
+        version = self._snapshot_version()
+        created = make_building(self.district, 'New', -121.4, 37.4)
+        self.building.address = 'Updated'
+        self.building.save()
+        doomed = make_building(self.district, 'Gone', -121.3, 37.3)
+        doomed_id = doomed.id
+        doomed.delete()
+
+        r = self.client.get(self.changes_url, {'since': version})
+        self.assertEqual(r.status_code, 200)
+        features = {f['id']: f for f in r.data['upserted']['features']}
+        self.assertEqual(set(features), {created.id, self.building.id})
+        self.assertEqual(features[self.building.id]['properties']['address'], 'Updated')
+        self.assertEqual(r.data['deleted'], [doomed_id])
+
+        # The returned version picks up where this sync stopped
+        r = self.client.get(self.changes_url, {'since': r.data['version']})
+        self.assertEqual(r.data['upserted']['features'], [])
+        self.assertEqual(r.data['deleted'], [])
+
+    def test_orphan_cleanup_is_logged_as_delete(self):
+        user = User.objects.create_user(username='owner', password='pass')
+        ProfileBuilding.objects.create(profile=user.profile, building=self.building)
+        version = self._snapshot_version()
+        building_id = self.building.id
+        user.delete()
+
+        r = self.client.get(self.changes_url, {'since': version})
+        self.assertEqual(r.data['deleted'], [building_id])
+
+    def test_has_more_pages_through_the_log(self):
+        version = self._snapshot_version()
+        for i in range(3):
+            make_building(self.district, f'B{i}')
+        with mock.patch('rentals.changelog.MAX_CHANGES_PER_SYNC', 2):
+            seen = []
+            while True:
+                r = self.client.get(self.changes_url, {'since': version})
+                seen.extend(f['id'] for f in r.data['upserted']['features'])
+                version = r.data['version']
+                if not r.data['has_more']:
+                    break
+        self.assertEqual(len(seen), 3)
+
+    def test_invalid_version_is_rejected(self):
+        r = self.client.get(self.changes_url, {'since': 'not-a-token'})
+        self.assertEqual(r.status_code, 400)
+
+    @override_settings(RENTALS_CHANGELOG_RETENTION_DAYS=1)
+    def test_expired_version_requires_full_reload(self):
+        version = self._snapshot_version()
+        with mock.patch('rentals.changelog.timezone.now', return_value=timezone.now() + timedelta(days=2)):
+            r = self.client.get(self.changes_url, {'since': version})
+        self.assertEqual(r.status_code, 410)
+
+    @override_settings(RENTALS_CHANGELOG_RETENTION_DAYS=1)
+    def test_prune_removes_entries_past_retention(self):
+        BuildingChange.objects.update(changed_at=timezone.now() - timedelta(days=2))
+        recent = BuildingChange.objects.create(building_id=self.building.id, operation=BuildingChange.UPSERT)
+        call_command('prune_building_changes', stdout=mock.MagicMock())
+        self.assertEqual(list(BuildingChange.objects.values_list('id', flat=True)), [recent.id])
+
+    def test_prune_keeps_the_newest_entry(self):
+        BuildingChange.objects.update(changed_at=timezone.now() - timedelta(days=60))
+        newest = BuildingChange.objects.latest('id')
+        call_command('prune_building_changes', stdout=mock.MagicMock())
+        self.assertEqual(list(BuildingChange.objects.values_list('id', flat=True)), [newest.id])
+
+    def test_encoded_version_round_trips(self):
+        r = self.client.get(self.changes_url, {'since': encode_version((0, 0))})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data['upserted']['features'][0]['id'], self.building.id)
+
+    def test_tokens_without_a_transaction_id_still_work(self):
+        legacy = base64.urlsafe_b64encode(f'0:{int(timezone.now().timestamp())}'.encode()).decode()
+        r = self.client.get(self.changes_url, {'since': legacy})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data['upserted']['features'][0]['id'], self.building.id)
+
+
+class InterleavedTransactionTests(TransactionTestCase):
+    def setUp(self):
+        self.district = make_district("Interleaved District")
+
+    def _building(self, address):
+        return make_building(self.district, address)
+
+    def test_change_committed_behind_an_open_transaction_is_not_skipped(self):
+        slow = self._building('Slow')
+        version = current_version()
+        params = connection.get_connection_params()
+        params.pop('cursor_factory', None)
+        params.pop('context', None)
+        with psycopg.connect(**params) as other:
+            # Like a long import: takes the lower change id and commits last
+            other.execute('INSERT INTO building_change (building_id, operation, changed_at) VALUES (%s, %s, now())',
+                          [slow.id, BuildingChange.UPSERT])
+            fast = self._building('Fast')
+            upserted, _, position, _ = changes_since(decode_version(version))
+            # The fast change waits behind the open transaction instead of moving the cursor past it
+            self.assertEqual(upserted, [])
+            version = encode_version(position)
+            other.commit()
+
+        upserted, _, _, _ = changes_since(decode_version(version))
+        self.assertEqual(sorted(upserted), sorted([slow.id, fast.id]))
@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rentals import metrics
+from rentals.comparables import ListingIndex, forget_listing_index
+from rentals.models import Building
+from rentals.tests.factories import make_building, make_district
+
+
+TARGET = {'rental_price': Decimal('1000.00'), 'num_bedrooms': 2, 'num_bathrooms': 1, 'square_meters': Decimal('60.00'),
+          'amenities': ['wifi', 'parking'], 'lon': -121.5, 'lat': 37.5}
+
+
+class ListingIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = ListingIndex.from_rows([
+            # id, price, bedrooms, bathrooms, square metres, amenities, lon, lat
+            (3, Decimal('1000.00'), 2, 1, Decimal('60.00'), ['wifi', 'parking'], -121.501, 37.5),
+            (1, Decimal('3000.00'), 2, 1, Decimal('60.00'), ['wifi', 'parking'], -121.501, 37.5),
+            (2, Decimal('1050.00'), 2, 1, Decimal('62.00'), ['wifi'], -121.502, 37.5),
+            (4, None, None, None, None, None, -121.5, 37.501),
+        ])
+
+    def test_rows_are_sorted_by_id(self):
+        self.assertEqual(self.index.ids.tolist(), [1, 2, 3, 4])
+        self.assertEqual(self.index.nbytes, 4 * (8 + 4 * 4 + 2 * 4 + 8))
+
+    def test_closest_attributes_rank_first(self):
+        results = self.index.rank(TARGET, [1, 2, 3, 4], k=4)
+        self.assertEqual([r['id'] for r in results], [3, 2, 1, 4])
+        best = results[0]
+        self.assertEqual(best['shared_amenities'], 2)
+        self.assertEqual(best['num_bedrooms'], 2)
+        self.assertAlmostEqual(best['distance_m'], 88.4, delta=0.5)
+        self.assertGreater(best['score'], results[1]['score'])
+        self.assertIsNone(results[-1]['rental_price'])
+
+    def test_only_candidates_are_ranked(self):
+        self.assertEqual([r['id'] for r in self.index.rank(TARGET, [1, 99, 2], k=10)], [2, 1])
+        self.assertEqual(self.index.rank(TARGET, [99], k=10), [])
+        self.assertEqual(len(self.index.rank(TARGET, [1, 2, 3, 4], k=2)), 2)
+
+    def test_weights(self):
+        # Ignoring price, the identical listing 1 ties with 3 and keeps its candidate order
+        results = self.index.rank(TARGET, [1, 3], k=2, weights={'rental_price': 0})
+        self.assertEqual([r['id'] for r in results], [1, 3])
+
+    def test_empty_index(self):
+        self.assertEqual(ListingIndex.from_rows([]).rank(TARGET, [1], k=5), [])
+
+
+class SimilarListingsTests(TestCase):
+    def setUp(self):
+        forget_listing_index()
+        metrics.reset()
+        self.client = APIClient()
+        self.district = make_district("Similar District")
+        self.building = self._building('Viewed', -121.5, '1000.00')
+        self._building('Twin', -121.499, '1000.00')
+        self._building('Pricey', -121.4995, '5000.00')
+        self._building('Taken', -121.4999, '1000.00', is_available=False)
+        self.url = reverse('rentals:building-similar', kwargs={'pk': self.building.pk})
+
+    def _building(self, address, lon, price, **extra):
+        return make_building(self.district, address, lon, rental_price=Decimal(price), num_bedrooms=2, num_bathrooms=1,
+                             square_meters=Decimal('60.00'), amenities=['wifi'], **extra)
+
+    def _addresses(self, results):
+        return [Building.objects.get(pk=r['id']).address for r in results]
+
+    def test_similar_available_listings_best_first(self):
+        r = self.client.get(self.url, {'k': '5'})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data['id'], self.building.pk)
+        self.assertEqual(self._addresses(r.data['results']), ['Twin', 'Pricey'])
+
+    def test_index_is_rebuilt_after_a_change(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.assertEqual(metrics.snapshot()['counters']['comparables.index_builds'], 1)
+        with self.settings(RENTALS_SIMILAR_INDEX_MIN_AGE=0):
+            self._building('New', -121.4998, '1000.00')
+            r = self.client.get(self.url, {'k': '1'})
+        self.assertEqual(self._addresses(r.data['results']), ['New'])
+        self.assertEqual(metrics.snapshot()['counters']['comparables.index_builds'], 2)
+
+    def test_errors(self):
+        self.assertEqual(self.client.get(self.url, {'k': '0'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'k': 'many'}).status_code, 400)
+        missing = reverse('rentals:building-similar', kwargs={'pk': 999999})
+        self.assertEqual(self.client.get(missing).status_code, 404)
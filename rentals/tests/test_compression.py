@@ -0,0 +1,107 @@
+import gzip
+import json
+
+import brotli
+import zstandard
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from rentals import metrics
+from rentals.compression import StreamCompressor
+from rentals.middleware import CompressionMiddleware, compressed_cache
+
+API_PATH = '/rentals/api/v1/buildings/'
+
+BODY = json.dumps({'type': 'FeatureCollection', 'features': [
+    {'type': 'Feature', 'id': i, 'properties': {'address': f'Street {i}'}} for i in range(200)
+]}).encode()
+
+DECODERS = {
+    'gzip': gzip.decompress,
+    'br': brotli.decompress,
+    'zstd': lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data),
+}
+
+
+def _streamed(response):
+    return b''.join(response.streaming_content)
+
+
+class StreamCompressorTests(SimpleTestCase):
+    def test_round_trips_every_encoding(self):
+        for encoding, decode in DECODERS.items():
+            compressor = StreamCompressor(encoding, 3)
+            data = b''.join([compressor.compress(BODY[:1000]), compressor.flush(final=False),
+                             compressor.compress(BODY[1000:]), compressor.flush()])
+            self.assertEqual(decode(data), BODY, encoding)
+
+    def test_rejects_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            StreamCompressor('compress')
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        compressed_cache.clear()
+        self.factory = RequestFactory()
+
+    def _run(self, response, accept='zstd, br, gzip', path=API_PATH):
+        request = self.factory.get(path, HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_uses_the_clients_preferred_encoding(self):
+        for accept, expected in (('gzip', 'gzip'), ('gzip;q=0.5, br', 'br'), ('zstd, gzip', 'zstd')):
+            r = self._run(HttpResponse(BODY, content_type='application/json'), accept)
+            self.assertEqual(r['Content-Encoding'], expected)
+            self.assertEqual(r['Content-Length'], str(len(r.content)))
+            self.assertEqual(DECODERS[expected](r.content), BODY)
+            self.assertIn('Accept-Encoding', r['Vary'])
+
+    @override_settings(RENTALS_COMPRESSION_ENCODINGS=['gzip'], RENTALS_COMPRESSION_LEVELS={'gzip': 1})
+    def test_encoders_and_levels_come_from_settings(self):
+        r = self._run(HttpResponse(BODY, content_type='application/json'), 'zstd, br, gzip')
+        self.assertEqual(r['Content-Encoding'], 'gzip')
+        self.assertEqual(r.content, gzip.compress(BODY, compresslevel=1, mtime=0))
+
+    def test_leaves_small_foreign_and_binary_responses_alone(self):
+        cases = [
+            (HttpResponse(b'{"ok": true}', content_type='application/json'), API_PATH),
+            (HttpResponse(BODY, content_type='text/html'), '/rentals/'),
+            (HttpResponse(BODY, content_type='application/vnd.apache.parquet'), API_PATH),
+            (HttpResponse(BODY, content_type='application/flatgeobuf'), API_PATH),
+        ]
+        for response, path in cases:
+            r = self._run(response, path=path)
+            self.assertFalse(r.has_header('Content-Encoding'))
+
+    def test_identity_when_nothing_acceptable(self):
+        r = self._run(HttpResponse(BODY, content_type='application/json'), 'identity')
+        self.assertFalse(r.has_header('Content-Encoding'))
+        self.assertEqual(r.content, BODY)
+        self.assertIn('Accept-Encoding', r['Vary'])
+
+    def test_streaming_responses_are_compressed_incrementally(self):
+        chunks = [BODY[i:i + 4096] for i in range(0, len(BODY), 4096)]
+        r = self._run(StreamingHttpResponse(iter(chunks), content_type='text/csv'), 'br')
+        self.assertEqual(r['Content-Encoding'], 'br')
+        self.assertFalse(r.has_header('Content-Length'))
+        self.assertEqual(brotli.decompress(_streamed(r)), BODY)
+
+    def test_cacheable_bodies_are_compressed_once(self):
+        for _ in range(2):
+            response = HttpResponse(BODY, content_type='application/json')
+            response['ETag'] = '"v1"'
+            r = self._run(response, 'gzip')
+            self.assertEqual(r['ETag'], 'W/"v1"')
+            self.assertEqual(gzip.decompress(r.content), BODY)
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['compression.cache{result=miss}'], 1)
+        self.assertEqual(counters['compression.cache{result=hit}'], 1)
+
+    def test_private_responses_are_not_cached(self):
+        response = HttpResponse(BODY, content_type='application/json')
+        response['ETag'] = '"v1"'
+        response['Cache-Control'] = 'private'
+        self._run(response, 'gzip')
+        self.assertNotIn('compression.cache{result=miss}', metrics.snapshot()['counters'])
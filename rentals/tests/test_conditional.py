@@ -0,0 +1,131 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+import psycopg
+
+from rentals import versioning
+from rentals.changelog import forget_latest_change
+from rentals.models import BuildingChange
+from rentals.tests.factories import make_building, make_district
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        forget_latest_change()
+        versioning._forget(versioning.POIS)
+        versioning._forget(versioning.DISTRICTS)
+        self.client = APIClient()
+        self.district = make_district("ETag District")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.building = make_building(self.district, 'Cached', rental_price=Decimal('1000.00'))
+        self.list_url = reverse('rentals:building-list-create')
+        self.detail_url = reverse('rentals:building-detail', kwargs={'pk': self.building.pk})
+
+    def _change_building(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.building.address = 'Changed'
+            self.building.save()
+
+    # The memoised versions must outlive the first (possibly slow) request
+    @override_settings(RENTALS_DATASET_VERSION_TTL=60)
+    def test_list_revalidation_runs_no_query(self):
+        for params in ({}, {'geojson': 'true'}):
+            r = self.client.get(self.list_url, params)
+            self.assertEqual(r.status_code, 200)
+            self.assertNotIn('Last-Modified', r)
+            with self.assertNumQueries(0):
+                again = self.client.get(self.list_url, params, HTTP_IF_NONE_MATCH=r['ETag'])
+            self.assertEqual(again.status_code, 304)
+            self.assertEqual(again['ETag'], r['ETag'])
+            self.assertEqual(again.content, b'')
+
+    def test_building_changes_invalidate_the_list_etag(self):
+        etag = self.client.get(self.list_url)['ETag']
+        self._change_building()
+        r = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r['ETag'], etag)
+
+    def test_filters_are_part_of_the_etag(self):
+        etag = self.client.get(self.list_url)['ETag']
+        r = self.client.get(self.list_url, {'district': self.district.name}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r['ETag'], etag)
+
+    def test_weak_etag_from_compression_still_matches(self):
+        etag = self.client.get(self.list_url)['ETag']
+        r = self.client.get(self.list_url, HTTP_IF_NONE_MATCH='W/' + etag)
+        self.assertEqual(r.status_code, 304)
+
+    def test_detail_revalidation_is_one_query(self):
+        r = self.client.get(self.detail_url)
+        self.assertEqual(r.status_code, 200)
+        with self.assertNumQueries(1):
+            again = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=r['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+        self._change_building()
+        r = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=r['ETag'])
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data['address'], 'Changed')
+
+    def test_if_modified_since_alone_is_not_trusted(self):
+        # Building changes within one second, and POI reloads, have no newer HTTP date
+        later = http_date((self.building.updated_at + timedelta(seconds=5)).timestamp())
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=later).status_code, 200)
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=later).status_code, 200)
+        earlier = http_date((self.building.updated_at - timedelta(seconds=5)).timestamp())
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=earlier).status_code, 200)
+
+    def test_missing_building_is_still_404(self):
+        r = self.client.get(reverse('rentals:building-detail', kwargs={'pk': 999999}))
+        self.assertEqual(r.status_code, 404)
+        self.assertNotIn('ETag', r)
+
+    def test_cache_control_depends_on_authentication(self):
+        r = self.client.get(self.list_url)
+        self.assertIn('public', r['Cache-Control'])
+        self.assertIn('must-revalidate', r['Cache-Control'])
+        self.assertIn('Authorization', r['Vary'])
+
+        user = User.objects.create_user(username='etag', password='pass')
+        client = APIClient()
+        client.force_authenticate(user)
+        r = client.get(self.list_url)
+        self.assertIn('private', r['Cache-Control'])
+        self.assertNotIn('public', r['Cache-Control'])
+
+
+class LateCommitTests(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.district = make_district("Late District")
+        self.list_url = reverse('rentals:building-list-create')
+
+    def _building(self, address):
+        return make_building(self.district, address)
+
+    @override_settings(RENTALS_DATASET_VERSION_TTL=0)
+    def test_change_committed_late_moves_the_list_etag(self):
+        slow = self._building('Slow')
+        params = connection.get_connection_params()
+        params.pop('cursor_factory', None)
+        params.pop('context', None)
+        with psycopg.connect(**params) as other:
+            # Takes a lower change id than the building saved below and commits after it
+            other.execute('INSERT INTO building_change (building_id, operation, changed_at) VALUES (%s, %s, now())',
+                          [slow.id, BuildingChange.UPSERT])
+            self._building('Fast')
+            etag = self.client.get(self.list_url)['ETag']
+            other.commit()
+
+        r = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotEqual(r['ETag'], etag)
@@ -0,0 +1,114 @@
+import csv
+import io
+import os
+import tempfile
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyogrio
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rentals.models import Building
+from rentals.tests.factories import make_building, make_district, square
+
+
+class BuildingExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.district = make_district("Export District")
+        self.other = make_district("Other District", square(-120.0, 37.0))
+        for i in range(5):
+            make_building(self.district, f'A{i}', -121.9 + i * 0.1,
+                          rental_price=Decimal('1000.00') * (i + 1), amenities=['wifi'])
+        make_building(self.other, 'Far', -119.5)
+        self.export_url = reverse('rentals:building-export')
+
+    def _content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_parquet_export_applies_list_filters(self):
+        r = self.client.get(self.export_url, {'format': 'parquet', 'district': self.district.name, 'price_min': '2500'})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r['Content-Type'], 'application/vnd.apache.parquet')
+        table = pq.read_table(io.BytesIO(self._content(r)))
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(set(table.column('district').to_pylist()), {self.district.name})
+        self.assertIn(b'geo', table.schema.metadata)
+
+    def test_arrow_stream_export(self):
+        r = self.client.get(self.export_url, {'format': 'arrow'})
+        self.assertEqual(r.status_code, 200)
+        table = pa.ipc.open_stream(self._content(r)).read_all()
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(table.schema.field('geometry').metadata[b'ARROW:extension:name'], b'geoarrow.wkb')
+
+    def test_flatgeobuf_export_supports_bbox_reads(self):
+        r = self.client.get(self.export_url, {'format': 'fgb'})
+        self.assertEqual(r.status_code, 200)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'buildings.fgb')
+            with open(path, 'wb') as fh:
+                fh.write(self._content(r))
+            self.assertEqual(pyogrio.read_info(path)['features'], 6)
+            _, _, geometries, _ = pyogrio.raw.read(path, bbox=(-120.0, 37.0, -119.0, 38.0))
+            self.assertEqual(len(geometries), 1)
+
+    def test_csv_export_by_url_suffix(self):
+        url = reverse('rentals:building-export-file', kwargs={'format': 'csv'})
+        with CaptureQueriesContext(connection) as captured:
+            r = self.client.get(url, {'district': self.district.name, 'price_min': '2500'})
+            rows = list(csv.DictReader(io.StringIO(self._content(r).decode())))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r['Content-Type'], 'text/csv')
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['district'] for row in rows}, {self.district.name})
+        self.assertAlmostEqual(float(rows[0]['latitude']), 37.5)
+        self.assertNotIn('geometry', rows[0])
+        self.assertFalse([q for q in captured.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+    def test_parquet_export_by_url_suffix(self):
+        r = self.client.get(reverse('rentals:building-export-file', kwargs={'format': 'parquet'}))
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(pq.read_table(io.BytesIO(self._content(r))).num_rows, 6)
+
+    def test_empty_csv_export_has_header(self):
+        r = self.client.get(self.export_url, {'format': 'csv', 'district': 'Nowhere'})
+        self.assertEqual(r.status_code, 200)
+        header = self._content(r).decode().splitlines()
+        self.assertEqual(len(header), 1)
+        self.assertIn('"longitude","latitude"', header[0])
+
+    def test_missing_format_is_rejected(self):
+        r = self.client.get(self.export_url)
+        self.assertEqual(r.status_code, 400)
+
+    def test_export_command(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'out.parquet')
+            call_command('export_buildings', export_format='parquet', output=path, poi=[], stdout=io.StringIO())
+            self.assertEqual(pq.read_table(path).num_rows, 6)
+
+    def test_export_command_csv(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'out.csv')
+            call_command('export_buildings', export_format='csv', output=path, poi=[], district=self.other.name,
+                         stdout=io.StringIO())
+            with open(path, newline='') as fh:
+                rows = list(csv.DictReader(fh))
+            self.assertEqual([row['address'] for row in rows], ['Far'])
+
+    def test_export_command_forwards_list_filters(self):
+        Building.objects.filter(address='A0').update(is_available=False)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'out.csv')
+            call_command('export_buildings', export_format='csv', output=path, poi=[], district=self.district.name,
+                         available='true', price_min='2500', stdout=io.StringIO())
+            with open(path, newline='') as fh:
+                rows = list(csv.DictReader(fh))
+            self.assertEqual(sorted(row['address'] for row in rows), ['A2', 'A3', 'A4'])
@@ -0,0 +1,102 @@
+import os
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rentals.compression import negotiate
+from rentals.models import District
+from rentals.staticfiles import serve
+from rentals.tests.factories import make_district
+
+
+HASHED_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'rentals.storage.PrecompressedManifestStaticFilesStorage'},
+}
+
+
+class DistrictFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_district("Cached District")
+
+    def test_repeat_visits_run_no_queries(self):
+        for name in ('rentals:rentals_listings', 'rentals:user_account'):
+            url = reverse(name)
+            self.assertContains(self.client.get(url), 'Cached District')
+            with self.assertNumQueries(0):
+                self.assertContains(self.client.get(url), 'Cached District')
+
+    def test_district_changes_invalidate_the_fragments(self):
+        url = reverse('rentals:rentals_listings')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_district("New District")
+        self.assertContains(self.client.get(url), 'New District')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            District.objects.filter(name="New District").delete()
+        self.assertNotContains(self.client.get(url), 'New District')
+
+
+class PrecompressedStaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.static_root.name, STORAGES=HASHED_STORAGES))
+        call_command('collectstatic', interactive=False, verbosity=0,
+                     ignore_patterns=['admin', 'rest_framework', 'gis'])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.static_root.cleanup()
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.hashed = staticfiles_storage.stored_name('rentals/js/map-ui.js')
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        self.assertRegex(self.hashed, r'^rentals/js/map-ui\.[0-9a-f]{12}\.js$')
+        for suffix in ('', '.gz', '.br'):
+            self.assertTrue(os.path.exists(os.path.join(self.static_root.name, self.hashed + suffix)))
+        outline = staticfiles_storage.stored_name('rentals/data/nairobi_outline.geojson')
+        self.assertTrue(os.path.exists(os.path.join(self.static_root.name, outline + '.br')))
+        # Binary assets are left alone
+        self.assertFalse(os.path.exists(os.path.join(self.static_root.name, 'rentals/icons/favicon.ico.gz')))
+
+    def test_hashed_file_served_precompressed_and_immutable(self):
+        r = serve(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate, br'), self.hashed)
+        self.assertEqual(r['Content-Encoding'], 'br')
+        self.assertIn('immutable', r['Cache-Control'])
+        self.assertEqual(r['Vary'], 'Accept-Encoding')
+        self.assertIn('javascript', r['Content-Type'])
+
+        r = serve(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip'), self.hashed)
+        self.assertEqual(r['Content-Encoding'], 'gzip')
+        r = serve(self.factory.get('/'), self.hashed)
+        self.assertNotIn('Content-Encoding', r)
+
+    def test_unhashed_file_is_revalidated(self):
+        r = serve(self.factory.get('/'), 'rentals/js/map-ui.js')
+        self.assertNotIn('immutable', r['Cache-Control'])
+        r = serve(self.factory.get('/', HTTP_IF_MODIFIED_SINCE=r['Last-Modified']), 'rentals/js/map-ui.js')
+        self.assertEqual(r.status_code, 304)
+
+    def test_paths_outside_static_root_are_not_served(self):
+        with self.assertRaises(Http404):
+            serve(self.factory.get('/'), '../etc/passwd')
+
+
+class NegotiateTests(SimpleTestCase):
+    def test_highest_q_value_wins(self):
+        self.assertEqual(negotiate('gzip, br;q=0.5', ['br', 'gzip']), 'gzip')
+        self.assertEqual(negotiate('gzip, br', ['br', 'gzip']), 'br')
+        self.assertEqual(negotiate('br;q=0, *', ['br', 'gzip']), 'gzip')
+        self.assertIsNone(negotiate('identity', ['br', 'gzip']))
@@ -0,0 +1,163 @@
+import io
+import json
+import os
+import struct
+import tempfile
+from unittest import mock
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from rentals.loaders.building_loader import BuildingWriter
+from rentals.loaders.building_rows import RowParser, RowError, point_from_wkb
+from rentals.models import Building, BuildingChange, ImportJob
+from rentals.tests.factories import make_district, square
+
+
+class ImportBuildingsTests(TestCase):
+    def setUp(self):
+        make_district("Westlands", square(36.0, -2.0), county="Nairobi")
+        self.admin = User.objects.create_user(username='admin', password='pass')
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def _import(self, path, **kwargs):
+        out = io.StringIO()
+        call_command('import_buildings', source=path, stdout=out, **kwargs)
+        return out.getvalue()
+
+    def test_csv_import_in_shards(self):
+        path = self._path('buildings.csv')
+        with open(path, 'w') as fh:
+            fh.write('Title,District,Latitude,Longitude,Rent,Bedroom,Amenities\n')
+            for i in range(7):
+                fh.write(f'Flat {i},Westlands,-1.{i + 1},36.{i + 1},{1000 + i},2,"[""wifi""]"\n')
+            fh.write('No coords,Westlands,,,1000,1,\n')
+            fh.write('Bad rent,Westlands,-1.5,36.5,cheap,1,\n')
+            fh.write('Unknown,Atlantis,-1.5,36.5,1000,1,\n')
+
+        output = self._import(path, workers=1, shard_size=3)
+        self.assertIn('Imported 7 buildings. Skipped 3 rows.', output)
+        self.assertIn('Row 9: Skipping row with invalid numeric values.', output)
+        buildings = Building.objects.filter(profiles__user=self.admin).order_by('title')
+        self.assertEqual(buildings.count(), 7)
+        first = buildings.first()
+        self.assertEqual(first.num_bedrooms, 2)
+        self.assertEqual(first.amenities, ['wifi'])
+        self.assertAlmostEqual(first.location.y, -1.1)
+        self.assertEqual(BuildingChange.objects.filter(building_id__in=buildings.values('id')).count(), 7)
+
+    def test_geojson_import_with_worker_processes(self):
+        path = self._path('buildings.geojson')
+        features = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [36.5, -1.5]},
+                     'properties': {'title': f'G{i}', 'district': 'Westlands', 'rental_price': 900}} for i in range(6)]
+        with open(path, 'w') as fh:
+            json.dump({'type': 'FeatureCollection', 'features': features}, fh)
+
+        self.assertIn('Imported 6 buildings.', self._import(path, workers=2, shard_size=2))
+        self.assertEqual(Building.objects.filter(title__startswith='G', location__isnull=False).count(), 6)
+
+    def test_parquet_import_reads_wkb_geometry(self):
+        path = self._path('buildings.parquet')
+        wkb = struct.pack('<BIdd', 1, 1, 36.25, -1.75)
+        pq.write_table(pa.table({'title': ['P'], 'district': ['Westlands'], 'geometry': [wkb],
+                                 'amenities': [['gym']]}), path)
+
+        self._import(path, workers=1)
+        building = Building.objects.get(title='P')
+        self.assertAlmostEqual(building.location.x, 36.25)
+        self.assertEqual(building.amenities, ['gym'])
+
+    def _write_csv(self, rows=10):
+        path = self._path('resume.csv')
+        with open(path, 'w') as fh:
+            fh.write('source_id,title,district,latitude,longitude,rent\n')
+            for i in range(rows):
+                fh.write(f'S{i},Flat {i},Westlands,-1.{i + 10},36.5,{1000 + i}\n')
+        return path
+
+    def test_rerun_after_failure_resumes_at_checkpoint(self):
+        path = self._write_csv(10)
+        real_write = BuildingWriter.write
+        calls = []
+
+        def failing_write(writer, *args, **kwargs):
+            calls.append(1)
+            if len(calls) == 3:
+                raise RuntimeError('connection lost')
+            return real_write(writer, *args, **kwargs)
+
+        with mock.patch.object(BuildingWriter, 'write', failing_write):
+            with self.assertRaises(RuntimeError):
+                self._import(path, workers=1, shard_size=3)
+        job = ImportJob.objects.get()
+        self.assertEqual((job.status, job.next_row), (ImportJob.FAILED, 6))
+        self.assertEqual(Building.objects.count(), 6)
+
+        output = self._import(path, workers=1, shard_size=4)
+        self.assertIn('Imported 10 buildings.', output)
+        self.assertEqual(Building.objects.count(), 10)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.next_row), (ImportJob.DONE, 10))
+
+        self.assertIn('already imported', self._import(path))
+
+    def test_restart_updates_instead_of_duplicating(self):
+        path = self._write_csv(5)
+        self._import(path, workers=1)
+        with open(path, 'a') as fh:
+            # Same natural key, new values; plus one new row
+            fh.write('S0,Renamed,Westlands,-1.10,36.5,999\nS5,Flat 5,Westlands,-1.15,36.5,1005\n')
+        self._import(path, workers=1, restart=True)
+        self.assertEqual(Building.objects.count(), 6)
+        self.assertEqual(Building.objects.get(title='Renamed').rental_price, 999)
+        self.assertEqual(Building.objects.filter(profiles__user=self.admin).count(), 6)
+
+    def test_duplicates_within_a_file_keep_the_last_row(self):
+        path = self._path('dupes.csv')
+        with open(path, 'w') as fh:
+            fh.write('title,address,district,latitude,longitude\n')
+            fh.write('First,1 Main St,Westlands,-1.5,36.5\nSecond,1  main st,Westlands,-1.5,36.5\n')
+        output = self._import(path, workers=1)
+        self.assertIn('Row 1: Skipping row duplicated by row 2.', output)
+        self.assertEqual(list(Building.objects.values_list('title', flat=True)), ['Second'])
+
+    def test_dry_run_writes_nothing(self):
+        path = self._write_csv(5)
+        output = self._import(path, workers=1, dry_run=True, progress_every=0)
+        self.assertIn('Validated 5 buildings. Skipped 0 rows.', output)
+        self.assertIn('5 rows processed', output)
+        self.assertFalse(Building.objects.exists())
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_unsupported_file_type(self):
+        path = self._path('buildings.xlsx')
+        open(path, 'w').close()
+        with self.assertRaises(CommandError):
+            self._import(path)
+
+
+class RowParserTests(SimpleTestCase):
+    def test_column_names_are_normalized(self):
+        parser = RowParser(['Rental Price', 'DISTRICT', 'location'])
+        data = parser.parse(('1200.50', 'Westlands', '-1.2, 36.8'))
+        self.assertEqual(str(data['rental_price']), '1200.50')
+        self.assertEqual((data['lat'], data['lon']), (-1.2, 36.8))
+
+    def test_out_of_range_coordinates_are_rejected(self):
+        with self.assertRaises(RowError):
+            RowParser(['latitude', 'longitude', 'district']).parse((91, 36.8, 'Westlands'))
+
+    def test_ewkb_with_srid(self):
+        ewkb = struct.pack('<BIIdd', 1, 0x20000001, 4326, 36.8, -1.2)
+        self.assertEqual(point_from_wkb(ewkb), (36.8, -1.2))
+        self.assertIsNone(point_from_wkb(struct.pack('<BIdd', 1, 2, 0, 0)))
@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rentals.tests.factories import make_building, make_district
+
+
+class RequestTimingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.district = make_district("Timing District")
+        make_building(self.district, 'Addr', owner_contact='oc')
+        self.building_list_url = reverse('rentals:building-list-create')
+
+    @override_settings(RENTALS_REQUEST_TIMING=False)
+    def test_disabled_adds_no_header(self):
+        r = APIClient().get(self.building_list_url)
+        self.assertEqual(r.status_code, 200)
+        self.assertNotIn('Server-Timing', r)
+
+    @override_settings(RENTALS_REQUEST_TIMING=True, RENTALS_SLOW_REQUEST_MS=None)
+    def test_enabled_emits_server_timing(self):
+        with self.assertLogs('rentals.timing', level='INFO') as logs:
+            r = APIClient().get(self.building_list_url)
+        self.assertEqual(r.status_code, 200)
+        header = r['Server-Timing']
+        for metric in ('db;dur=', 'serializer;dur=', 'render;dur=', 'view;dur=', 'total;dur='):
+            self.assertIn(metric, header)
+        self.assertIn('"queries":', logs.output[0])
+
+    @override_settings(RENTALS_REQUEST_TIMING=True, RENTALS_SLOW_REQUEST_MS=None)
+    def test_cached_page_reports_the_cache_lookup(self):
+        APIClient().get(self.building_list_url)
+        with self.assertLogs('rentals.timing', level='INFO'):
+            r = APIClient().get(self.building_list_url)
+        self.assertIn('page_cache;dur=', r['Server-Timing'])
+        self.assertNotIn('serializer;dur=', r['Server-Timing'])
+
+    @override_settings(RENTALS_REQUEST_TIMING=True, RENTALS_SLOW_REQUEST_MS=0)
+    def test_slow_request_dumps_sql(self):
+        with self.assertLogs('rentals.timing', level='WARNING') as logs:
+            APIClient().get(self.building_list_url)
+        self.assertTrue(any('Slow request' in line and 'SELECT' in line for line in logs.output))
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rentals import metrics
+from rentals.models import Building, BuildingChange, ProfileBuilding
+from rentals.tests.factories import make_building, make_district
+
+
+class OrphanCleanupTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.district = make_district("Orphan District")
+        self.agency = User.objects.create_user(username='agency', password='pass')
+        self.partner = User.objects.create_user(username='partner', password='pass')
+        self.owned = [self._building(self.agency) for _ in range(20)]
+        self.shared = self._building(self.agency, self.partner)
+        self.unowned = make_building(self.district, 'Imported')
+
+    def _building(self, *owners):
+        building = make_building(self.district, 'Listing')
+        for owner in owners:
+            ProfileBuilding.objects.create(profile=owner.profile, building=building)
+        return building
+
+    def _assert_cleaned_up(self):
+        owned_ids = [b.id for b in self.owned]
+        self.assertFalse(Building.objects.filter(id__in=owned_ids).exists())
+        self.assertTrue(Building.objects.filter(id=self.shared.id).exists())
+        self.assertTrue(Building.objects.filter(id=self.unowned.id).exists())
+        logged = BuildingChange.objects.filter(operation=BuildingChange.DELETE).values_list('building_id', flat=True)
+        self.assertEqual(sorted(logged), sorted(owned_ids))
+
+    def test_inline_cleanup_is_one_statement(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.agency.profile.delete()
+        self._assert_cleaned_up()
+        building_deletes = [q['sql'] for q in captured.captured_queries if q['sql'].lstrip().startswith('WITH deleted')]
+        self.assertEqual(len(building_deletes), 1)
+        self.assertFalse([q for q in captured.captured_queries if 'FROM "building"' in q['sql']])
+        self.assertEqual(metrics.snapshot()['counters']['orphans.deleted{mode=inline}'], 20)
+
+    def test_deleting_the_user_cleans_up_too(self):
+        self.agency.delete()
+        self._assert_cleaned_up()
+
+    @override_settings(RENTALS_ORPHAN_CLEANUP='deferred', RENTALS_ORPHAN_SWEEP_BATCH=7, RENTALS_JOBS_EAGER=True)
+    def test_deferred_cleanup_runs_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.agency.profile.delete()
+        # Nothing is removed until the delete has committed
+        self.assertEqual(Building.objects.filter(id__in=[b.id for b in self.owned]).count(), 20)
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+        self._assert_cleaned_up()
+        self.assertEqual(metrics.snapshot()['counters']['orphans.deleted{mode=deferred}'], 20)
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from rentals import metrics
+from rentals.api.v1 import page_cache
+from rentals.tests.factories import make_building, make_district
+
+
+class ListPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+        self.district = make_district("Page District")
+        self.building = make_building(self.district, 'First', rental_price=Decimal('1000.00'))
+        self.list_url = reverse('rentals:building-list-create')
+
+    def _counters(self):
+        return metrics.snapshot()['counters']
+
+    def test_equivalent_queries_share_one_entry(self):
+        first = self.client.get(self.list_url, {'district': self.district.name, 'price_min': '500'})
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            again = self.client.get(self.list_url + f'?price_min=500.0&page=1&page_size=5&format=json&district={self.district.name}')
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(self._counters()['page_cache.miss'], 1)
+        self.assertEqual(self._counters()['page_cache.hit'], 1)
+
+    def test_different_filters_miss(self):
+        self.client.get(self.list_url, {'price_min': '500'})
+        self.client.get(self.list_url, {'price_min': '600'})
+        self.assertEqual(self._counters()['page_cache.miss'], 2)
+
+    def test_building_changes_invalidate_every_page(self):
+        self.assertContains(self.client.get(self.list_url), 'First')
+        self.building.address = 'Renamed'
+        self.building.save()
+        r = self.client.get(self.list_url)
+        self.assertContains(r, 'Renamed')
+        self.assertNotIn('page_cache.hit', self._counters())
+
+    def test_browsable_api_is_not_cached(self):
+        self.client.get(self.list_url, {'format': 'api'})
+        self.assertNotIn('page_cache.miss', self._counters())
+
+
+class StampedeProtectionTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return b'page'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(page_cache.get_or_compute('k', compute)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [b'page'] * 5)
+        self.assertEqual(cache.get('k'), b'page')
+        self.assertEqual(metrics.snapshot()['counters']['singleflight.coalesced{flight=building_page,scope=process}'], 4)
+
+
+class PaginationLinkTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _request(self, query):
+        return Request(APIRequestFactory().get('/rentals/api/v1/buildings/' + query))
+
+    def test_links_follow_the_request_served(self):
+        url = 'http://testserver/rentals/api/v1/buildings/'
+        body = json.dumps({
+            'count': 12,
+            'next': url + '?page=3&price_min=500&utm=x',
+            'previous': url + '?price_min=500&utm=x',
+            'results': {'type': 'FeatureCollection', 'features': []},
+        }, separators=(',', ':')).encode()
+        self.assertEqual(page_cache.get_page(self._request('?price_min=500&utm=x&page=2'), 'k', lambda: body), body)
+
+        again = json.loads(page_cache.get_page(self._request('?page=2&price_min=500.0'), 'k', lambda: b''))
+        self.assertEqual(again['count'], 12)
+        self.assertEqual(again['next'], url + '?page=3&price_min=500.0')
+        self.assertEqual(again['previous'], url + '?price_min=500.0')
+        self.assertEqual(again['results'], {'type': 'FeatureCollection', 'features': []})
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rentals import metrics, versioning
+from rentals.poi_cache import local_cache, radius_bucket
+from rentals.models import Shops
+from rentals.tests.factories import make_building, make_district
+
+
+# The list page cache sits in front of the POI cache; every request here must reach it
+@override_settings(RENTALS_PAGE_CACHE_TIMEOUT=0)
+class NearbyPoiCacheTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        local_cache.clear()
+        cache.clear()
+        self.client = APIClient()
+        self.district = make_district("Cache District")
+        self.building = make_building(self.district, 'Cached', rental_price=Decimal('1000.00'))
+        # Roughly 44 m and 350 m east of the building
+        Shops.objects.create(name='Close', category='food', geometry=Point(-121.4995, 37.5, srid=4326))
+        Shops.objects.create(name='Further', category='food', geometry=Point(-121.496, 37.5, srid=4326))
+        self.list_url = reverse('rentals:building-list-create')
+
+    def _shops(self, radius):
+        r = self.client.get(self.list_url, {'poi_type': 'shops', 'poi_radius': str(radius)})
+        self.assertEqual(r.status_code, 200)
+        return [p['name'] for p in r.data['results']['features'][0]['properties']['nearby_pois']['shops']]
+
+    def _counters(self):
+        return metrics.snapshot()['counters']
+
+    def test_radius_buckets(self):
+        self.assertEqual(radius_bucket(100), 100)
+        self.assertEqual(radius_bucket(101), 250)
+        self.assertIsNone(radius_bucket(5001))
+
+    def test_repeat_request_is_served_from_memory(self):
+        self.assertEqual(self._shops(400), ['Close', 'Further'])
+        self.assertEqual(self._shops(400), ['Close', 'Further'])
+        self.assertEqual(self._counters()['poi_cache.miss'], 1)
+        self.assertEqual(self._counters()['poi_cache.hit{layer=memory}'], 1)
+
+    def test_smaller_radius_in_bucket_is_filtered_in_memory(self):
+        self.assertEqual(self._shops(450), ['Close', 'Further'])
+        self.assertEqual(self._shops(300), ['Close'])
+        self.assertEqual(self._counters()['poi_cache.miss'], 1)
+
+    def test_shared_cache_backs_the_local_lru(self):
+        self._shops(400)
+        local_cache.clear()
+        self.assertEqual(self._shops(400), ['Close', 'Further'])
+        self.assertEqual(self._counters()['poi_cache.hit{layer=shared}'], 1)
+
+    def test_moving_the_building_invalidates(self):
+        self._shops(400)
+        self.building.location = Point(-121.4999, 37.5, srid=4326)
+        self.building.save()
+        self._shops(400)
+        self.assertEqual(self._counters()['poi_cache.miss'], 2)
+
+    def test_poi_reload_invalidates(self):
+        self.assertEqual(self._shops(400), ['Close', 'Further'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Shops.objects.filter(name='Further').delete()
+            versioning.bump(versioning.POIS)
+        self.assertEqual(self._shops(400), ['Close'])
+        self.assertEqual(self._counters()['poi_cache.miss'], 2)
+
+    def test_only_validated_pairs_are_looked_up(self):
+        r = self.client.get(self.list_url, {'poi_type': ['shops', 'bogus'], 'poi_radius': ['400', '100']})
+        self.assertEqual(list(r.json()['results']['features'][0]['properties']['nearby_pois']), ['shops'])
+        self.assertEqual(self._counters()['poi_cache.miss'], 1)
+
+        for radius in ('nan', '-5'):
+            r = self.client.get(self.list_url, {'poi_type': 'shops', 'poi_radius': radius})
+            self.assertEqual(r.status_code, 200)
+            self.assertIsNone(r.json()['results']['features'][0]['properties']['nearby_pois'])
+        self.assertEqual(self._counters()['poi_cache.miss'], 1)
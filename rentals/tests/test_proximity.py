@@ -0,0 +1,119 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.gis.geos import LineString, MultiLineString, Point
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rentals import versioning
+from rentals.models import Building, BusStop, Route, Shops
+from rentals.proximity import refresh_nearest_pois
+from rentals.tests.factories import make_building, make_district
+
+
+class NearestPoiColumnTests(TestCase):
+    def setUp(self):
+        self.district = make_district("Nearest District")
+        # Roughly 88 m and 880 m east of (-121.5, 37.5)
+        self.close_stop = BusStop.objects.create(name='Close', geometry=Point(-121.499, 37.5, srid=4326))
+        self.far_stop = BusStop.objects.create(name='Far', geometry=Point(-121.49, 37.5, srid=4326))
+        self.shop = Shops.objects.create(name='Shop', category='food', geometry=Point(-121.5, 37.501, srid=4326))
+        self.route = Route.objects.create(route_name='1', headsign='Town', route_long_name='Route 1', geometry=MultiLineString(
+            LineString((-121.6, 37.49), (-121.4, 37.49), srid=4326), srid=4326))
+
+    def _building(self, address, lon, lat, price='1000.00'):
+        return make_building(self.district, address, lon, lat, rental_price=Decimal(price))
+
+    def test_save_fills_the_nearest_pois(self):
+        building = self._building('Near', -121.5, 37.5)
+        building.refresh_from_db()
+        self.assertEqual(building.nearest_stop_id, self.close_stop.pk)
+        self.assertAlmostEqual(building.nearest_stop_m, 88.5, delta=1)
+        self.assertEqual(building.nearest_shop_id, self.shop.pk)
+        self.assertAlmostEqual(building.nearest_shop_m, 111, delta=1)
+        self.assertEqual(building.nearest_route_id, self.route.pk)
+        self.assertAlmostEqual(building.nearest_route_m, 1110, delta=5)
+
+    def test_moving_a_building_updates_them(self):
+        building = self._building('Moving', -121.5, 37.5)
+        building.location = Point(-121.4905, 37.5, srid=4326)
+        building.save()
+        building.refresh_from_db()
+        self.assertEqual(building.nearest_stop_id, self.far_stop.pk)
+
+        building.location = Point(-121.5, 37.5, srid=4326)
+        building.save(update_fields=['location'])
+        building.refresh_from_db()
+        self.assertEqual(building.nearest_stop_id, self.close_stop.pk)
+
+    def test_saving_an_unmoved_building_skips_the_lookup(self):
+        building = self._building('Unmoved', -121.5, 37.5)
+        building.rental_price = Decimal('1100.00')
+        with CaptureQueriesContext(connection) as queries:
+            building.save()
+        self.assertFalse(any('<->' in query['sql'] for query in queries.captured_queries))
+        building.refresh_from_db()
+        self.assertEqual(building.nearest_stop_id, self.close_stop.pk)
+
+    def test_refresh_follows_reloaded_pois(self):
+        building = self._building('Refresh', -121.5, 37.5)
+        BusStop.objects.all().delete()
+        closer = BusStop.objects.create(name='Closer', geometry=Point(-121.5, 37.5001, srid=4326))
+        version = versioning.get_version(versioning.POIS)
+
+        self.assertEqual(refresh_nearest_pois(batch_size=1), 1)
+        building.refresh_from_db()
+        self.assertEqual(building.nearest_stop_id, closer.pk)
+        versioning._forget(versioning.POIS)
+        self.assertEqual(versioning.get_version(versioning.POIS), version + 1)
+        # Unchanged rows are not rewritten
+        self.assertEqual(refresh_nearest_pois([building.pk]), 0)
+
+    def test_without_pois_the_columns_are_null(self):
+        BusStop.objects.all().delete()
+        building = self._building('Lonely', -121.5, 37.5)
+        building.refresh_from_db()
+        self.assertIsNone(building.nearest_stop_id)
+        self.assertIsNone(building.nearest_stop_m)
+
+    def test_command_reports_updated_buildings(self):
+        building = self._building('Command', -121.5, 37.5)
+        Building.objects.filter(pk=building.pk).update(nearest_stop_id=None, nearest_stop_m=None)
+        out = StringIO()
+        call_command('refresh_nearest_pois', stdout=out)
+        self.assertIn('Updated the nearest POIs of 1 buildings', out.getvalue())
+
+
+class NearestPoiFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.district = make_district("Filter District")
+        BusStop.objects.create(name='Stop', geometry=Point(-121.5, 37.5, srid=4326))
+        # Roughly 440 m, 90 m and 880 m from the stop
+        for address, lon in (('Middle', -121.495), ('Near', -121.499), ('Far', -121.49)):
+            make_building(self.district, address, lon, rental_price=Decimal('1000.00'))
+        self.list_url = reverse('rentals:building-list-create')
+
+    def _addresses(self, params):
+        r = self.client.get(self.list_url, params)
+        self.assertEqual(r.status_code, 200)
+        return [feature['properties']['address'] for feature in r.json()['results']['features']]
+
+    def test_max_stop_distance(self):
+        self.assertEqual(sorted(self._addresses({'max_stop_distance': '500'})), ['Middle', 'Near'])
+
+    def test_ordering_by_distance(self):
+        self.assertEqual(self._addresses({'ordering': 'nearest_stop_m'}), ['Near', 'Middle', 'Far'])
+        self.assertEqual(self._addresses({'ordering': '-nearest_stop_m'}), ['Far', 'Middle', 'Near'])
+
+    def test_distances_are_in_the_response(self):
+        r = self.client.get(self.list_url, {'ordering': 'nearest_stop_m'})
+        properties = r.json()['results']['features'][0]['properties']
+        self.assertAlmostEqual(properties['nearest_stop_m'], 88.5, delta=1)
+        self.assertIsNone(properties['nearest_shop_m'])
@@ -0,0 +1,94 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rentals import metrics
+from rentals.api.v1.query_guard import heavy_query_slots
+from rentals.models import Shops
+from rentals.tests.factories import make_building, make_district
+
+
+# The list page cache sits in front of the guard; every request here must reach it
+@override_settings(RENTALS_PAGE_CACHE_TIMEOUT=0)
+class QueryGuardTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.client = APIClient()
+        self.district = make_district("Guard District")
+        make_building(self.district, 'Near', rental_price=Decimal('1000.00'))
+        Shops.objects.create(name='Shop', geometry=Point(-121.5005, 37.5, srid=4326))
+        self.list_url = reverse('rentals:building-list-create')
+        self.metrics_url = reverse('rentals:service-metrics')
+
+    def _counters(self):
+        return metrics.snapshot()['counters']
+
+    def test_radius_above_limit_is_rejected(self):
+        r = self.client.get(self.list_url, {'poi_type': 'route', 'poi_radius': '50000'})
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('route', r.data['error'])
+        self.assertEqual(self._counters()['query_guard.rejected{reason=radius_limit}'], 1)
+
+    @override_settings(RENTALS_POI_MAX_RADIUS={'shops': 100})
+    def test_partial_radius_override_keeps_the_other_defaults(self):
+        r = self.client.get(self.list_url, {'poi_type': 'route', 'poi_radius': '50000'})
+        self.assertEqual(r.status_code, 400)
+        r = self.client.get(self.list_url, {'poi_type': 'shops', 'poi_radius': '500'})
+        self.assertEqual(r.status_code, 400)
+        self.assertIn('100', r.data['error'])
+
+    @override_settings(RENTALS_POI_MAX_FILTERS=1)
+    def test_too_many_pairs_are_rejected(self):
+        r = self.client.get(self.list_url + '?poi_type=shops&poi_radius=100&poi_type=bus_stop&poi_radius=100')
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(self._counters()['query_guard.rejected{reason=pair_limit}'], 1)
+
+    @override_settings(RENTALS_MAX_QUERY_COST=1)
+    def test_query_above_cost_cap_is_rejected(self):
+        r = self.client.get(self.list_url, {'poi_type': 'shops', 'poi_radius': '100'})
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(self._counters()['query_guard.rejected{reason=cost_limit}'], 1)
+
+    def test_light_query_is_admitted(self):
+        r = self.client.get(self.list_url, {'poi_type': 'shops', 'poi_radius': '100'})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data['count'], 1)
+        self.assertEqual(self._counters()['query_guard.admitted{cost_class=light}'], 1)
+
+    @override_settings(RENTALS_HEAVY_QUERY_COST=0, RENTALS_HEAVY_QUERY_CONCURRENCY=1, RENTALS_HEAVY_QUERY_WAIT_SECONDS=0)
+    def test_heavy_queries_beyond_concurrency_get_503(self):
+        held = heavy_query_slots.acquire()
+        try:
+            r = self.client.get(self.list_url, {'poi_type': 'shops', 'poi_radius': '100'})
+        finally:
+            heavy_query_slots.release(held)
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(r['Retry-After'], '2')
+        self.assertEqual(self._counters()['query_guard.rejected{reason=concurrency_limit}'], 1)
+
+        # With the slot free again the query runs, and gives the slot back
+        r = self.client.get(self.list_url, {'poi_type': 'shops', 'poi_radius': '100'})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self._counters()['query_guard.admitted{cost_class=heavy}'], 1)
+        self.assertEqual(heavy_query_slots.in_flight, 0)
+
+    def test_queries_without_poi_filters_skip_the_guard(self):
+        r = self.client.get(self.list_url, {'district': self.district.name})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self._counters(), {})
+
+    def test_metrics_endpoint_is_admin_only(self):
+        self.client.get(self.list_url, {'poi_type': 'route', 'poi_radius': '50000'})
+        r = self.client.get(self.metrics_url)
+        self.assertIn(r.status_code, (401, 403))
+
+        admin = User.objects.create_superuser(username='admin', password='pass')
+        self.client.force_authenticate(admin)
+        r = self.client.get(self.metrics_url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data['counters']['query_guard.rejected{reason=radius_limit}'], 1)
+        self.assertEqual(r.data['gauges']['query_guard.heavy_in_flight'], 0)
@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+from django.contrib.gis.geos import Point, MultiPolygon
+from django.test import SimpleTestCase, TransactionTestCase
+
+from rentals import realtime
+from rentals.models import Building, District
+from rentals.tests.factories import polygon
+
+
+class StreamClient:
+    """Drives `realtime.sse_app` the way an ASGI server would."""
+
+    def __init__(self, query_string=b''):
+        self.scope = {'type': 'http', 'method': 'GET', 'path': '/rentals/api/v1/buildings/stream/',
+                      'query_string': query_string}
+        self.status = None
+        self.messages = asyncio.Queue()
+        self._disconnect = asyncio.Event()
+
+    async def _receive(self):
+        await self._disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def _send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif message.get('body'):
+            self.messages.put_nowait(message['body'])
+
+    def start(self):
+        self.task = asyncio.create_task(realtime.sse_app(self.scope, self._receive, self._send))
+
+    async def next_event(self, timeout=5):
+        """Return (event name, data) of the next SSE message, skipping pings."""
+        while True:
+            body = (await asyncio.wait_for(self.messages.get(), timeout)).decode()
+            fields = dict(line.split(': ', 1) for line in body.strip().split('\n') if not line.startswith(':'))
+            if 'event' in fields:
+                return fields['event'], json.loads(fields['data'])
+
+    async def close(self):
+        self._disconnect.set()
+        await asyncio.wait_for(self.task, 5)
+
+
+class SubscriberFilterTests(SimpleTestCase):
+    def test_parse_bbox(self):
+        self.assertEqual(realtime.parse_bbox('-122,37,-121,38'), (-122.0, 37.0, -121.0, 38.0))
+        for bad in ('1,2,3', 'a,b,c,d', '-121,37,-122,38'):
+            with self.assertRaises(ValueError):
+                realtime.parse_bbox(bad)
+
+    def test_matches_bbox_and_district(self):
+        subscriber = realtime.Subscriber(bbox=(-122.0, 37.0, -121.0, 38.0), district_id=1)
+        self.assertTrue(subscriber.matches({'op': 'upsert', 'district_id': 1, 'lon': -121.5, 'lat': 37.5}))
+        self.assertFalse(subscriber.matches({'op': 'upsert', 'district_id': 2, 'lon': -121.5, 'lat': 37.5}))
+        self.assertFalse(subscriber.matches({'op': 'upsert', 'district_id': 1, 'lon': -100.0, 'lat': 37.5}))
+
+    def test_building_moving_out_of_bbox_still_matches(self):
+        subscriber = realtime.Subscriber(bbox=(-122.0, 37.0, -121.0, 38.0))
+        event = {'op': 'upsert', 'district_id': 1, 'lon': -100.0, 'lat': 37.5,
+                 'prev': {'district_id': 1, 'lon': -121.5, 'lat': 37.5}}
+        self.assertTrue(subscriber.matches(event))
+
+    async def test_slow_subscriber_is_told_to_resync(self):
+        subscriber = realtime.Subscriber()
+        for i in range(realtime.SUBSCRIBER_QUEUE_SIZE + 1):
+            subscriber.push(b'event: upsert\n\n')
+        self.assertEqual(subscriber.queue.qsize(), 1)
+        self.assertEqual(subscriber.queue.get_nowait(), realtime.RESYNC)
+
+    async def test_invalid_bbox_is_rejected(self):
+        client = StreamClient(b'bbox=1,2,3')
+        client.start()
+        await client.task
+        self.assertEqual(client.status, 400)
+
+
+class BuildingStreamTests(TransactionTestCase):
+    """End to end against PostgreSQL: the trigger NOTIFYs, the broker LISTENs."""
+
+    async def test_building_changes_are_streamed(self):
+        district = await District.objects.acreate(name="Stream District", county="Test County",
+                                                  geometry=MultiPolygon(polygon, srid=4326))
+        everything = StreamClient()
+        filtered = StreamClient(b'bbox=-121.6,37.4,-121.4,37.6')
+        everything.start()
+        filtered.start()
+        try:
+            self.assertEqual((await everything.next_event())[0], 'ready')
+            self.assertEqual((await filtered.next_event())[0], 'ready')
+
+            outside = await Building.objects.acreate(address='Outside', location=Point(-121.9, 37.9, srid=4326),
+                                                     district=district)
+            inside = await Building.objects.acreate(address='Inside', location=Point(-121.5, 37.5, srid=4326),
+                                                    district=district)
+            inside_id = inside.id
+            await inside.adelete()
+
+            received = [await everything.next_event() for _ in range(3)]
+            self.assertEqual([(e, d['id']) for e, d in received],
+                             [('upsert', outside.id), ('upsert', inside_id), ('delete', inside_id)])
+            self.assertEqual(received[0][1]['district_id'], district.id)
+
+            event, data = await filtered.next_event()
+            self.assertEqual((event, data['id']), ('upsert', inside_id))
+            self.assertEqual((await filtered.next_event())[0], 'delete')
+        finally:
+            await everything.close()
+            await filtered.close()
+        self.assertEqual(realtime.broker.subscribers, set())
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from rentals import metrics, singleflight
+
+
+def _flight_key(key, suffix):
+    return f"rentals:flight:{hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()}:{suffix}"
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def _counters(self):
+        return metrics.snapshot()['counters']
+
+    def _in_threads(self, count, target):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_callers_share_one_call(self):
+        calls, results = [], []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'rows': 3}
+
+        self._in_threads(4, lambda: results.append(singleflight.coalesce('layer', compute, name='layer')))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'rows': 3}] * 4)
+        self.assertEqual(self._counters()['singleflight.executed{flight=layer}'], 1)
+        self.assertEqual(self._counters()['singleflight.coalesced{flight=layer,scope=process}'], 3)
+
+    def test_sequential_calls_are_not_shared(self):
+        self.assertEqual(singleflight.coalesce('k', lambda: 1), 1)
+        self.assertEqual(singleflight.coalesce('k', lambda: 2), 2)
+
+    def test_waiters_get_the_leaders_exception(self):
+        errors = []
+
+        def failing():
+            time.sleep(0.2)
+            raise ValueError('boom')
+
+        def call():
+            try:
+                singleflight.coalesce('k', failing)
+            except ValueError as e:
+                errors.append(str(e))
+
+        self._in_threads(3, call)
+        self.assertEqual(errors, ['boom'] * 3)
+        self.assertEqual(self._counters()['singleflight.executed{flight=default}'], 1)
+
+    def test_shared_waits_for_another_workers_result(self):
+        # Another worker holds the lock and publishes its result shortly after
+        cache.add(_flight_key('k', 'lock'), 1, 5)
+
+        def publish():
+            time.sleep(0.1)
+            cache.set(_flight_key('k', 'result'), ('theirs',), 5)
+            cache.delete(_flight_key('k', 'lock'))
+
+        threading.Thread(target=publish).start()
+        self.assertEqual(singleflight.coalesce('k', lambda: 'ours', shared=True), 'theirs')
+        self.assertEqual(self._counters()['singleflight.coalesced{flight=default,scope=shared}'], 1)
+
+    def test_shared_computes_when_the_other_worker_fails(self):
+        cache.add(_flight_key('k', 'lock'), 1, 5)
+        threading.Timer(0.1, lambda: cache.delete(_flight_key('k', 'lock'))).start()
+        self.assertEqual(singleflight.coalesce('k', lambda: 'ours', shared=True), 'ours')
+        self.assertEqual(self._counters()['singleflight.executed{flight=default}'], 1)
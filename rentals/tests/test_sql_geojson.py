@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import Point
+
+from rentals.models import Building
+from rentals.tests.factories import make_district
+
+User = get_user_model()
+
+
+# Both rendering paths must run; the list page cache would answer the second request
+@override_settings(RENTALS_PAGE_CACHE_TIMEOUT=0)
+class SqlGeoJSONRenderingTests(TestCase):
+    """The PostgreSQL rendering path must be byte-identical to the DRF serializer path."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='geo', email='geo@example.com', password='StrongP@ss1')
+        self.district = make_district("Kilimani \"Central\"", county="Nairobi")
+        buildings = [
+            Building.objects.create(
+                title='Café ü "quoted"\nline', address='Addr\t1', location=Point(-121.5, 37.5, srid=4326),
+                district=self.district, rental_price=Decimal('1200.00'), square_meters=Decimal('54.50'),
+                num_bedrooms=2, num_bathrooms=1, amenities=['wifi', 'parking'], owner_contact='oc',
+                image='buildings/2026/02/17/a.jpg',
+            ),
+            Building.objects.create(
+                address=None, location=Point(-121.123456789, 37.987654321, srid=4326), district=self.district,
+                rental_price=Decimal('99999999.99'), amenities={'floors': 3, 'ratio': 1.25, 'tags': ['a', None, True]},
+            ),
+            Building.objects.create(
+                location=Point(-121.0, 37.0, srid=4326), district=self.district, rental_price=None, amenities=None,
+            ),
+        ]
+        for b in buildings:
+            b.profiles.add(self.user.profile)
+        self.building = buildings[0]
+
+    def assertSameBytes(self, url, params=None, client=None):
+        client = client or self.client
+        fast = client.get(url, params or {})
+        with override_settings(RENTALS_SQL_GEOJSON=False):
+            reference = client.get(url, params or {})
+        self.assertEqual(fast.status_code, reference.status_code)
+        self.assertEqual(fast['Content-Type'], reference['Content-Type'])
+        self.assertEqual(fast.content, reference.content)
+
+    def test_building_list_pages(self):
+        url = reverse('rentals:building-list-create')
+        self.assertSameBytes(url)
+        self.assertSameBytes(url, {'page_size': 2, 'page': 2})
+        self.assertSameBytes(url, {'district': self.district.name, 'price_min': '1000'})
+
+    def test_building_detail(self):
+        url = reverse('rentals:building-detail', kwargs={'pk': self.building.pk})
+        self.assertSameBytes(url, {'geojson': 'true'})
+        missing = reverse('rentals:building-detail', kwargs={'pk': 999999})
+        self.assertSameBytes(missing, {'geojson': 'true'})
+
+    def test_user_buildings(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertSameBytes(reverse('rentals:user-buildings', kwargs={'pk': self.user.pk}), client=client)
+        self.assertSameBytes(reverse('rentals:user-buildings-me'), client=client)
@@ -0,0 +1,109 @@
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.gis.geos import LineString, MultiLineString, Point
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from rentals import metrics, versioning
+from rentals.models import BusStop, Route, StopRoute
+from rentals.tests.factories import make_building, make_district, square
+from rentals.transit import TransitGraph, forget_transit_graph, origin_cell, rebuild_stop_routes
+
+
+class TransitGraphTests(SimpleTestCase):
+    def setUp(self):
+        # Route 1 links stops 10-20, route 2 stops 20-30, route 3 stops 30-40; stop 50 is unserved.
+        # The links to stop 99 and route 7 point at deleted rows.
+        self.graph = TransitGraph(
+            stop_ids=np.array([10, 20, 30, 40, 50]),
+            stop_coordinates=np.array([[36.80, -1.28], [36.81, -1.28], [36.82, -1.28], [36.83, -1.28], [36.90, -1.30]]),
+            route_ids=np.array([1, 2, 3]),
+            links=np.array([[10, 1], [20, 1], [20, 2], [30, 2], [30, 3], [40, 3], [99, 3], [10, 7]]),
+        )
+
+    def test_each_transfer_adds_one_ride(self):
+        expected = [([10, 20], [1]), ([10, 20, 30], [1, 2]), ([10, 20, 30, 40], [1, 2, 3])]
+        for max_transfers, (stops, routes) in enumerate(expected):
+            with self.subTest(max_transfers=max_transfers):
+                reached_stops, reached_routes = self.graph.reachable([0], max_transfers)
+                self.assertEqual(reached_stops.tolist(), stops)
+                self.assertEqual(reached_routes.tolist(), routes)
+
+    def test_multiple_origins(self):
+        reached_stops, _ = self.graph.reachable([0, 4], 0)
+        self.assertEqual(reached_stops.tolist(), [10, 20, 50])
+
+    def test_stops_near(self):
+        self.assertEqual(self.graph.stops_near(36.80, -1.28, 500).tolist(), [0])
+        self.assertEqual(self.graph.stops_near(36.805, -1.28, 600).tolist(), [0, 1])
+
+    def test_empty_graph(self):
+        graph = TransitGraph(np.array([], dtype=np.int64), np.empty((0, 2)), np.array([], dtype=np.int64),
+                             np.array([], dtype=np.int64))
+        self.assertEqual(graph.reachable([], 2)[0].tolist(), [])
+        self.assertEqual(graph.stops_near(36.8, -1.28, 500).tolist(), [])
+
+
+class OriginCellTests(SimpleTestCase):
+    def test_nearby_origins_share_a_cell(self):
+        first = origin_cell(QueryDict('reachable_from=-1.2801,36.8001&max_transfers=1'))
+        second = origin_cell(QueryDict('reachable_from=-1.2809,36.8009&max_transfers=1'))
+        self.assertEqual(first, second)
+        self.assertEqual(first[2], 1)
+
+    def test_invalid_origins_are_ignored(self):
+        for query in ('', 'reachable_from=abc', 'reachable_from=95,36.8', 'reachable_from=-1.28,36.8&max_transfers=x'):
+            with self.subTest(query):
+                self.assertIsNone(origin_cell(QueryDict(query)))
+
+    def test_transfers_are_capped(self):
+        self.assertEqual(origin_cell(QueryDict('reachable_from=-1.28,36.8&max_transfers=99'))[2], 3)
+
+
+class ReachabilityFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        versioning._forget(versioning.POIS)
+        forget_transit_graph()
+        self.client = APIClient()
+        district = make_district("Transit District", square(36.0, -2.0))
+        stops = [BusStop.objects.create(name=f'Stop {i}', geometry=Point(36.80 + i * 0.02, -1.28, srid=4326))
+                 for i in range(3)]
+        # Route A serves stops 0 and 1, route B stops 1 and 2
+        for name, (start, end) in (('A', (0, 1)), ('B', (1, 2))):
+            Route.objects.create(route_name=name, headsign=name, route_long_name=f'Route {name}', geometry=MultiLineString(
+                LineString(stops[start].geometry, stops[end].geometry, srid=4326), srid=4326))
+        self.links = rebuild_stop_routes()
+        for i, stop in enumerate(stops):
+            make_building(district, f'By stop {i}', stop.geometry.x, -1.2805, rental_price=Decimal('1000.00'))
+        self.list_url = reverse('rentals:building-list-create')
+
+    def _addresses(self, params):
+        r = self.client.get(self.list_url, {**params, 'page_size': 20})
+        self.assertEqual(r.status_code, 200)
+        return sorted(feature['properties']['address'] for feature in r.json()['results']['features'])
+
+    def test_stops_are_linked_to_the_routes_through_them(self):
+        self.assertEqual(self.links, 4)
+        self.assertEqual(sorted(StopRoute.objects.filter(route__route_name='B').values_list('stop__name', flat=True)),
+                         ['Stop 1', 'Stop 2'])
+
+    def test_reachable_from(self):
+        self.assertEqual(self._addresses({'reachable_from': '-1.28,36.80'}), ['By stop 0', 'By stop 1'])
+        self.assertEqual(self._addresses({'reachable_from': '-1.28,36.80', 'max_transfers': '1'}),
+                         ['By stop 0', 'By stop 1', 'By stop 2'])
+        self.assertEqual(self._addresses({'reachable_from': '-1.5,36.5'}), [])
+
+    @override_settings(RENTALS_PAGE_CACHE_TIMEOUT=0)
+    def test_reachable_stops_are_cached_per_cell(self):
+        self._addresses({'reachable_from': '-1.2801,36.8001'})
+        self._addresses({'reachable_from': '-1.2802,36.8002'})
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters['transit.reach_cache{result=miss}'], 1)
+        self.assertEqual(counters['transit.reach_cache{result=hit}'], 1)
+        self.assertEqual(counters['transit.graph_builds'], 1)
@@ -0,0 +1,206 @@
+"""Transit reachability over matatu stops and routes.
+
+Stops and routes are separate geometry layers; `rebuild_stop_routes()`
+links them in the StopRoute table, one row per stop lying within
+`RENTALS_TRANSIT_SNAP_METRES` of a route. The stop and route loaders call
+it after every load.
+
+`TransitGraph` holds that bipartite stop/route graph in CSR form (offset
+and index arrays, one pair per direction). `reachable(origins,
+max_transfers)` runs a multi-source BFS from a set of stops: the first
+ride reaches every stop on a route serving an origin stop, and each
+transfer repeats that from the stops reached so far. The graph is
+memoised per process for the current `pois` dataset version, which the
+loaders bump.
+
+The building list filter `reachable_from=lat,lon&max_transfers=1` asks for
+the stops reachable from a point: origins are the stops within
+`RENTALS_TRANSIT_WALK_METRES` of it, and buildings match when their
+precomputed nearest stop (rentals/proximity.py) is reachable and within
+the same walk. Points are snapped to a grid of `RENTALS_TRANSIT_CELL_DEGREES`
+cells and the reachable stops are cached per (cell, transfers), so nearby
+origins share one BFS and one cache entry.
+"""
+import math
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from rentals import metrics, singleflight, versioning
+from rentals.models import BusStop, Route, StopRoute
+
+EARTH_RADIUS_M = 6371008.8
+
+DEFAULT_MAX_TRANSFERS = 3
+
+REBUILD_SQL = f"""
+INSERT INTO {StopRoute._meta.db_table} (stop_id, route_id, distance_m)
+SELECT s.id, r.id, ST_Distance(s.geometry, r.geometry)
+FROM {BusStop._meta.db_table} s
+JOIN {Route._meta.db_table} r ON ST_DWithin(s.geometry, r.geometry, %s)
+"""
+
+
+def rebuild_stop_routes():
+    """Relink every stop to the routes passing within the snapping tolerance; return the link count."""
+    StopRoute.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL, [getattr(settings, 'RENTALS_TRANSIT_SNAP_METRES', 30)])
+        return cursor.rowcount
+
+
+def _csr(sources, targets, size):
+    """(offsets, index) adjacency of `size` nodes from parallel source/target position arrays."""
+    order = np.argsort(sources, kind='stable')
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=size), out=offsets[1:])
+    return offsets, targets[order]
+
+
+def _neighbours(offsets, index, nodes):
+    """Distinct neighbours of `nodes`, gathered without a Python loop."""
+    starts = offsets[nodes]
+    lengths = offsets[nodes + 1] - starts
+    total = int(lengths.sum())
+    if not total:
+        return np.empty(0, dtype=index.dtype)
+    # Position k of the output reads index[starts[i] + (k - first output position of node i)]
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.unique(index[shifts + np.arange(total)])
+
+
+class TransitGraph:
+    """Bipartite stop/route graph as CSR arrays, with stop coordinates for origin lookups."""
+
+    def __init__(self, stop_ids, stop_coordinates, route_ids, links, version=0):
+        """`stop_ids` and `route_ids` sorted; `links` is an (n, 2) array of (stop id, route id)."""
+        self.stop_ids = stop_ids
+        self.stop_coordinates = stop_coordinates
+        self.route_ids = route_ids
+        self.version = version
+        links = links.reshape(-1, 2)
+        # Links to stops or routes deleted since are dropped
+        stop_positions = np.searchsorted(stop_ids, links[:, 0])
+        route_positions = np.searchsorted(route_ids, links[:, 1])
+        known = ((stop_positions < len(stop_ids)) & (route_positions < len(route_ids)))
+        known[known] &= ((stop_ids[stop_positions[known]] == links[known, 0])
+                         & (route_ids[route_positions[known]] == links[known, 1]))
+        stop_positions, route_positions = stop_positions[known], route_positions[known]
+        self.stop_routes = _csr(stop_positions, route_positions, len(stop_ids))
+        self.route_stops = _csr(route_positions, stop_positions, len(route_ids))
+
+    @classmethod
+    def load(cls, version=0):
+        table = BusStop._meta.db_table
+        stops = list(BusStop.objects.annotate(
+            lon=RawSQL(f'ST_X({table}.geometry::geometry)', ()),
+            lat=RawSQL(f'ST_Y({table}.geometry::geometry)', ()),
+        ).order_by('id').values_list('id', 'lon', 'lat'))
+        links = list(StopRoute.objects.values_list('stop_id', 'route_id'))
+        return cls(
+            stop_ids=np.array([stop[0] for stop in stops], dtype=np.int64),
+            stop_coordinates=np.array([stop[1:] for stop in stops], dtype=np.float64).reshape(-1, 2),
+            route_ids=np.unique(np.array([link[1] for link in links], dtype=np.int64)),
+            links=np.array(links, dtype=np.int64),
+            version=version,
+        )
+
+    def stops_near(self, lon, lat, radius_m):
+        """Positions of the stops within `radius_m` of (lon, lat)."""
+        if not len(self.stop_ids):
+            return np.empty(0, dtype=np.intp)
+        lon1, lat1 = np.radians(self.stop_coordinates[:, 0]), np.radians(self.stop_coordinates[:, 1])
+        lon2, lat2 = math.radians(lon), math.radians(lat)
+        a = np.sin((lat1 - lat2) / 2) ** 2 + np.cos(lat1) * math.cos(lat2) * np.sin((lon1 - lon2) / 2) ** 2
+        return np.flatnonzero(2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a)) <= radius_m)
+
+    def reachable(self, origins, max_transfers):
+        """(stop ids, route ids) reachable from the stop positions `origins` with at most `max_transfers`."""
+        stop_seen = np.zeros(len(self.stop_ids), dtype=bool)
+        route_seen = np.zeros(len(self.route_ids), dtype=bool)
+        frontier = np.unique(np.asarray(origins, dtype=np.intp))
+        stop_seen[frontier] = True
+        for _ in range(max_transfers + 1):
+            routes = _neighbours(*self.stop_routes, frontier)
+            routes = routes[~route_seen[routes]]
+            if not len(routes):
+                break
+            route_seen[routes] = True
+            stops = _neighbours(*self.route_stops, routes)
+            frontier = stops[~stop_seen[stops]]
+            stop_seen[frontier] = True
+        return self.stop_ids[stop_seen], self.route_ids[route_seen]
+
+
+_graph_lock = threading.Lock()
+_graph = None
+
+
+def transit_graph():
+    """The TransitGraph of the current `pois` dataset version."""
+    global _graph
+    version = versioning.get_version(versioning.POIS)
+    with _graph_lock:
+        graph = _graph
+    if graph is not None and graph.version == version:
+        return graph
+
+    def build():
+        metrics.increment('transit.graph_builds')
+        return TransitGraph.load(version)
+
+    graph = singleflight.coalesce(('transit_graph', version), build, name='transit_graph')
+    with _graph_lock:
+        _graph = graph
+    return graph
+
+
+def forget_transit_graph():
+    global _graph
+    with _graph_lock:
+        _graph = None
+
+
+def origin_cell(query_params):
+    """(cell row, cell column, max transfers) of the `reachable_from` filter, or None when absent or invalid.
+
+    `reachable_from` is "lat,lon", like building locations.
+    """
+    value = (query_params.get('reachable_from') or '').strip()
+    if not value:
+        return None
+    try:
+        lat, lon = (float(part) for part in value.split(','))
+        max_transfers = int(query_params.get('max_transfers') or 0)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    max_transfers = min(max(max_transfers, 0),
+                        getattr(settings, 'RENTALS_TRANSIT_MAX_TRANSFERS', DEFAULT_MAX_TRANSFERS))
+    size = getattr(settings, 'RENTALS_TRANSIT_CELL_DEGREES', 0.002)
+    return math.floor(lat / size), math.floor(lon / size), max_transfers
+
+
+def reachable_stop_ids(cell):
+    """Ids of the stops reachable from the centre of `cell` (see origin_cell)."""
+    row, column, max_transfers = cell
+    size = getattr(settings, 'RENTALS_TRANSIT_CELL_DEGREES', 0.002)
+    version = versioning.get_version(versioning.POIS)
+    key = f'rentals:reach:{version}:{size}:{row}:{column}:{max_transfers}'
+    stop_ids = cache.get(key)
+    if stop_ids is not None:
+        metrics.increment('transit.reach_cache', result='hit')
+        return stop_ids
+    metrics.increment('transit.reach_cache', result='miss')
+
+    graph = transit_graph()
+    lat, lon = (row + 0.5) * size, (column + 0.5) * size
+    origins = graph.stops_near(lon, lat, getattr(settings, 'RENTALS_TRANSIT_WALK_METRES', 500))
+    stop_ids = graph.reachable(origins, max_transfers)[0].tolist()
+    cache.set(key, stop_ids, getattr(settings, 'RENTALS_TRANSIT_CACHE_TIMEOUT', 60 * 60 * 24))
+    return stop_ids
@@ -0,0 +1,48 @@
+"""Dataset versions used to invalidate caches derived from reloadable data.
+
+Loaders call `bump()` when they replace a dataset; cache keys embed
+`get_version()`, so entries built from the old data are never read again
+and simply age out. Versions are memoised per process for
+`RENTALS_DATASET_VERSION_TTL` seconds to keep the lookup off the hot path;
+other workers therefore see a bump within that window.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from rentals.models import DatasetVersion
+
+# Dataset names
+POIS = 'pois'
+DISTRICTS = 'districts'
+
+_lock = threading.Lock()
+_memo = {}
+
+
+def get_version(name):
+    ttl = getattr(settings, 'RENTALS_DATASET_VERSION_TTL', 1.0)
+    now = time.monotonic()
+    with _lock:
+        cached = _memo.get(name)
+    if cached is not None and now - cached[1] < ttl:
+        return cached[0]
+    version = DatasetVersion.objects.filter(name=name).values_list('version', flat=True).first() or 0
+    with _lock:
+        _memo[name] = (version, now)
+    return version
+
+
+def _forget(name):
+    with _lock:
+        _memo.pop(name, None)
+
+
+def bump(name):
+    """Increment the version of `name`; readers see it once the transaction commits."""
+    DatasetVersion.objects.get_or_create(name=name)
+    DatasetVersion.objects.filter(name=name).update(version=F('version') + 1)
+    transaction.on_commit(lambda: _forget(name))
@@ -1,10 +1,18 @@
+from django.conf import settings
 from django.shortcuts import render
 from .models import District
 
 def rental_listings(request):
-	"""Render the rental listings page."""
+	"""Render the rental listings page.
+
+	`districts` is lazy: it is only queried when the cached district
+	options fragment has to be rendered again.
+	"""
 	districts = District.objects.order_by('name').only('name', 'id')
-	return render(request, 'rentals/map.html', {'districts': districts})
+	return render(request, 'rentals/map.html', {
+		'districts': districts,
+		'fragment_timeout': settings.RENTALS_FRAGMENT_CACHE_TIMEOUT,
+	})
 
 
 def register_user(request):
@@ -32,4 +40,8 @@ def logout_user(request):
 def user_account(request):
 	"""Render the user account page."""
 	districts = District.objects.order_by('name').values_list('name', flat=True)
-	return render(request, 'rentals/account.html', {'user': request.user, 'districts': districts})
\ No newline at end of file
+	return render(request, 'rentals/account.html', {
+		'user': request.user,
+		'districts': districts,
+		'fragment_timeout': settings.RENTALS_FRAGMENT_CACHE_TIMEOUT,
+	})
\ No newline at end of file
@@ -9,8 +9,20 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rentals_root.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up; streams bypass the Django request cycle
+from rentals.realtime import sse_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Serve the building change stream directly, everything else through Django."""
+    if scope['type'] == 'http' and scope['path'] == settings.RENTALS_SSE_PATH:
+        await sse_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -47,6 +47,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'rentals.middleware.RequestTimingMiddleware',
+    'rentals.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'csp.middleware.CSPMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -57,6 +59,40 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Negotiated compression of API responses (rentals.middleware.CompressionMiddleware).
+# Encodings in server preference order (zstd/br are skipped when their package is missing)
+# and the level each is compressed at; bodies under RENTALS_COMPRESS_MIN_SIZE bytes are sent as is.
+RENTALS_COMPRESSION_ENCODINGS = os.getenv('RENTALS_COMPRESSION_ENCODINGS', 'zstd,br,gzip').split(',')
+RENTALS_COMPRESSION_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+RENTALS_COMPRESS_MIN_SIZE = 1024
+RENTALS_COMPRESS_PATHS = ('/rentals/api/',)
+# Compressed bodies of cacheable responses (ETag or public max-age) kept in-process, and the largest kept
+RENTALS_COMPRESS_CACHE_SIZE = 32
+RENTALS_COMPRESS_CACHE_MAX_BYTES = 2 * 1024 * 1024
+
+# Per-request SQL/latency instrumentation (Server-Timing header + structured log).
+# Off by default; the middleware removes itself from the chain when disabled.
+RENTALS_REQUEST_TIMING = os.getenv('RENTALS_REQUEST_TIMING', 'False') == 'True'
+# Requests slower than this (milliseconds) log every captured SQL statement
+RENTALS_SLOW_REQUEST_MS = float(os.getenv('RENTALS_SLOW_REQUEST_MS', '1000'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'rentals.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 # Security settings for production
 # These help mitigate XSS attacks even with tokens in sessionStorage
 SECURE_BROWSER_XSS_FILTER = True
@@ -142,6 +178,22 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Content-hashed static file names plus .br/.gz variants, written by collectstatic
+# (rentals/storage.py). Defaults to on when DEBUG is off; needs collectstatic before serving.
+RENTALS_HASHED_STATIC = os.getenv('RENTALS_HASHED_STATIC', str(not DEBUG)) == 'True'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'rentals.storage.PrecompressedManifestStaticFilesStorage' if RENTALS_HASHED_STATIC
+        else 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+# Let Django serve STATIC_ROOT itself (rentals/staticfiles.py) when no web server fronts it.
+# Hashed files are sent with Cache-Control max-age=RENTALS_STATIC_MAX_AGE, immutable.
+RENTALS_SERVE_STATIC = os.getenv('RENTALS_SERVE_STATIC', 'False') == 'True'
+RENTALS_STATIC_MAX_AGE = 60 * 60 * 24 * 365
 
 # Media (user-uploaded files)
 MEDIA_URL = '/media/'
@@ -158,11 +210,117 @@ SERIALIZATION_MODULES = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rentals.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
 }
 
+# Render read-only building GeoJSON responses in PostgreSQL (rentals/api/v1/sql_geojson.py)
+# instead of through the DRF serializer. The output is byte-identical either way.
+RENTALS_SQL_GEOJSON = True
+
+# Days of building change-log history kept for delta sync (/api/v1/buildings/changes/).
+# Older version tokens get 410 Gone; prune with `manage.py prune_building_changes`.
+RENTALS_CHANGELOG_RETENTION_DAYS = 30
+
+# Building list/detail/export responses carry ETag and Last-Modified (rentals/api/v1/conditional.py)
+# and may be reused for this many seconds before they must be revalidated (304 when unchanged).
+RENTALS_API_CACHE_MAX_AGE = 0
+
+# Server-Sent Events stream of building changes, served by rentals_root/asgi.py
+# (run under an ASGI server such as uvicorn or daphne; not available on runserver).
+RENTALS_SSE_PATH = '/rentals/api/v1/buildings/stream/'
+# Seconds between keep-alive comments on idle streams
+RENTALS_SSE_HEARTBEAT_SECONDS = 15
+# Open streams allowed per worker process before new ones get 503
+RENTALS_SSE_MAX_SUBSCRIBERS = 10000
+
+# Admission control for proximity (poi_type/poi_radius) searches, see rentals/api/v1/query_guard.py.
+# Radii above the per-type maximum or more than RENTALS_POI_MAX_FILTERS pairs get 400.
+RENTALS_POI_MAX_FILTERS = 3
+RENTALS_POI_MAX_RADIUS = {'shops': 5000, 'bus_stop': 5000, 'route': 2000}
+# Estimated cost = max(EXPLAIN total cost, sum of radius_m * per-metre weight of the POI type)
+RENTALS_POI_COST_PER_METRE = {'shops': 20, 'bus_stop': 20, 'route': 200}
+# Queries above RENTALS_MAX_QUERY_COST are refused (400); above RENTALS_HEAVY_QUERY_COST they need
+# one of RENTALS_HEAVY_QUERY_CONCURRENCY slots per worker, else 503 with Retry-After.
+RENTALS_MAX_QUERY_COST = 5000000
+RENTALS_HEAVY_QUERY_COST = 100000
+RENTALS_HEAVY_QUERY_CONCURRENCY = int(os.getenv('RENTALS_HEAVY_QUERY_CONCURRENCY', 4))
+RENTALS_HEAVY_QUERY_WAIT_SECONDS = 0.5
+RENTALS_HEAVY_QUERY_RETRY_AFTER = 2
+
+# Nearby-POI cache (rentals/poi_cache.py): per-process LRU size in front of the default Django
+# cache, and how long entries live there. Configure CACHES with a shared backend (e.g. Redis)
+# to share entries between workers. Dataset versions are re-read at most every
+# RENTALS_DATASET_VERSION_TTL seconds per process.
+RENTALS_POI_CACHE_LRU_SIZE = 4096
+RENTALS_POI_CACHE_TIMEOUT = 60 * 60 * 24
+RENTALS_DATASET_VERSION_TTL = 1.0
+
+# Most rings one /buildings/<pk>/accessibility/ request may ask for (rentals/api/v1/accessibility.py);
+# the largest ring is capped by the smallest RENTALS_POI_MAX_RADIUS.
+RENTALS_ACCESSIBILITY_MAX_RINGS = 5
+
+# Comparable listings (rentals/comparables.py): how many nearest available buildings the KNN query
+# hands to the numpy re-ranking, the weights of each difference in the cost, and the minimum age in
+# seconds of the in-memory attribute index before a building change triggers a rebuild.
+RENTALS_SIMILAR_CANDIDATES = 200
+RENTALS_SIMILAR_WEIGHTS = {
+    'rental_price': 3.0, 'num_bedrooms': 1.0, 'num_bathrooms': 0.5, 'square_meters': 1.0,
+    'amenities': 1.0, 'distance': 1.0,
+}
+RENTALS_SIMILAR_INDEX_MIN_AGE = 1.0
+
+# Transit reachability (rentals/transit.py). Stops within RENTALS_TRANSIT_SNAP_METRES of a route are
+# served by it. `reachable_from` origins are snapped to RENTALS_TRANSIT_CELL_DEGREES grid cells, board
+# at stops within RENTALS_TRANSIT_WALK_METRES, and buildings match when their nearest stop is reachable
+# and that close. Reachable stops are cached per cell for RENTALS_TRANSIT_CACHE_TIMEOUT seconds.
+RENTALS_TRANSIT_SNAP_METRES = 30
+RENTALS_TRANSIT_CELL_DEGREES = 0.002
+RENTALS_TRANSIT_WALK_METRES = 500
+RENTALS_TRANSIT_MAX_TRANSFERS = 3
+RENTALS_TRANSIT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Area search (rentals/api/v1/area_search.py). Posted polygons may have at most
+# RENTALS_AREA_MAX_INPUT_VERTICES coordinates; they are simplified from RENTALS_AREA_SIMPLIFY_TOLERANCE
+# degrees (about 5 m) upwards until they have at most RENTALS_AREA_MAX_VERTICES vertices.
+RENTALS_AREA_MAX_INPUT_VERTICES = 10000
+RENTALS_AREA_MAX_VERTICES = 500
+RENTALS_AREA_SIMPLIFY_TOLERANCE = 0.00005
+
+# Rendered building list pages (rentals/api/v1/page_cache.py), keyed by the canonical filters and
+# the building/POI/district versions; 0 disables.
+RENTALS_PAGE_CACHE_TIMEOUT = 300
+
+# Request coalescing for expensive reads (rentals/singleflight.py). Concurrent identical requests in
+# a worker always share one computation; with RENTALS_SINGLEFLIGHT_SHARED (needs a shared CACHES
+# backend) workers also wait up to RENTALS_SINGLEFLIGHT_WAIT seconds for each other, and the result
+# is published for RENTALS_SINGLEFLIGHT_RESULT_TTL seconds. List pages always coordinate this way.
+RENTALS_SINGLEFLIGHT_SHARED = os.getenv('RENTALS_SINGLEFLIGHT_SHARED', 'False') == 'True'
+RENTALS_SINGLEFLIGHT_WAIT = 5.0
+RENTALS_SINGLEFLIGHT_RESULT_TTL = 5
+
+# Buildings per UPDATE when `refresh_nearest_pois` recomputes the nearest stop/shop/route columns
+# of the whole table (rentals/proximity.py); each batch commits on its own.
+RENTALS_NEAREST_POI_BATCH_SIZE = 5000
+
+# Seconds a user's authentication snapshot (active/staff flags, profile id) stays cached
+# (rentals/authentication.py). Saves to User/Profile drop it immediately in the same process,
+# and in every process when CACHES uses a shared backend.
+RENTALS_AUTH_CACHE_SECONDS = 60
+
+# Largest batch accepted by POST /api/v1/buildings/bulk/
+RENTALS_BULK_MAX_ITEMS = 5000
+
+# Buildings left without a profile are deleted with it: 'inline' in the same transaction,
+# or 'deferred' to the in-process job queue in batches of RENTALS_ORPHAN_SWEEP_BATCH.
+RENTALS_ORPHAN_CLEANUP = os.getenv('RENTALS_ORPHAN_CLEANUP', 'inline')
+RENTALS_ORPHAN_SWEEP_BATCH = 500
+
+# Lifetime of cached template fragments (district options on the map and account pages).
+# District saves and deletes drop them at once (rentals/fragments.py).
+RENTALS_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
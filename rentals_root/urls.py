@@ -15,10 +15,12 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from rentals.staticfiles import serve as serve_static
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('rentals/', include('rentals.urls')),
@@ -27,3 +29,7 @@ urlpatterns = [
 # Serve media files in development
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# Serve collected, hashed and precompressed static files (no web server in front)
+if settings.RENTALS_SERVE_STATIC:
+    urlpatterns += [re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_static)]